@@ -5,6 +5,7 @@ from alembic import context
 
 from app.core.config import settings
 from app.infrastructure.database import Base
+from app.infrastructure import models  # noqa: F401  регистрирует таблицы в Base.metadata
 
 import sys
 from pathlib import Path
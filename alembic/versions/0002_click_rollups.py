@@ -0,0 +1,38 @@
+"""click rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:05:00
+
+Счётчики кликов по бакетам для статистики. Историю можно заполнить из click_events
+скриптом scripts/backfill_click_rollups.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # if_not_exists: в базах, созданных через create_all, таблица уже есть
+    op.create_table(
+        "click_rollups",
+        sa.Column("url_id", sa.Integer(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("clicks", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["url_id"], ["urls.id"]),
+        sa.PrimaryKeyConstraint("url_id", "bucket_start"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_click_rollups_bucket_start", "click_rollups", ["bucket_start"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("click_rollups")
@@ -0,0 +1,30 @@
+"""url key sequence
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:07:00
+
+Последовательность номеров для KEY_ALLOCATION_STRATEGY=sequence. Только PostgreSQL.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # if_not_exists: в базах, созданных через create_all, последовательность уже есть
+        op.execute(sa.schema.CreateSequence(sa.Sequence("url_key_seq"), if_not_exists=True))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(sa.schema.DropSequence(sa.Sequence("url_key_seq")))
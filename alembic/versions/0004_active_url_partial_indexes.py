@@ -0,0 +1,42 @@
+"""partial indexes over active urls
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя индекса, колонка): листинг active_only по id, поиск истёкших sweeper'ом. Редирект
+# читает по уникальному индексу key и проверяет активность в приложении.
+INDEXES = [
+    ("ix_urls_active_id", "id"),
+    ("ix_urls_active_expires_at", "expires_at"),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в urls, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES:
+            op.create_index(
+                name, "urls", [column],
+                postgresql_where=sa.text("is_active"), sqlite_where=sa.text("is_active"),
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="urls", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,119 @@
+"""partition click_events by day
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:20:00
+
+Только PostgreSQL. Существующая таблица переименовывается в click_events_legacy, новая
+click_events секционируется по дням. Дневные партиции создаются на всю историю кликов
+(и на DAYS_AHEAD дней вперёд), вся история переносится в них по одному дню за запрос,
+чтобы не строить один огромный INSERT. После сверки числа строк click_events_legacy
+удаляется.
+
+Downgrade собирает обычную таблицу click_events из всех кликов партиционированной.
+"""
+from datetime import date, datetime, timedelta
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DAYS_AHEAD = 7
+
+
+def _rename_legacy(source: str, target: str) -> None:
+    op.execute(f"ALTER TABLE {source} RENAME TO {target}")
+    op.execute(f"ALTER TABLE {target} RENAME CONSTRAINT {source}_pkey TO {target}_pkey")
+    op.execute(f"ALTER TABLE {target} RENAME CONSTRAINT {source}_url_id_fkey TO {target}_url_id_fkey")
+    op.execute(f"ALTER INDEX IF EXISTS ix_{source}_id RENAME TO ix_{target}_id")
+    op.execute(f"ALTER SEQUENCE IF EXISTS {source}_id_seq RENAME TO {target}_id_seq")
+
+
+def _create_partition(day: date) -> None:
+    op.execute(
+        f"CREATE TABLE click_events_p{day:%Y%m%d} PARTITION OF click_events "
+        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    _rename_legacy("click_events", "click_events_legacy")
+
+    op.execute("CREATE SEQUENCE click_events_id_seq AS bigint")
+    # id новых кликов продолжают нумерацию старой таблицы
+    op.execute(
+        "SELECT setval('click_events_id_seq', COALESCE((SELECT max(id) FROM click_events_legacy), 0) + 1, false)"
+    )
+    op.execute("""
+        CREATE TABLE click_events (
+            id bigint NOT NULL DEFAULT nextval('click_events_id_seq'),
+            url_id integer NOT NULL REFERENCES urls (id),
+            "timestamp" timestamp without time zone NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    op.execute("ALTER SEQUENCE click_events_id_seq OWNED BY click_events.id")
+    op.execute("CREATE TABLE click_events_default PARTITION OF click_events DEFAULT")
+
+    today = datetime.utcnow().date()
+    first_click = bind.execute(sa.text('SELECT min("timestamp") FROM click_events_legacy')).scalar()
+    day = min(first_click.date(), today) if first_click else today
+    last_day = today + timedelta(days=DAYS_AHEAD)
+    copy_sql = sa.text(
+        'INSERT INTO click_events (id, url_id, "timestamp") '
+        'SELECT id, url_id, "timestamp" FROM click_events_legacy '
+        'WHERE "timestamp" >= :start AND "timestamp" < :end'
+    )
+    while day <= last_day:
+        _create_partition(day)
+        bind.execute(copy_sql, {"start": day, "end": day + timedelta(days=1)})
+        day += timedelta(days=1)
+    # Клики с отметкой дальше DAYS_AHEAD (сбитые часы) попадают в click_events_default
+    bind.execute(
+        sa.text(
+            'INSERT INTO click_events (id, url_id, "timestamp") '
+            'SELECT id, url_id, "timestamp" FROM click_events_legacy WHERE "timestamp" >= :start'
+        ),
+        {"start": day},
+    )
+
+    copied = bind.execute(sa.text("SELECT count(*) FROM click_events")).scalar()
+    legacy = bind.execute(sa.text("SELECT count(*) FROM click_events_legacy")).scalar()
+    if copied != legacy:
+        raise RuntimeError(f"click_events copy is incomplete: {copied} of {legacy} rows")
+    op.execute("DROP TABLE click_events_legacy")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("""
+        CREATE TABLE click_events_plain (
+            id serial NOT NULL,
+            url_id integer NOT NULL,
+            "timestamp" timestamp without time zone NOT NULL DEFAULT now(),
+            CONSTRAINT click_events_plain_pkey PRIMARY KEY (id),
+            CONSTRAINT click_events_plain_url_id_fkey FOREIGN KEY (url_id) REFERENCES urls (id)
+        )
+    """)
+    op.execute("CREATE INDEX ix_click_events_plain_id ON click_events_plain (id)")
+    op.execute("""
+        INSERT INTO click_events_plain (id, url_id, "timestamp")
+        SELECT id, url_id, "timestamp" FROM click_events
+    """)
+    op.execute(
+        "SELECT setval('click_events_plain_id_seq', COALESCE((SELECT max(id) FROM click_events_plain), 0) + 1, false)"
+    )
+    op.execute("DROP TABLE click_events")
+    _rename_legacy("click_events_plain", "click_events")
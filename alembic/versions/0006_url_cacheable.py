@@ -0,0 +1,27 @@
+"""add urls.cacheable
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 12:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Константный DEFAULT в PostgreSQL 11+ не переписывает таблицу
+    op.add_column("urls", sa.Column("cacheable", sa.Boolean(), nullable=False, server_default=sa.true()))
+
+
+def downgrade() -> None:
+    op.drop_column("urls", "cacheable")
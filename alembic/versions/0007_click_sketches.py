@@ -0,0 +1,35 @@
+"""add click_sketches
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "click_sketches",
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("window_start", sa.DateTime(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("kind", "subject", "window_start"),
+    )
+    op.create_index("ix_click_sketches_window_start", "click_sketches", ["window_start"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_click_sketches_window_start", table_name="click_sketches")
+    op.drop_table("click_sketches")
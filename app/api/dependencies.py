@@ -1,16 +1,217 @@
-from typing import Generator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, Generator, Iterator
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.domain.entities import User as UserEntity
-from app.domain.use_cases import URLUseCases
+from app.domain.entities import URL as URLEntity, URLStats, User as UserEntity
+from app.domain.key_allocation import KeyAllocator, RandomKeyAllocator, SequenceKeyAllocator
+from app.domain.use_cases import AsyncURLUseCases, URLUseCases
 from app.domain.repositories import AbstractURLRepository, AbstractUserRepository
-from app.infrastructure.database import SessionLocal
+from app.infrastructure.analytics import (
+    ClickAnalytics, ClickAnalyticsFlusher, ClickAnalyticsReader, MemorySketchStore, SQLSketchStore,
+)
+from app.infrastructure.click_buffer import ClickBuffer
+from app.infrastructure.database import (
+    AsyncReplicaSessionLocals, AsyncSessionLocal, BackgroundSessionLocal, ReplicaSessionLocals, SessionLocal,
+)
+from app.infrastructure.key_filter import KeyFilterRefresher, URLKeyFilter
+from app.infrastructure.key_index import KeyIndex
+from app.infrastructure.partitions import PartitionMaintainer
+from app.infrastructure.replicas import ReplicaLagMonitor, ReplicaRouter
+from app.infrastructure.rollups import ClickRollupPruner
+from app.infrastructure.shared_cache import SharedCacheInvalidationListener, SharedURLCache, create_redis_client
+from app.infrastructure.sweeper import ExpirySweeper
+from app.infrastructure.warmup import CacheWarmer
 from app.infrastructure.repositories.postgres import PostgresURLRepository, PostgresUserRepository
-from app.core.auth import verify_password
+from app.infrastructure.repositories.postgres_async import AsyncPostgresURLRepository
+from app.infrastructure.repositories.cached import CachedURLRepository, CachedUserRepository, SharedCachedURLRepository
+from app.infrastructure.repositories.filtered import KeyFilteredURLRepository
+from app.infrastructure.repositories.indexed import KeyIndexedURLRepository
+from app.infrastructure.repositories.instrumented import InstrumentedURLRepository
+from app.infrastructure.repositories.replicated import ReplicaRoutedURLRepository
+from app.infrastructure.repositories.memory import MemoryStore, MemoryURLRepository, MemoryUserRepository
+from app.core.auth import CredentialCache, get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
 
 security = HTTPBasic()
 
+url_cache: TTLCache[str, URLEntity] = TTLCache(
+    max_size=settings.URL_CACHE_MAX_SIZE, ttl=settings.URL_CACHE_TTL_SECONDS
+)
+
+user_cache: TTLCache[str, UserEntity] = TTLCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+credential_cache = CredentialCache(max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+click_buffer = ClickBuffer(
+    BackgroundSessionLocal,
+    max_size=settings.CLICK_BUFFER_MAX_SIZE,
+    batch_size=settings.CLICK_BUFFER_BATCH_SIZE,
+    flush_interval=settings.CLICK_BUFFER_FLUSH_INTERVAL_SECONDS,
+    drop_policy=settings.CLICK_BUFFER_DROP_POLICY,
+    block_timeout=settings.CLICK_BUFFER_BLOCK_TIMEOUT_SECONDS,
+    rollup_bucket_seconds=settings.CLICK_ROLLUP_BUCKET_SECONDS,
+)
+
+expiry_sweeper = ExpirySweeper(
+    BackgroundSessionLocal,
+    interval=settings.SWEEPER_INTERVAL_SECONDS,
+    batch_size=settings.SWEEPER_BATCH_SIZE,
+    max_batches=settings.SWEEPER_MAX_BATCHES_PER_RUN,
+)
+
+partition_maintainer = PartitionMaintainer(
+    BackgroundSessionLocal,
+    interval=settings.CLICK_PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    days_ahead=settings.CLICK_PARTITION_DAYS_AHEAD,
+    retention_days=settings.CLICK_RETENTION_DAYS,
+)
+
+rollup_pruner = ClickRollupPruner(
+    BackgroundSessionLocal,
+    interval=settings.CLICK_ROLLUP_PRUNE_INTERVAL_SECONDS,
+    retention=timedelta(hours=settings.CLICK_ROLLUP_RETENTION_HOURS or 0),
+)
+
+replica_router = ReplicaRouter(ReplicaSessionLocals, max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS)
+replica_lag_monitor = ReplicaLagMonitor(replica_router, interval=settings.DB_REPLICA_CHECK_INTERVAL_SECONDS)
+
+
+key_filter = URLKeyFilter(capacity=settings.KEY_FILTER_CAPACITY, fp_rate=settings.KEY_FILTER_FP_RATE)
+
+key_filter_refresher = KeyFilterRefresher(
+    BackgroundSessionLocal,
+    key_filter,
+    interval=settings.KEY_FILTER_REFRESH_INTERVAL_SECONDS,
+    batch_size=settings.KEY_FILTER_REBUILD_BATCH_SIZE,
+)
+
+key_index = KeyIndex(
+    settings.KEY_INDEX_PATH,
+    max_age=settings.KEY_INDEX_MAX_AGE_SECONDS,
+    check_interval=settings.KEY_INDEX_CHECK_INTERVAL_SECONDS,
+)
+
+
+def _build_memory_store() -> MemoryStore:
+    store = MemoryStore(click_capacity=settings.MEMORY_CLICK_CAPACITY)
+    if settings.MEMORY_ADMIN_USERNAME and settings.MEMORY_ADMIN_PASSWORD:
+        MemoryUserRepository(store).add(UserEntity(
+            id=None, username=settings.MEMORY_ADMIN_USERNAME,
+            hashed_password=get_password_hash(settings.MEMORY_ADMIN_PASSWORD),
+        ))
+    return store
+
+
+# Данные бэкенда STORAGE_BACKEND=memory
+memory_store = _build_memory_store() if settings.STORAGE_BACKEND == "memory" else None
+
+click_analytics = ClickAnalytics(
+    window_seconds=settings.ANALYTICS_WINDOW_SECONDS,
+    hll_precision=settings.ANALYTICS_HLL_PRECISION,
+    top_k=settings.ANALYTICS_TOP_K,
+    cms_width=settings.ANALYTICS_CMS_WIDTH,
+    cms_depth=settings.ANALYTICS_CMS_DEPTH,
+    max_tracked_links=settings.ANALYTICS_MAX_TRACKED_LINKS,
+    visitor_salt=settings.ANALYTICS_VISITOR_SALT or "",
+)
+sketch_store = MemorySketchStore() if memory_store is not None else SQLSketchStore(BackgroundSessionLocal)
+click_analytics_reader = ClickAnalyticsReader(sketch_store, window_seconds=settings.ANALYTICS_WINDOW_SECONDS)
+click_analytics_flusher = ClickAnalyticsFlusher(
+    click_analytics,
+    sketch_store,
+    interval=settings.ANALYTICS_FLUSH_INTERVAL_SECONDS,
+    retention=timedelta(hours=settings.ANALYTICS_RETENTION_HOURS),
+)
+
+
+def _build_shared_cache() -> tuple[SharedURLCache | None, SharedCacheInvalidationListener | None]:
+    if not settings.SHARED_CACHE_ENABLED or settings.STORAGE_BACKEND != "postgres":
+        return None, None
+    client = create_redis_client(settings.SHARED_CACHE_URL, settings.SHARED_CACHE_SOCKET_TIMEOUT_SECONDS)
+    cache = SharedURLCache(
+        client,
+        ttl=settings.SHARED_CACHE_TTL_SECONDS,
+        missing_ttl=settings.SHARED_CACHE_MISSING_TTL_SECONDS,
+        lock_ttl=settings.SHARED_CACHE_LOCK_TTL_SECONDS,
+        lock_wait=settings.SHARED_CACHE_LOCK_WAIT_SECONDS,
+        channel=settings.SHARED_CACHE_CHANNEL,
+    )
+    # Подписке нужен сокет без короткого таймаута: get_message сам ждёт сообщения
+    listener = SharedCacheInvalidationListener(
+        create_redis_client(settings.SHARED_CACHE_URL, socket_timeout=None), settings.SHARED_CACHE_CHANNEL, url_cache,
+    )
+    return cache, listener
+
+
+shared_url_cache, shared_cache_listener = _build_shared_cache()
+
+
+def _build_cache_warmer() -> CacheWarmer:
+    sinks = []
+    if settings.URL_CACHE_ENABLED:
+        sinks.append(lambda url: url_cache.set(url.key, url, ttl=(url.expires_at - datetime.utcnow()).total_seconds()))
+    if shared_url_cache is not None:
+        sinks.append(lambda url: shared_url_cache.put(url.key, url))
+    return CacheWarmer(
+        BackgroundSessionLocal,
+        sinks,
+        top_n=settings.CACHE_WARMUP_TOP_N,
+        window=timedelta(seconds=settings.CACHE_WARMUP_WINDOW_SECONDS),
+        time_budget=settings.CACHE_WARMUP_TIME_BUDGET_SECONDS,
+    )
+
+
+cache_warmer = _build_cache_warmer()
+
+
+def _build_key_allocator() -> KeyAllocator | None:
+    if settings.KEY_ALLOCATION_STRATEGY == "sequence":
+        return SequenceKeyAllocator(block_size=settings.KEY_SEQUENCE_BLOCK_SIZE)
+    if settings.KEY_ALLOCATION_STRATEGY == "on_conflict":
+        return RandomKeyAllocator()
+    return None
+
+
+# Общий на процесс: блоки номеров стратегии sequence переиспользуются между запросами
+key_allocator = _build_key_allocator()
+
+
+class ThreadedURLUseCases:
+    """Асинхронный фасад над URLUseCases для синхронного режима БД.
+
+    Каждый вызов целиком уходит в threadpool, как раньше выполнялись def-эндпоинты.
+    """
+
+    def __init__(self, use_cases: URLUseCases):
+        self.use_cases = use_cases
+
+    async def create_url(self, target_url: str, cacheable: bool = True) -> URLEntity:
+        return await run_in_threadpool(self.use_cases.create_url, target_url, cacheable)
+
+    async def create_urls(self, target_urls: list[str]) -> list[URLEntity | None]:
+        return await run_in_threadpool(self.use_cases.create_urls, target_urls)
+
+    async def find_and_process_url(self, key: str, log_click: bool = True) -> URLEntity | None:
+        return await run_in_threadpool(self.use_cases.find_and_process_url, key, log_click)
+
+    async def register_click(self, key: str) -> bool:
+        return await run_in_threadpool(self.use_cases.register_click, key)
+
+    async def get_all_urls(self, skip: int, limit: int, active_only: bool, before_id: int | None = None) -> list[URLEntity]:
+        return await run_in_threadpool(self.use_cases.get_all_urls, skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    async def deactivate_url(self, secret_key: str) -> URLEntity | None:
+        return await run_in_threadpool(self.use_cases.deactivate_url, secret_key)
+
+    async def get_url_stats(self, limit: int | None = None, after_id: int | None = None, top: int | None = None) -> list[URLStats]:
+        return await run_in_threadpool(self.use_cases.get_url_stats, limit=limit, after_id=after_id, top=top)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -20,16 +221,131 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_url_repo(db: Session = Depends(get_db)) -> AbstractURLRepository:
-    return PostgresURLRepository(db)
+@contextmanager
+def replica_session() -> Iterator[tuple[str, Session] | None]:
+    """Сессия выбранной реплики с её именем или None, если читать можно только с primary."""
+    choice = replica_router.choose() if memory_store is None else None
+    if choice is None:
+        yield None
+        return
+    name, session_factory = choice
+    with session_factory() as db:
+        yield name, db
+
+
+def get_replica_db() -> Generator[tuple[str, Session] | None, None, None]:
+    with replica_session() as replica:
+        yield replica
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def get_async_replica_db() -> AsyncGenerator[tuple[str, AsyncSession] | None, None]:
+    """Async-сессия реплики, выбранной ReplicaRouter, или None — читать с primary."""
+    choice = replica_router.choose() if memory_store is None else None
+    if choice is None or choice[0] not in AsyncReplicaSessionLocals:
+        yield None
+        return
+    name = choice[0]
+    async with AsyncReplicaSessionLocals[name]() as session:
+        yield name, session
+
+
+def build_url_repo(db: Session, replica: tuple[str, Session] | None = None) -> AbstractURLRepository:
+    if memory_store is not None:
+        return MemoryURLRepository(memory_store)
+    repo: AbstractURLRepository = PostgresURLRepository(
+        db, click_buffer=click_buffer if settings.CLICK_BUFFER_ENABLED else None
+    )
+    if replica is not None:
+        replica_name, replica_db = replica
+        repo = ReplicaRoutedURLRepository(repo, PostgresURLRepository(replica_db), replica_name, replica_router)
+    if settings.METRICS_ENABLED:
+        repo = InstrumentedURLRepository(repo)
+    if shared_url_cache is not None:
+        repo = SharedCachedURLRepository(repo, shared_url_cache)
+    if settings.KEY_INDEX_ENABLED:
+        repo = KeyIndexedURLRepository(repo, key_index)
+    if settings.URL_CACHE_ENABLED:
+        repo = CachedURLRepository(repo, url_cache)
+    if settings.KEY_FILTER_ENABLED:
+        repo = KeyFilteredURLRepository(repo, key_filter)
+    return repo
+
+
+def get_url_repo(
+    db: Session = Depends(get_db),
+    replica: tuple[str, Session] | None = Depends(get_replica_db),
+) -> AbstractURLRepository:
+    return build_url_repo(db, replica)
+
+
+@contextmanager
+def standalone_url_use_cases() -> Iterator[URLUseCases]:
+    """Use cases на собственной синхронной сессии.
+
+    Нужны потоковым ответам: тело такого ответа читается из БД уже после выхода из
+    обработчика, поэтому сессия живёт столько же, сколько сам поток.
+    """
+    with SessionLocal() as db, replica_session() as replica:
+        yield URLUseCases(build_url_repo(db, replica), key_allocator=key_allocator)
+
+
+@contextmanager
+def standalone_db() -> Iterator[Session]:
+    """Синхронная сессия на время потокового ответа (см. standalone_url_use_cases).
+
+    Берётся с реплики, если она доступна: выгрузки допускают отставание.
+    """
+    with replica_session() as replica:
+        if replica is not None:
+            yield replica[1]
+            return
+        with SessionLocal() as db:
+            yield db
 
 
 def get_user_repo(db: Session = Depends(get_db)) -> AbstractUserRepository:
-    return PostgresUserRepository(db)
+    if memory_store is not None:
+        return MemoryUserRepository(memory_store)
+    repo = PostgresUserRepository(db)
+    if settings.AUTH_CACHE_ENABLED:
+        return CachedUserRepository(repo, user_cache)
+    return repo
 
 
 def get_url_use_cases(repo: AbstractURLRepository = Depends(get_url_repo)) -> URLUseCases:
-    return URLUseCases(repo)
+    return URLUseCases(repo, key_allocator=key_allocator)
+
+
+async def get_threaded_url_use_cases(use_cases: URLUseCases = Depends(get_url_use_cases)) -> ThreadedURLUseCases:
+    return ThreadedURLUseCases(use_cases)
+
+
+async def get_native_async_url_use_cases(
+    session: AsyncSession = Depends(get_async_db),
+    replica: tuple[str, AsyncSession] | None = Depends(get_async_replica_db),
+) -> AsyncURLUseCases:
+    repo = AsyncPostgresURLRepository(session, repo_factory=build_url_repo, replica=replica)
+    return AsyncURLUseCases(repo, key_allocator=key_allocator)
+
+
+# Эндпоинты работают с асинхронным интерфейсом use cases; режим БД выбирается настройкой.
+# In-memory бэкенд не ходит в БД и всегда работает через синхронные use cases.
+get_async_url_use_cases = (
+    get_native_async_url_use_cases
+    if settings.DB_ASYNC_ENABLED and settings.STORAGE_BACKEND == "postgres"
+    else get_threaded_url_use_cases
+)
+
+
+def _check_password(credentials: HTTPBasicCredentials, user: UserEntity) -> bool:
+    if settings.AUTH_CACHE_ENABLED:
+        return credential_cache.verify(credentials.username, credentials.password, user.hashed_password)
+    return verify_password(credentials.password, user.hashed_password)
 
 
 def get_current_user(
@@ -37,10 +353,10 @@ def get_current_user(
     repo: AbstractUserRepository = Depends(get_user_repo)
 ) -> UserEntity:
     user = repo.get_by_username(credentials.username)
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not _check_password(credentials, user):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Basic"},
         )
-    return user
\ No newline at end of file
+    return user
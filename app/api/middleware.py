@@ -0,0 +1,164 @@
+import hashlib
+import math
+import time
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.admission import ConcurrencyLimiter, RateLimiter
+from app.core.metrics import (
+    ADMISSION_DECISIONS, ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_WAIT, HTTP_REQUEST_DURATION, HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS, RATE_LIMITED_REQUESTS,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Одиночные пути приложения, которые не являются короткими ключами
+RESERVED_PATHS = {"/metrics", "/docs", "/redoc", "/openapi.json", "/favicon.ico"}
+CREATE_PATHS = {"/api/v1/urls", "/api/v1/urls/", "/api/v1/urls/batch"}
+RATE_LIMITED_PREFIX = "/api/v1/urls"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: задержка, статусы и число запросов в обработке.
+
+    В метку route попадает шаблон пути маршрута (например, "/{short_key}"), а не сам
+    путь, чтобы число временных рядов не росло вместе с числом ключей.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_PROGRESS.dec(method)
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            HTTP_REQUEST_DURATION.observe(elapsed, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status_code))
+
+
+def admission_route(method: str, path: str) -> str | None:
+    """Класс маршрута для ограничения конкурентности: redirect, create или None — без ограничения.
+
+    Middleware работает до маршрутизации, поэтому класс определяется по методу и пути.
+    """
+    if method == "POST" and path in CREATE_PATHS:
+        return "create"
+    segments = path.strip("/").split("/")
+    if method in ("GET", "HEAD") and len(segments) == 1 and segments[0] and path not in RESERVED_PATHS:
+        return "redirect"
+    if method == "POST" and len(segments) == 2 and segments[1] == "click":
+        return "redirect"
+    return None
+
+
+def _client_address(scope: Scope) -> str | None:
+    # За обратным прокси адрес клиента подставляет uvicorn --proxy-headers
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _credential(scope: Scope) -> str | None:
+    # Ключ — хеш всего заголовка: запросы с чужим username и неверным паролем
+    # расходуют свою корзину, а не корзину владельца
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:6].lower() == b"basic ":
+            return hashlib.blake2b(value, digest_size=16).hexdigest()
+    return None
+
+
+class AdmissionControlMiddleware:
+    """ASGI-middleware: сброс нагрузки вместо очереди в threadpool и пуле соединений.
+
+    Редиректы и создание ссылок ограничены своим числом одновременных запросов; лишние
+    ждут в ограниченной очереди не дольше дедлайна и получают 503 с Retry-After.
+    Запросы к /api/v1/urls дополнительно ограничены token bucket на учётные данные (429).
+    Учётные данные до аутентификации не проверены, и каждый случайный заголовок получил
+    бы свою полную корзину, поэтому сначала расходуется корзина адреса клиента.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: dict[str, ConcurrencyLimiter],
+        rate_limiter: RateLimiter | None,
+        retry_after: int,
+        address_rate_limiter: RateLimiter | None = None,
+    ):
+        self.app = app
+        self.limiters = limiters
+        self.rate_limiter = rate_limiter
+        self.address_rate_limiter = address_rate_limiter
+        self.retry_after = retry_after
+
+    def _rate_limit_wait(self, scope: Scope) -> tuple[str, float] | None:
+        """Какой лимит исчерпан и через сколько секунд повторить, или None — запрос разрешён."""
+        address = _client_address(scope)
+        if self.address_rate_limiter is not None and address is not None:
+            wait = self.address_rate_limiter.take(address)
+            if wait > 0:
+                return "address", wait
+        credential = _credential(scope)
+        if self.rate_limiter is not None and credential is not None:
+            wait = self.rate_limiter.take(credential)
+            if wait > 0:
+                return "credential", wait
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        limited = self._rate_limit_wait(scope) if path.startswith(RATE_LIMITED_PREFIX) else None
+        if limited is not None:
+            limit, wait = limited
+            RATE_LIMITED_REQUESTS.inc(limit)
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded"}, status_code=429, headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+
+        route = admission_route(scope["method"], path)
+        limiter = self.limiters.get(route)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        outcome = await limiter.acquire()
+        ADMISSION_DECISIONS.inc(route, outcome)
+        if outcome not in ("admitted", "queued"):
+            response = JSONResponse(
+                {"detail": "Service overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        if outcome == "queued":
+            ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started, route)
+        ADMISSION_IN_FLIGHT.set(limiter.in_flight, route)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+            ADMISSION_IN_FLIGHT.set(limiter.in_flight, route)
@@ -0,0 +1,84 @@
+import hashlib
+import html
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from fastapi.responses import HTMLResponse, RedirectResponse
+from app.core.config import settings
+from app.domain.entities import URL as URLEntity
+
+_BEACON_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8">
+<meta http-equiv="refresh" content="0;url={target_attr}">
+<script>navigator.sendBeacon&&navigator.sendBeacon({beacon_js}+"?referrer="+encodeURIComponent(document.referrer));location.replace({target_js});</script>
+</head><body><a href="{target_attr}">{target_text}</a></body></html>
+"""
+
+
+def cache_max_age(url: URLEntity, now: datetime | None = None) -> int:
+    """Сколько секунд клиенту можно хранить редирект: не дольше настройки и срока действия ссылки."""
+    if not url.cacheable or settings.REDIRECT_CACHE_MAX_AGE_SECONDS <= 0:
+        return 0
+    remaining = int((url.expires_at - (now or datetime.utcnow())).total_seconds())
+    return max(0, min(settings.REDIRECT_CACHE_MAX_AGE_SECONDS, remaining))
+
+
+def _etag(url: URLEntity) -> str:
+    digest = hashlib.blake2b(
+        f"{url.key}\n{url.target_url}\n{url.expires_at.isoformat()}\n{settings.REDIRECT_MODE}".encode(), digest_size=8
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def _caching_headers(url: URLEntity) -> dict[str, str]:
+    max_age = cache_max_age(url)
+    if max_age <= 0:
+        return {"Cache-Control": "no-store"}
+    headers = {"Cache-Control": f"public, max-age={max_age}"}
+    if settings.REDIRECT_CACHE_VALIDATORS:
+        headers["ETag"] = _etag(url)
+        if url.created_at is not None:
+            headers["Last-Modified"] = format_datetime(url.created_at.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def _not_modified(request: Request, headers: dict[str, str]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers.get("ETag")
+        return etag is not None and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(",")))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or "Last-Modified" not in headers:
+        return False
+    try:
+        return parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def _beacon_page(url: URLEntity) -> str:
+    # "</" экранируется, чтобы адрес не мог закрыть тег <script>
+    def js(value: str) -> str:
+        return json.dumps(value).replace("</", "<\\/")
+    return _BEACON_PAGE.format(
+        target_attr=html.escape(url.target_url, quote=True),
+        target_text=html.escape(url.target_url),
+        target_js=js(url.target_url),
+        beacon_js=js(f"/{url.key}/click"),
+    )
+
+
+def redirect_response(request: Request, url: URLEntity) -> Response:
+    """Ответ на переход по короткой ссылке согласно REDIRECT_* настройкам.
+
+    Кэшируемый ответ повторно до сервиса не доходит, поэтому в режиме beacon вместо
+    редиректа отдаётся HTML-страница: она сама уходит на адрес ссылки и отправляет
+    POST /{key}/click, который и учитывает клик.
+    """
+    headers = _caching_headers(url)
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    if settings.REDIRECT_MODE == "beacon":
+        return HTMLResponse(_beacon_page(url), headers=headers)
+    return RedirectResponse(url=url.target_url, status_code=settings.REDIRECT_STATUS_CODE, headers=headers)
@@ -0,0 +1,69 @@
+from dataclasses import asdict
+from fastapi import APIRouter, Depends
+from app.api.v1 import schemas
+from app.api.dependencies import click_buffer, credential_cache, get_current_user, key_filter, url_cache, user_cache
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.infrastructure.database import engines
+from app.infrastructure.pool import pool_stats
+
+router = APIRouter()
+
+
+def _cache_stats(cache: TTLCache, enabled: bool) -> schemas.CacheStatsResponse:
+    stats = cache.stats()
+    lookups = stats.hits + stats.misses
+    return schemas.CacheStatsResponse(enabled=enabled, hit_rate=stats.hits / lookups if lookups else 0.0, **asdict(stats))
+
+
+@router.get(
+    "/cache",
+    response_model=schemas.CacheStatsResponse,
+    summary="Статистика кэша редиректов",
+    dependencies=[Depends(get_current_user)]
+)
+def get_cache_stats():
+    return _cache_stats(url_cache, enabled=settings.URL_CACHE_ENABLED)
+
+
+@router.get(
+    "/auth-cache",
+    response_model=schemas.AuthCacheStatsResponse,
+    summary="Статистика кэша авторизации",
+    dependencies=[Depends(get_current_user)]
+)
+def get_auth_cache_stats():
+    return schemas.AuthCacheStatsResponse(
+        credentials=_cache_stats(credential_cache.cache, enabled=settings.AUTH_CACHE_ENABLED),
+        users=_cache_stats(user_cache, enabled=settings.AUTH_CACHE_ENABLED),
+    )
+
+
+@router.get(
+    "/clicks",
+    response_model=schemas.ClickBufferStatsResponse,
+    summary="Состояние буфера записи кликов",
+    dependencies=[Depends(get_current_user)]
+)
+def get_click_buffer_stats():
+    return schemas.ClickBufferStatsResponse(enabled=settings.CLICK_BUFFER_ENABLED, **asdict(click_buffer.stats()))
+
+
+@router.get(
+    "/pool",
+    response_model=list[schemas.PoolStatsResponse],
+    summary="Состояние пулов соединений с БД",
+    dependencies=[Depends(get_current_user)]
+)
+def get_pool_stats():
+    return [schemas.PoolStatsResponse(**asdict(pool_stats(name, engine))) for name, engine in engines().items()]
+
+
+@router.get(
+    "/key-filter",
+    response_model=schemas.KeyFilterStatsResponse,
+    summary="Состояние фильтра Блума по ключам",
+    dependencies=[Depends(get_current_user)]
+)
+def get_key_filter_stats():
+    return schemas.KeyFilterStatsResponse(enabled=settings.KEY_FILTER_ENABLED, **asdict(key_filter.stats()))
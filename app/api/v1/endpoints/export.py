@@ -0,0 +1,64 @@
+import threading
+from datetime import datetime
+from typing import Iterator
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from app.api.dependencies import get_current_user, standalone_db
+from app.core.config import settings
+from app.infrastructure.export import ExportFormat, ExportTable, export_chunks, naive_utc
+
+router = APIRouter()
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Каждая выгрузка держит соединение основного пула до конца передачи
+_export_slots = threading.BoundedSemaphore(settings.EXPORT_MAX_CONCURRENT)
+
+
+def _stream_export(table: ExportTable, output_format: ExportFormat, compress: bool, **filters) -> Iterator[bytes]:
+    try:
+        yield b""
+        with standalone_db() as db:
+            yield from export_chunks(db, table, output_format, compress, settings.EXPORT_BATCH_SIZE, **filters)
+    finally:
+        _export_slots.release()
+
+
+@router.get(
+    "/{table}",
+    summary="Потоковая выгрузка ссылок или кликов",
+    description=(
+        "urls фильтруются по created_at, clicks — по timestamp в интервале [since, until). "
+        "Строки читаются серверным курсором, память не зависит от размера таблицы. "
+        "secret_key ссылок не выгружается."
+    ),
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}, "application/gzip": {}}}},
+    dependencies=[Depends(get_current_user)]
+)
+def export_table(
+    table: ExportTable,
+    output_format: ExportFormat = Query("ndjson", alias="format", description="Формат строк"),
+    compress: bool = Query(False, alias="gzip", description="Сжать выгрузку в gzip"),
+    since: datetime | None = Query(None, description="Начало интервала (включительно), UTC"),
+    until: datetime | None = Query(None, description="Конец интервала (не включительно), UTC"),
+    active_only: bool = Query(False, description="Только активные неистёкшие ссылки (для clicks — клики по ним)"),
+):
+    if settings.STORAGE_BACKEND != "postgres":
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Export requires the postgres storage backend")
+    if not _export_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many exports in progress, retry later",
+            headers={"Retry-After": "60"},
+        )
+    stream = _stream_export(
+        table, output_format, compress, since=naive_utc(since), until=naive_utc(until), active_only=active_only,
+    )
+    # Запущенный генератор выполнит finally и вернёт слот, даже если клиент отключится до первого куска
+    next(stream)
+    filename = f"{table}.{output_format}" + (".gz" if compress else "")
+    return StreamingResponse(
+        stream,
+        media_type="application/gzip" if compress else _MEDIA_TYPES[output_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
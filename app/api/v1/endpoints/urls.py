@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+import json
+from typing import Iterator, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import HttpUrl, TypeAdapter, ValidationError
 from app.api.v1 import schemas
-from app.api.dependencies import get_url_use_cases, get_current_user
-from app.domain.use_cases import URLUseCases
+from app.api.v1.cursors import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.api.dependencies import (
+    click_analytics_reader, get_async_url_use_cases, get_current_user, standalone_url_use_cases,
+)
+from app.core.config import settings
+from app.domain.exceptions import KeyAllocationError
+from app.domain.use_cases import AsyncURLUseCases
 
 router = APIRouter()
 
+_http_url = TypeAdapter(HttpUrl)
+
 
 @router.post(
     "/",
@@ -13,8 +24,11 @@ router = APIRouter()
     summary="Создание короткой ссылки",
     dependencies=[Depends(get_current_user)]
 )
-def create_url(request: Request, payload: schemas.URLCreate, use_cases: URLUseCases = Depends(get_url_use_cases)):
-    url = use_cases.create_url(target_url=str(payload.target_url))
+async def create_url(request: Request, payload: schemas.URLCreate, use_cases: AsyncURLUseCases = Depends(get_async_url_use_cases)):
+    try:
+        url = await use_cases.create_url(target_url=str(payload.target_url), cacheable=payload.cacheable)
+    except KeyAllocationError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Could not allocate a short key, please retry")
     base_url = str(request.base_url).rstrip('/')
     return schemas.URLInfo(
         link=f"{base_url}/{url.key}",
@@ -23,48 +37,140 @@ def create_url(request: Request, payload: schemas.URLCreate, use_cases: URLUseCa
     )
 
 
+@router.post(
+    "/batch",
+    response_model=schemas.URLBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Пакетное создание коротких ссылок",
+    description="Ошибки возвращаются по каждому элементу в поле results[].error, остальные ссылки создаются.",
+    dependencies=[Depends(get_current_user)]
+)
+async def create_urls_batch(request: Request, payload: schemas.URLBatchCreate, use_cases: AsyncURLUseCases = Depends(get_async_url_use_cases)):
+    if len(payload.target_urls) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds the limit of {settings.MAX_BATCH_SIZE} URLs",
+        )
+    items: list[schemas.URLBatchItem | None] = [None] * len(payload.target_urls)
+    valid: list[tuple[int, str]] = []
+    for index, raw_url in enumerate(payload.target_urls):
+        try:
+            valid.append((index, str(_http_url.validate_python(raw_url))))
+        except ValidationError as exc:
+            items[index] = schemas.URLBatchItem(index=index, error=exc.errors()[0]["msg"])
+
+    created = await use_cases.create_urls([target_url for _, target_url in valid]) if valid else []
+    base_url = str(request.base_url).rstrip('/')
+    for (index, _), url in zip(valid, created):
+        if url is None:
+            items[index] = schemas.URLBatchItem(index=index, error="Could not allocate a short key")
+            continue
+        items[index] = schemas.URLBatchItem(index=index, url=schemas.URLInfo(
+            link=f"{base_url}/{url.key}",
+            orig_link=url.target_url,
+            secret_key=url.secret_key,
+        ))
+    failed = sum(1 for item in items if item.error is not None)
+    return schemas.URLBatchResponse(created=len(items) - failed, failed=failed, results=items)
+
+
 @router.get(
     "/",
     response_model=list[schemas.URLDetails],
     summary="Получение списка всех ссылок",
+    description=(
+        "Если страница заполнена целиком, курсор следующей страницы приходит в заголовке "
+        "X-Next-Cursor. Курсор быстрее skip на глубоких страницах и не совмещается с ним."
+    ),
     dependencies=[Depends(get_current_user)]
 )
-def read_urls(
+async def read_urls(
     request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Смещение для пагинации"),
     limit: int = Query(100, ge=1, le=200, description="Количество записей на странице"),
     active_only: bool = Query(False, description="Фильтровать только по активным ссылкам"),
-    use_cases: URLUseCases = Depends(get_url_use_cases)
+    cursor: str | None = Query(None, description="Курсор следующей страницы"),
+    use_cases: AsyncURLUseCases = Depends(get_async_url_use_cases)
 ):
-    urls = use_cases.get_all_urls(skip=skip, limit=limit, active_only=active_only)
+    before_id = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="skip cannot be combined with cursor")
+        before_id = _list_cursor_before_id(cursor, active_only)
+    urls = await use_cases.get_all_urls(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+    if len(urls) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"list_before_id": urls[-1].id, "active_only": active_only})
     base_url = str(request.base_url).rstrip('/')
     return [
         schemas.URLDetails(
             link=f"{base_url}/{url.key}",
             orig_link=url.target_url,
             is_active=url.is_active,
-            expires_at=url.expires_at
+            expires_at=url.expires_at,
+            cacheable=url.cacheable,
         ) for url in urls
     ]
 
 
+def _list_cursor_before_id(cursor: str, active_only: bool) -> int:
+    payload = decode_cursor(cursor)
+    before_id = payload.get("list_before_id")
+    if not isinstance(before_id, int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if payload.get("active_only") != active_only:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor was issued for a different active_only filter")
+    return before_id
+
+
 @router.delete(
     "/{secret_key}",
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Деактивация ссылки",
     dependencies=[Depends(get_current_user)]
 )
-def deactivate_url(secret_key: str, use_cases: URLUseCases = Depends(get_url_use_cases)):
-    url = use_cases.deactivate_url(secret_key)
+async def deactivate_url(secret_key: str, use_cases: AsyncURLUseCases = Depends(get_async_url_use_cases)):
+    url = await use_cases.deactivate_url(secret_key)
     if not url:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="URL not found or already inactive")
     return None
 
 
-@router.get("/stats", response_model=list[schemas.URLStatsResponse], summary="Получение статистики по переходам", dependencies=[Depends(get_current_user)])
-def get_stats(request: Request, use_cases: URLUseCases = Depends(get_url_use_cases)):
-    stats = use_cases.get_url_stats()
+@router.get(
+    "/stats",
+    response_model=list[schemas.URLStatsResponse],
+    summary="Получение статистики по переходам",
+    description=(
+        "Без параметров возвращает все ссылки (без кликов за сутки — с нулями). `top` отдаёт N самых "
+        "кликабельных ссылок, `limit`/`cursor` — постраничную выдачу (курсор следующей "
+        "страницы приходит в заголовке X-Next-Cursor), `format=ndjson` — потоковую выдачу."
+    ),
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+    dependencies=[Depends(get_current_user)]
+)
+async def get_stats(
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=1000, description="Количество записей на странице"),
+    cursor: str | None = Query(None, description="Курсор следующей страницы"),
+    top: int | None = Query(None, ge=1, le=1000, description="Только N ссылок с наибольшим числом кликов за сутки"),
+    output_format: Literal["json", "ndjson"] = Query("json", alias="format", description="Формат ответа"),
+    use_cases: AsyncURLUseCases = Depends(get_async_url_use_cases)
+):
+    if top is not None and (limit is not None or cursor is not None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="top cannot be combined with limit/cursor")
+    after_id = _stats_cursor_after_id(cursor) if cursor else None
     base_url = str(request.base_url).rstrip('/')
+
+    if output_format == "ndjson":
+        return StreamingResponse(
+            _stream_stats_ndjson(base_url, limit=limit, after_id=after_id, top=top),
+            media_type="application/x-ndjson",
+        )
+
+    stats = await use_cases.get_url_stats(limit=limit, after_id=after_id, top=top)
+    if limit is not None and len(stats) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"stats_after_id": stats[-1].id})
     return [
         schemas.URLStatsResponse(
             link=f"{base_url}/{stat.key}",
@@ -72,4 +178,75 @@ def get_stats(request: Request, use_cases: URLUseCases = Depends(get_url_use_cas
             last_hour_clicks=stat.last_hour_clicks,
             last_day_clicks=stat.last_day_clicks,
         ) for stat in stats
-    ]
\ No newline at end of file
+    ]
+
+
+def _require_analytics() -> None:
+    if not settings.ANALYTICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Click analytics is disabled")
+
+
+_analytics_hours = Query(24, ge=1, le=settings.ANALYTICS_RETENTION_HOURS, description="Период в часах")
+
+
+@router.get(
+    "/stats/top",
+    response_model=list[schemas.HeavyHitterResponse],
+    summary="Самые частые ссылки, источники переходов и браузеры",
+    description=(
+        "Оценка по скетчам space-saving и count-min: счётчики могут быть завышены не больше "
+        "чем на max_overcount. Клики последних ANALYTICS_FLUSH_INTERVAL_SECONDS ещё не учтены."
+    ),
+    dependencies=[Depends(get_current_user), Depends(_require_analytics)]
+)
+def get_heavy_hitters(
+    request: Request,
+    dimension: Literal["links", "referrers", "user_agents"] = Query("links", description="Что считать"),
+    hours: int = _analytics_hours,
+    limit: int = Query(10, ge=1, le=settings.ANALYTICS_TOP_K, description="Количество записей"),
+):
+    base_url = str(request.base_url).rstrip('/')
+    return [
+        schemas.HeavyHitterResponse(
+            value=f"{base_url}/{value}" if dimension == "links" else value,
+            clicks=clicks,
+            max_overcount=overcount,
+        ) for value, clicks, overcount in click_analytics_reader.top(dimension, hours, limit)
+    ]
+
+
+@router.get(
+    "/stats/{short_key}/visitors",
+    response_model=schemas.UniqueVisitorsResponse,
+    summary="Уникальные посетители ссылки",
+    description="Оценка HyperLogLog по хешу IP и User-Agent; погрешность — в relative_error.",
+    dependencies=[Depends(get_current_user), Depends(_require_analytics)]
+)
+def get_unique_visitors(request: Request, short_key: str, hours: int = _analytics_hours):
+    unique_visitors, relative_error = click_analytics_reader.unique_visitors(short_key, hours)
+    return schemas.UniqueVisitorsResponse(
+        link=f"{str(request.base_url).rstrip('/')}/{short_key}",
+        hours=hours,
+        unique_visitors=unique_visitors,
+        relative_error=relative_error,
+    )
+
+
+def _stats_cursor_after_id(cursor: str) -> int:
+    after_id = decode_cursor(cursor).get("stats_after_id")
+    if not isinstance(after_id, int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return after_id
+
+
+def _stream_stats_ndjson(base_url: str, limit: int | None, after_id: int | None, top: int | None) -> Iterator[str]:
+    # Синхронный генератор: StreamingResponse читает его в threadpool, строки идут
+    # из серверного курсора по мере отправки, не накапливаясь в памяти.
+    with standalone_url_use_cases() as use_cases:
+        for stat in use_cases.iter_url_stats(limit=limit, after_id=after_id, top=top):
+            yield json.dumps({
+                "link": f"{base_url}/{stat.key}",
+                "orig_link": stat.target_url,
+                "last_hour_clicks": stat.last_hour_clicks,
+                "last_day_clicks": stat.last_day_clicks,
+            }) + "\n"
@@ -4,6 +4,8 @@ from datetime import datetime
 
 class URLCreate(BaseModel):
     target_url: HttpUrl = Field(..., example="https://example.com/very/long/path?with=arguments")
+    # False — редирект по ссылке не кэшируется браузерами и CDN (Cache-Control: no-store)
+    cacheable: bool = True
 
 
 class URLInfo(BaseModel):
@@ -12,15 +14,106 @@ class URLInfo(BaseModel):
     secret_key: str = Field(..., example="shortkey_secretpart")
 
 
+class URLBatchCreate(BaseModel):
+    # Адреса валидируются поштучно в эндпоинте, чтобы ошибка в одном не отклоняла весь пакет
+    target_urls: list[str] = Field(..., min_length=1, example=["https://example.com/a", "https://example.com/b"])
+
+
+class URLBatchItem(BaseModel):
+    index: int
+    url: URLInfo | None = None
+    error: str | None = None
+
+
+class URLBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[URLBatchItem]
+
+
 class URLDetails(BaseModel):
     link: str = Field(..., example="http://localhost:8000/shortkey")
     orig_link: HttpUrl = Field(..., example="https://example.com/very/long/path?with=arguments")
     is_active: bool
     expires_at: datetime
+    cacheable: bool
 
 
 class URLStatsResponse(BaseModel):
     link: str = Field(..., example="http://localhost:8000/shortkey")
     orig_link: HttpUrl = Field(..., example="https://example.com/very/long/path?with=arguments")
     last_hour_clicks: int
-    last_day_clicks: int
\ No newline at end of file
+    last_day_clicks: int
+
+
+class UniqueVisitorsResponse(BaseModel):
+    link: str = Field(..., example="http://localhost:8000/shortkey")
+    hours: int
+    unique_visitors: int
+    # Относительная погрешность оценки HyperLogLog (стандартное отклонение)
+    relative_error: float
+
+
+class HeavyHitterResponse(BaseModel):
+    value: str = Field(..., example="news.ycombinator.com")
+    clicks: int
+    # Насколько clicks может превышать истинное число кликов
+    max_overcount: int
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool
+    hit_rate: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+    size: int
+    max_size: int
+
+
+class AuthCacheStatsResponse(BaseModel):
+    credentials: CacheStatsResponse
+    users: CacheStatsResponse
+
+
+class ClickBufferStatsResponse(BaseModel):
+    enabled: bool
+    queue_depth: int
+    capacity: int
+    enqueued: int
+    dropped: int
+    flushed: int
+    flushes: int
+    failed_flushes: int
+    last_flush_seconds: float
+    max_flush_seconds: float
+    total_flush_seconds: float
+
+
+class PoolStatsResponse(BaseModel):
+    name: str
+    size: int
+    max_overflow: int
+    timeout_seconds: float
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+
+class KeyFilterStatsResponse(BaseModel):
+    enabled: bool
+    ready: bool
+    capacity: int
+    fp_rate: float
+    size_bytes: int
+    hashes: int
+    keys: int
+    estimated_fp_rate: float
+    last_id: int
+    last_rebuild_seconds: float
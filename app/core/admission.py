@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class ConcurrencyLimiter:
+    """Не больше limit одновременных запросов, остальные ждут в очереди до max_wait секунд.
+
+    Работает в event loop. acquire возвращает исход: "admitted" (место было свободно),
+    "queued" (место освободилось за время ожидания), "queue_full" или "deadline" —
+    запрос нужно отклонить. Освободившееся место передаётся первому ожидающему.
+    """
+
+    def __init__(self, limit: int, queue_size: int, max_wait: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> str:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return "admitted"
+        if len(self._waiters) >= self.queue_size or self.max_wait <= 0:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.max_wait):
+                await waiter
+            return "queued"
+        except TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return "queued"
+            self._discard(waiter)
+            return "deadline"
+        except asyncio.CancelledError:
+            # Клиент ушёл: уже переданное место отдаём следующему
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class TokenBucket:
+    """Запас токенов одного клиента на момент updated_at."""
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated_at = now
+
+
+class RateLimiter:
+    """Token bucket на каждый ключ клиента; хранится не больше max_clients давно активных ключей."""
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str, now: float | None = None) -> float:
+        """0 — запрос разрешён, иначе через сколько секунд появится токен."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.burst, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate)
+                bucket.updated_at = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / self.rate
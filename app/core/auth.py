@@ -1,4 +1,8 @@
+import hashlib
+import hmac
+import secrets
 from passlib.context import CryptContext
+from .cache import TTLCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -8,4 +12,32 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+class CredentialCache:
+    """Кэш успешных проверок пароля, чтобы не выполнять bcrypt на каждый запрос.
+
+    Ключ записи — HMAC-SHA256 от (username, password) на случайном секрете процесса,
+    так что пароль в открытом виде в памяти не хранится. Запись помнит хеш, с которым
+    пароль был проверен, и перестаёт совпадать после смены пароля. Неудачные проверки
+    не кэшируются: подбор пароля по-прежнему упирается в bcrypt.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._secret = secrets.token_bytes(32)
+        self.cache: TTLCache[bytes, str] = TTLCache(max_size=max_size, ttl=ttl)
+
+    def _digest(self, username: str, password: str) -> bytes:
+        message = f"{len(username)}:{username}{password}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def verify(self, username: str, password: str, hashed_password: str) -> bool:
+        digest = self._digest(username, password)
+        cached_hash = self.cache.get(digest)
+        if cached_hash is not None and hmac.compare_digest(cached_hash, hashed_password):
+            return True
+        if not verify_password(password, hashed_password):
+            return False
+        self.cache.set(digest, hashed_password)
+        return True
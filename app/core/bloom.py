@@ -0,0 +1,68 @@
+import hashlib
+import math
+import threading
+
+
+def optimal_parameters(capacity: int, fp_rate: float) -> tuple[int, int]:
+    """Число бит и хеш-функций фильтра на capacity элементов с долей ложных срабатываний fp_rate.
+
+    Для 10^8 ключей: fp_rate=0.01 — 958 505 838 бит (≈114 МиБ), 7 хешей;
+    fp_rate=0.001 — 1 437 758 757 бит (≈171 МиБ), 10 хешей.
+    """
+    bits = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """Фильтр Блума по строкам: «точно нет» или «возможно есть».
+
+    Позиции бит получаются двойным хешированием из одного blake2b-дайджеста.
+    Чтение идёт без блокировки: бит, выставленный параллельной вставкой, ещё может
+    быть не виден, но установленные биты никогда не сбрасываются.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.size_bits, self.hashes = optimal_parameters(capacity, fp_rate)
+        self._bits = bytearray((self.size_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hashes)]
+
+    def add(self, item: str) -> bool:
+        """Добавляет элемент; False, если все его биты уже стояли.
+
+        count растёт только при изменении фильтра: повторная вставка ключа его не
+        завышает (новый ключ, совпавший по всем битам, тоже не считается).
+        """
+        positions = self._positions(item)
+        changed = False
+        # |= над байтом — чтение и запись; без блокировки параллельные вставки теряли бы биты
+        with self._lock:
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self._bits[position >> 3] & mask:
+                    self._bits[position >> 3] |= mask
+                    changed = True
+            if changed:
+                self.count += 1
+        return changed
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def estimated_fp_rate(self) -> float:
+        """Ожидаемая доля ложных срабатываний при текущем числе вставок."""
+        return (1 - math.exp(-self.hashes * self.count / self.size_bits)) ** self.hashes
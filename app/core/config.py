@@ -1,11 +1,249 @@
+from typing import Literal
+from pydantic import field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+def asyncpg_url(url: str) -> str:
+    """Тот же адрес PostgreSQL с драйвером asyncpg; остальные URL не меняются."""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgresql"):
+        scheme = "postgresql+asyncpg"
+    return f"{scheme}://{rest}"
+
+
 class Settings(BaseSettings):
     DEFAULT_EXPIRATION_DAYS: int = 1
     DATABASE_URL: str
     TEST_DATABASE_URL: str
 
+    # Хранилище ссылок и пользователей: postgres или memory (данные живут в памяти процесса
+    # до перезапуска — для нагрузочных тестов без БД и короткоживущих кампаний). В режиме
+    # memory пользователь API задаётся через MEMORY_ADMIN_USERNAME/MEMORY_ADMIN_PASSWORD.
+    STORAGE_BACKEND: Literal["postgres", "memory"] = "postgres"
+    MEMORY_CLICK_CAPACITY: int = 1_000_000
+    MEMORY_ADMIN_USERNAME: str | None = None
+    MEMORY_ADMIN_PASSWORD: str | None = None
+
+    # Выделение коротких ключей:
+    #   check       — SELECT на занятость перед каждой вставкой (прежнее поведение);
+    #   on_conflict — случайный ключ, INSERT ... ON CONFLICT DO NOTHING и повтор;
+    #   sequence    — base62 от номеров из url_key_seq, резервируемых блоками (PostgreSQL).
+    KEY_ALLOCATION_STRATEGY: Literal["check", "on_conflict", "sequence"] = "check"
+    KEY_SEQUENCE_BLOCK_SIZE: int = 1000
+
+    # Максимальный размер пакета в POST /api/v1/urls/batch
+    MAX_BATCH_SIZE: int = 1000
+
+    # Потоковая выгрузка /api/v1/export и scripts/export_data.py: строк на порцию
+    # серверного курсора и одновременных выгрузок на процесс (каждая держит соединение пула).
+    EXPORT_BATCH_SIZE: int = 10_000
+    EXPORT_MAX_CONCURRENT: int = 2
+
+    # Размер бакета таблицы click_rollups. Статистика за час/день считается с точностью
+    # до бакета; при смене значения старые бакеты остаются корректными для сумм.
+    CLICK_ROLLUP_BUCKET_SECONDS: int = 60
+    # Бакеты старше CLICK_ROLLUP_RETENTION_HOURS удаляются фоновым потоком (None — хранить всё).
+    # Значения меньше 24 часов не применяются: статистика за день читает последние сутки.
+    CLICK_ROLLUP_RETENTION_HOURS: int | None = 48
+    CLICK_ROLLUP_PRUNE_INTERVAL_SECONDS: float = 3600.0
+
+    # Кэш проверки Basic-авторизации (результаты bcrypt и пользователи по username)
+    AUTH_CACHE_ENABLED: bool = False
+    AUTH_CACHE_MAX_SIZE: int = 1024
+    AUTH_CACHE_TTL_SECONDS: int = 60
+
+    # Контроль допуска: редиректы и создание ссылок ограничены числом одновременных запросов
+    # (0 — без ограничения). Сверх лимита запрос ждёт в очереди до *_QUEUE_SIZE мест не дольше
+    # *_MAX_WAIT_SECONDS, иначе сразу получает 503 с Retry-After. Лимит создания стоит держать
+    # не выше DB_POOL_SIZE + DB_MAX_OVERFLOW. Запросы к /api/v1/urls дополнительно ограничены
+    # token bucket на учётные данные: RATE_LIMIT_PER_SECOND запросов в секунду с запасом
+    # RATE_LIMIT_BURST (429 с Retry-After). Заголовок Authorization до аутентификации не
+    # проверен, поэтому запросы сначала расходуют корзину адреса клиента
+    # (RATE_LIMIT_ADDRESS_PER_SECOND, RATE_LIMIT_ADDRESS_BURST): она общая для всех
+    # учётных данных с адреса и для запросов без них, лимиты выше — за NAT сидят многие.
+    ADMISSION_ENABLED: bool = False
+    ADMISSION_REDIRECT_CONCURRENCY: int = 64
+    ADMISSION_REDIRECT_QUEUE_SIZE: int = 256
+    ADMISSION_REDIRECT_MAX_WAIT_SECONDS: float = 0.5
+    ADMISSION_CREATE_CONCURRENCY: int = 8
+    ADMISSION_CREATE_QUEUE_SIZE: int = 32
+    ADMISSION_CREATE_MAX_WAIT_SECONDS: float = 1.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_PER_SECOND: float = 10.0
+    RATE_LIMIT_BURST: int = 20
+    RATE_LIMIT_ADDRESS_PER_SECOND: float = 50.0
+    RATE_LIMIT_ADDRESS_BURST: int = 100
+    RATE_LIMIT_MAX_CLIENTS: int = 10_000
+
+    # Метрики в формате Prometheus на GET /metrics (маршруты, время запросов к БД, редиректы)
+    METRICS_ENABLED: bool = False
+
+    # Дневные партиции click_events (PostgreSQL): создаются на CLICK_PARTITION_DAYS_AHEAD
+    # дней вперёд; партиции старше CLICK_RETENTION_DAYS удаляются целиком, а такие же старые
+    # клики из click_events_default — DELETE (None — хранить всё).
+    # Статистика читает click_rollups, поэтому срок хранения сырых кликов на неё не влияет.
+    # Требует миграции 0005; на неразбитой таблице обслуживание пропускается с предупреждением.
+    CLICK_PARTITION_MAINTENANCE_ENABLED: bool = False
+    CLICK_PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 3600.0
+    CLICK_PARTITION_DAYS_AHEAD: int = 7
+    CLICK_RETENTION_DAYS: int | None = None
+
+    # Фоновая деактивация истёкших ссылок (держит частичные индексы листинга active_only
+    # и поиска истёкших компактными). Без неё можно запускать scripts/sweep_expired.py по расписанию.
+    SWEEPER_ENABLED: bool = False
+    SWEEPER_INTERVAL_SECONDS: float = 60.0
+    SWEEPER_BATCH_SIZE: int = 1000
+    SWEEPER_MAX_BATCHES_PER_RUN: int = 100
+
+    # Пул соединений. Основной пул обслуживает запросы (и async-движок в async-режиме),
+    # фоновый — сброс буфера кликов. DB_POOL_RECYCLE_SECONDS=-1 отключает пересоздание.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_BACKGROUND_POOL_SIZE: int = 2
+
+    # Реплики PostgreSQL только для чтения, URL через запятую. На них уходят поиск по ключу,
+    # список ссылок и статистика (в async-режиме — через async-движки реплик), а также
+    # выгрузки. Реплика с отставанием
+    # больше DB_REPLICA_MAX_LAG_SECONDS или недоступная исключается до следующей проверки
+    # раз в DB_REPLICA_CHECK_INTERVAL_SECONDS. Ключи, записанные процессом за последние
+    # DB_REPLICA_MAX_LAG_SECONDS, и промахи по ключу на реплике читаются с primary, так что
+    # запросы несуществующих ключей primary не разгружают. Реплика без потоковой
+    # репликации (pg_stat_wal_receiver не в статусе streaming) считается недоступной:
+    # роли проверки нужен pg_monitor, иначе статус не виден и реплики не используются.
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 2.0
+
+    # Асинхронный стек (async-движок SQLAlchemy + asyncpg). SQL по-прежнему описан в
+    # синхронных репозиториях и выполняется через AsyncSession.run_sync, поэтому декораторы
+    # репозитория работают в потоке event loop. Допустимы только неблокирующие: локальный
+    # кэш и фильтр ключей (короткие блокировки в памяти), индекс ключей (чтение mmap из
+    # tmpfs). Общий кэш ходит в Redis синхронным клиентом и вместе с async-режимом запрещён.
+    DB_ASYNC_ENABLED: bool = False
+    ASYNC_DATABASE_URL: str | None = None
+
+    # Кэш редиректов в памяти процесса
+    URL_CACHE_ENABLED: bool = False
+    URL_CACHE_MAX_SIZE: int = 10_000
+    URL_CACHE_TTL_SECONDS: int = 60
+
+    # Ответ на переход по короткой ссылке. REDIRECT_CACHE_MAX_AGE_SECONDS > 0 разрешает
+    # браузерам и CDN кэшировать редирект (не дольше срока действия ссылки и только для
+    # ссылок с cacheable=True); деактивация не отзывает уже закэшированные ответы.
+    # Повторные переходы из кэша до сервиса не доходят: REDIRECT_MODE=beacon отдаёт
+    # кэшируемую HTML-страницу, которая учитывает клик запросом POST /{key}/click.
+    REDIRECT_STATUS_CODE: int = 307
+    REDIRECT_CACHE_MAX_AGE_SECONDS: int = 0
+    REDIRECT_CACHE_VALIDATORS: bool = False
+    REDIRECT_MODE: Literal["redirect", "beacon"] = "redirect"
+
+    # Прогрев кэшей редиректов при старте: CACHE_WARMUP_TOP_N самых кликаемых за
+    # CACHE_WARMUP_WINDOW_SECONDS ссылок. До окончания прогрева (не дольше бюджета)
+    # GET /health/ready отвечает 503.
+    CACHE_WARMUP_ENABLED: bool = False
+    CACHE_WARMUP_TOP_N: int = 1000
+    CACHE_WARMUP_WINDOW_SECONDS: int = 3600
+    CACHE_WARMUP_TIME_BUDGET_SECONDS: float = 10.0
+
+    # Фильтр Блума по ключам urls: редирект на точно несуществующий ключ отвечает 404 без
+    # обращения к кэшам и БД. Строится в фоне при старте, ключи других процессов дочитываются
+    # раз в KEY_FILTER_REFRESH_INTERVAL_SECONDS — до этого их редиректы отвечают 404.
+    # Память: ~1.2 байта на ключ при KEY_FILTER_FP_RATE=0.01 (10^8 ключей — ≈114 МиБ).
+    KEY_FILTER_ENABLED: bool = False
+    KEY_FILTER_CAPACITY: int = 10_000_000
+    KEY_FILTER_FP_RATE: float = 0.01
+    KEY_FILTER_REFRESH_INTERVAL_SECONDS: float = 1.0
+    KEY_FILTER_REBUILD_BATCH_SIZE: int = 10_000
+
+    # Аналитика кликов на скетчах постоянного размера (app/core/sketches.py): уникальные
+    # посетители ссылки (HyperLogLog по хешу IP и User-Agent с солью ANALYTICS_VISITOR_SALT),
+    # top-K ссылок, доменов-источников и семейств браузеров (space-saving + count-min).
+    # Скетчи копятся в процессе и раз в ANALYTICS_FLUSH_INTERVAL_SECONDS сливаются в
+    # click_sketches по окнам ANALYTICS_WINDOW_SECONDS. Память процесса — не больше
+    # ANALYTICS_MAX_TRACKED_LINKS × 2^ANALYTICS_HLL_PRECISION байт между сбросами.
+    # Соль обязательна при включённой аналитике и должна быть общей для всех экземпляров:
+    # иначе один посетитель считается разными.
+    ANALYTICS_ENABLED: bool = False
+    ANALYTICS_WINDOW_SECONDS: int = 3600
+    ANALYTICS_RETENTION_HOURS: int = 168
+    ANALYTICS_FLUSH_INTERVAL_SECONDS: float = 10.0
+    ANALYTICS_HLL_PRECISION: int = 12
+    ANALYTICS_TOP_K: int = 100
+    ANALYTICS_CMS_WIDTH: int = 2048
+    ANALYTICS_CMS_DEPTH: int = 4
+    ANALYTICS_MAX_TRACKED_LINKS: int = 2000
+    ANALYTICS_VISITOR_SALT: str | None = None
+
+    # Общий для воркеров хоста индекс ключ → ссылка в файле KEY_INDEX_PATH (mmap, лучше на
+    # tmpfs). Файл пересобирает scripts/build_key_index.py; снимок старше
+    # KEY_INDEX_MAX_AGE_SECONDS игнорируется. Промах индекса уходит в БД: новых ключей в
+    # снимке нет. Деактивация в другом воркере видна после следующей пересборки.
+    KEY_INDEX_ENABLED: bool = False
+    KEY_INDEX_PATH: str = "/dev/shm/url-shortener-keys.idx"
+    KEY_INDEX_MAX_AGE_SECONDS: float = 120.0
+    KEY_INDEX_CHECK_INTERVAL_SECONDS: float = 1.0
+
+    # Общий для узлов кэш ключ → ссылка в Redis (pip install .[redis]). Промахи локального
+    # кэша всех узлов сходятся в один запрос к БД на ключ; деактивация ссылки рассылается
+    # узлам через канал SHARED_CACHE_CHANNEL. Клиент Redis синхронный, поэтому с
+    # DB_ASYNC_ENABLED общий кэш не включается.
+    SHARED_CACHE_ENABLED: bool = False
+    SHARED_CACHE_URL: str = "redis://localhost:6379/0"
+    SHARED_CACHE_TTL_SECONDS: int = 300
+    SHARED_CACHE_MISSING_TTL_SECONDS: int = 5
+    SHARED_CACHE_LOCK_TTL_SECONDS: float = 2.0
+    SHARED_CACHE_LOCK_WAIT_SECONDS: float = 1.0
+    SHARED_CACHE_SOCKET_TIMEOUT_SECONDS: float = 0.1
+    SHARED_CACHE_CHANNEL: str = "url-invalidations"
+
+    # Отложенная пакетная запись кликов (write-behind).
+    # Политика "block" ждёт места в очереди до CLICK_BUFFER_BLOCK_TIMEOUT_SECONDS;
+    # в асинхронном режиме это ожидание блокировало бы event loop, поэтому вместе с
+    # DB_ASYNC_ENABLED она запрещена.
+    CLICK_BUFFER_ENABLED: bool = False
+    CLICK_BUFFER_MAX_SIZE: int = 100_000
+    CLICK_BUFFER_BATCH_SIZE: int = 1_000
+    CLICK_BUFFER_FLUSH_INTERVAL_SECONDS: float = 1.0
+    CLICK_BUFFER_DROP_POLICY: Literal["drop_newest", "drop_oldest", "block"] = "drop_newest"
+    CLICK_BUFFER_BLOCK_TIMEOUT_SECONDS: float = 0.05
+
+    @field_validator("REDIRECT_STATUS_CODE")
+    @classmethod
+    def _check_redirect_status(cls, value: int) -> int:
+        if value not in (301, 302, 307, 308):
+            raise ValueError("REDIRECT_STATUS_CODE must be one of 301, 302, 307, 308")
+        return value
+
+    @model_validator(mode="after")
+    def _check_event_loop_blocking(self) -> "Settings":
+        if self.DB_ASYNC_ENABLED and self.CLICK_BUFFER_ENABLED and self.CLICK_BUFFER_DROP_POLICY == "block":
+            raise ValueError(
+                'CLICK_BUFFER_DROP_POLICY="block" would stall the event loop; use drop_newest or drop_oldest '
+                "with DB_ASYNC_ENABLED"
+            )
+        if self.DB_ASYNC_ENABLED and self.SHARED_CACHE_ENABLED:
+            raise ValueError("SHARED_CACHE_ENABLED uses a blocking Redis client and cannot be combined with DB_ASYNC_ENABLED")
+        return self
+
+    @model_validator(mode="after")
+    def _check_analytics_salt(self) -> "Settings":
+        if self.ANALYTICS_ENABLED and not self.ANALYTICS_VISITOR_SALT:
+            raise ValueError("ANALYTICS_VISITOR_SALT must be set to a secret value when ANALYTICS_ENABLED is on")
+        return self
+
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def async_database_url(self) -> str:
+        """URL для async-движка; по умолчанию DATABASE_URL с драйвером asyncpg."""
+        return self.ASYNC_DATABASE_URL or asyncpg_url(self.DATABASE_URL)
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
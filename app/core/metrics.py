@@ -0,0 +1,219 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [счётчики по бакетам (последний — +Inf), сумма, количество]
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._values.get(labels)
+        return series[2] if series else 0
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items())
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus (exposition format 0.0.4)."""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"),
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"),
+))
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled.", ("method",),
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_repository_duration_seconds", "Time spent in URL repository methods hitting the DB.", ("method",),
+))
+REDIRECTS = REGISTRY.register(Counter(
+    "redirects_total", "Redirect lookups by outcome.", ("outcome",),
+))
+EXPIRED_LINKS_DEACTIVATED = REGISTRY.register(Counter(
+    "expired_links_deactivated_total", "Expired links deactivated by the sweeper.",
+))
+SHARED_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "shared_cache_lookups_total",
+    "Shared cache lookups by outcome (hit, miss, invalidated, wait_hit, wait_timeout, wait_skipped, error).",
+    ("outcome",),
+))
+KEY_FILTER_LOOKUPS = REGISTRY.register(Counter(
+    "key_filter_lookups_total", "Bloom filter checks of short keys by result (rejected, passed).", ("result",),
+))
+KEY_FILTER_REBUILDS = REGISTRY.register(Counter(
+    "key_filter_rebuilds_total", "Full Bloom filter rebuilds from the urls table by status.", ("status",),
+))
+KEY_FILTER_REBUILD_DURATION = REGISTRY.register(Histogram(
+    "key_filter_rebuild_duration_seconds", "Time to rebuild the Bloom filter from the urls table.",
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+))
+KEY_FILTER_KEYS = REGISTRY.register(Gauge(
+    "key_filter_keys", "Keys inserted into the current Bloom filter.",
+))
+KEY_INDEX_LOOKUPS = REGISTRY.register(Counter(
+    "key_index_lookups_total",
+    "Shared key index lookups by outcome (hit, miss, stale, unavailable, forgotten).", ("outcome",),
+))
+ANALYTICS_FLUSHES = REGISTRY.register(Counter(
+    "click_analytics_flushes_total", "Click sketch flushes to the sketch store by status.", ("status",),
+))
+ANALYTICS_UNTRACKED_CLICKS = REGISTRY.register(Counter(
+    "click_analytics_untracked_clicks_total",
+    "Clicks left out of unique-visitor sketches because ANALYTICS_MAX_TRACKED_LINKS was reached.",
+))
+DB_ROUTED_READS = REGISTRY.register(Counter(
+    "db_routed_reads_total", "Repository reads by target database (primary, replicaN) and operation.",
+    ("target", "operation"),
+))
+DB_REPLICA_FALLBACKS = REGISTRY.register(Counter(
+    "db_replica_fallbacks_total",
+    "Replica reads redirected to the primary by reason (recent_write, miss, error).", ("reason",),
+))
+DB_REPLICA_LAG = REGISTRY.register(Gauge(
+    "db_replica_lag_seconds", "Last measured replication lag per replica (-1 when unreachable).", ("replica",),
+))
+ADMISSION_DECISIONS = REGISTRY.register(Counter(
+    "admission_decisions_total",
+    "Admission control decisions by route class and outcome (admitted, queued, queue_full, deadline).",
+    ("route", "outcome"),
+))
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "admission_in_flight", "Admitted requests currently being handled by route class.", ("route",),
+))
+ADMISSION_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "admission_queue_wait_seconds", "Time queued requests waited for an admission slot.", ("route",),
+))
+RATE_LIMITED_REQUESTS = REGISTRY.register(Counter(
+    "rate_limited_requests_total", "Requests to /api/v1/urls rejected by the rate limiter (address or credential).",
+    ("limit",),
+))
+CACHE_WARMUP_KEYS = REGISTRY.register(Gauge(
+    "cache_warmup_keys", "Keys preloaded into redirect caches at startup.",
+))
+CACHE_WARMUP_DURATION = REGISTRY.register(Gauge(
+    "cache_warmup_duration_seconds", "Duration of the startup cache warm-up.",
+))
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import math
+import struct
+from array import array
+
+
+def _hash64(item: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """Оценка числа уникальных элементов в 2^precision байтах памяти.
+
+    Относительная ошибка ≈ 1.04 / sqrt(2^precision): 1.6% при precision=12 (4 КиБ).
+    Объединение двух скетчей (merge) даёт скетч объединения множеств.
+    """
+
+    def __init__(self, precision: int = 12, registers: bytes | None = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self._registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.size)
+
+    def add(self, item: bytes) -> None:
+        value = _hash64(item)
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Поправка для малых множеств: linear counting по пустым регистрам
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + bytes(self._registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(precision=data[0], registers=data[1:])
+
+
+class CountMinSketch:
+    """Частоты элементов в width × depth счётчиках; оценка не меньше истинной.
+
+    С вероятностью 1 - e^-depth завышение не превышает e / width от суммы всех счётчиков.
+    """
+
+    _HEADER = struct.Struct("<II")
+
+    def __init__(self, width: int = 2048, depth: int = 4, counters: array | None = None):
+        self.width = width
+        self.depth = depth
+        self._counters = counters if counters is not None else array("Q", bytes(8 * width * depth))
+        self.total = 0
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item: str, count: int = 1) -> None:
+        for position in self._positions(item):
+            self._counters[position] += count
+        self.total += count
+
+    def estimate(self, item: str) -> int:
+        return min(self._counters[position] for position in self._positions(item))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches of different shape")
+        for position, value in enumerate(other._counters):
+            if value:
+                self._counters[position] += value
+        self.total += other.total
+
+    def to_bytes(self) -> bytes:
+        counters = array("Q", self._counters)
+        counters.append(self.total)
+        return self._HEADER.pack(self.width, self.depth) + counters.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinSketch":
+        width, depth = cls._HEADER.unpack_from(data)
+        counters = array("Q")
+        counters.frombytes(data[cls._HEADER.size:])
+        total = counters.pop()
+        sketch = cls(width, depth, counters)
+        sketch.total = total
+        return sketch
+
+
+class SpaceSaving:
+    """Top-K самых частых элементов потока в capacity счётчиках (алгоритм Space-Saving).
+
+    Счётчик элемента завышен не больше чем на его error; элемент с частотой выше
+    total / capacity гарантированно присутствует в выдаче.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._counts: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        self.total = 0
+
+    def add(self, item: str, count: int = 1) -> None:
+        self.total += count
+        if item in self._counts:
+            self._counts[item] += count
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[item] = count
+            self._errors[item] = 0
+            return
+        # Вытесняется элемент с минимальным счётчиком, новый наследует его как погрешность
+        victim = min(self._counts, key=self._counts.__getitem__)
+        floor = self._counts.pop(victim)
+        del self._errors[victim]
+        self._counts[item] = floor + count
+        self._errors[item] = floor
+
+    def top(self, limit: int | None = None) -> list[tuple[str, int, int]]:
+        """(элемент, счётчик, максимальное завышение) по убыванию счётчика."""
+        items = sorted(self._counts.items(), key=lambda pair: pair[1], reverse=True)[:limit]
+        return [(item, count, self._errors[item]) for item, count in items]
+
+    def _floor(self) -> int:
+        """Максимальная частота элемента, которого нет среди счётчиков."""
+        return min(self._counts.values()) if len(self._counts) >= self.capacity else 0
+
+    def merge(self, other: "SpaceSaving") -> None:
+        # Элемент, отсутствующий в одной из сводок, мог встречаться в ней до её минимального счётчика
+        floor, other_floor = self._floor(), other._floor()
+        for item in self._counts.keys() | other._counts.keys():
+            self._counts[item] = self._counts.get(item, floor) + other._counts.get(item, other_floor)
+            self._errors[item] = self._errors.get(item, floor) + other._errors.get(item, other_floor)
+        self.total += other.total
+        if len(self._counts) > self.capacity:
+            for item, _, _ in self.top()[self.capacity:]:
+                del self._counts[item]
+                del self._errors[item]
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({
+            "capacity": self.capacity,
+            "total": self.total,
+            "items": [[item, count, error] for item, count, error in self.top()],
+        }, separators=(",", ":")).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpaceSaving":
+        payload = json.loads(data)
+        sketch = cls(payload["capacity"])
+        sketch.total = payload["total"]
+        for item, count, error in payload["items"]:
+            sketch._counts[item] = count
+            sketch._errors[item] = error
+        return sketch
@@ -2,14 +2,16 @@ from dataclasses import dataclass, field
 from datetime import datetime
 
 
-@dataclass
+# slots=True: без __dict__ у каждого экземпляра — меньше памяти на сущность в кэшах
+# и быстрее создание при чтении из БД
+@dataclass(slots=True)
 class ClickEvent:
     id: int | None
     url_id: int
     timestamp: datetime = field(default_factory=datetime.utcnow)
 
 
-@dataclass
+@dataclass(slots=True)
 class URL:
     id: int | None
     key: str
@@ -17,6 +19,9 @@ class URL:
     target_url: str
     is_active: bool = True
     expires_at: datetime = field(default_factory=datetime.utcnow)
+    # False запрещает браузерам и CDN кэшировать редирект по этой ссылке
+    cacheable: bool = True
+    created_at: datetime | None = None
     
     def is_expired(self) -> bool:
         return self.expires_at < datetime.utcnow()
@@ -25,14 +30,14 @@ class URL:
         self.is_active = False
 
 
-@dataclass
+@dataclass(slots=True)
 class URLStats(URL):
     """Сущность для представления статистики"""
     last_hour_clicks: int = 0
     last_day_clicks: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: int | None
     username: str
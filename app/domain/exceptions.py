@@ -0,0 +1,2 @@
+class KeyAllocationError(Exception):
+    """Не удалось подобрать свободный короткий ключ за отведённое число попыток."""
@@ -0,0 +1,70 @@
+import threading
+from collections import deque
+from typing import Iterable, Protocol, runtime_checkable
+import nanoid
+
+KEY_SIZE = 10
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_KEY_SPACE = 62 ** KEY_SIZE
+# Взаимно просто с 62**10, поэтому умножение по модулю — биекция на пространстве ключей
+_KEY_MULTIPLIER = 489040662768411437
+
+
+def encode_base62(number: int, width: int = KEY_SIZE) -> str:
+    chars = []
+    for _ in range(width):
+        number, rem = divmod(number, 62)
+        chars.append(BASE62_ALPHABET[rem])
+    return "".join(reversed(chars))
+
+
+def sequence_key(number: int) -> str:
+    """Ключ для номера из последовательности: уникален для разных номеров < 62**10."""
+    return encode_base62(number * _KEY_MULTIPLIER % _KEY_SPACE)
+
+
+class KeyAllocator(Protocol):
+    """Источник ключей новых ссылок; take возвращает None, когда зарезервированные номера кончились."""
+
+    def take(self) -> str | None: ...
+
+
+@runtime_checkable
+class RefillableKeyAllocator(KeyAllocator, Protocol):
+    """Аллокатор, выдающий ключи из номеров, зарезервированных в хранилище блоками."""
+
+    block_size: int
+
+    def refill(self, ids: Iterable[int]) -> None: ...
+
+
+class RandomKeyAllocator:
+    """Случайные nanoid-ключи; уникальность обеспечивает вставка с ON CONFLICT и повтор."""
+
+    def take(self) -> str:
+        return nanoid.generate(size=KEY_SIZE)
+
+
+class SequenceKeyAllocator:
+    """Ключи из блоков номеров, заранее зарезервированных в последовательности БД.
+
+    Блок из block_size номеров резервируется одним запросом, после чего ключи
+    выдаются без обращений к БД. Номера перемешиваются обратимым умножением,
+    поэтому соседние ключи не идут подряд и не перебираются инкрементом.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._ids: deque[int] = deque()
+        self._lock = threading.Lock()
+
+    def take(self) -> str | None:
+        """Возвращает ключ или None, если блок исчерпан и нужен refill."""
+        with self._lock:
+            if not self._ids:
+                return None
+            return sequence_key(self._ids.popleft())
+
+    def refill(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            self._ids.extend(ids)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from .entities import URL, User, URLStats
 
 
@@ -7,6 +7,23 @@ class AbstractURLRepository(ABC):
     @abstractmethod
     def add(self, url: URL) -> URL: ...
     
+    def add_if_key_free(self, url: URL) -> Optional[URL]:
+        """Добавляет ссылку, если её ключ свободен; иначе возвращает None.
+
+        Реализация по умолчанию не атомарна; хранилища с ON CONFLICT переопределяют её.
+        """
+        if self.get_by_key(url.key):
+            return None
+        return self.add(url)
+
+    def add_many(self, urls: List[URL]) -> List[Optional[URL]]:
+        """Пакетная вставка; для ссылок с уже занятым ключом в ответе None (порядок сохраняется)."""
+        return [self.add_if_key_free(url) for url in urls]
+
+    @abstractmethod
+    def reserve_key_ids(self, count: int) -> List[int]:
+        """Резервирует count уникальных номеров для генерации ключей."""
+
     @abstractmethod
     def get_by_key(self, key: str) -> Optional[URL]: ...
     
@@ -14,7 +31,7 @@ class AbstractURLRepository(ABC):
     def get_by_secret_key(self, secret_key: str) -> Optional[URL]: ...
     
     @abstractmethod
-    def get_all(self, skip: int, limit: int, active_only: bool) -> List[URL]: ...
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URL]: ...
     
     @abstractmethod
     def update(self, url: URL) -> URL: ...
@@ -23,7 +40,51 @@ class AbstractURLRepository(ABC):
     def log_click(self, url: URL): ...
 
     @abstractmethod
-    def get_stats(self) -> List[URLStats]: ...
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]: ...
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        """Потоковый вариант get_stats; реализации с серверными курсорами переопределяют его."""
+        yield from self.get_stats(limit=limit, after_id=after_id, top=top)
+
+
+class AbstractAsyncURLRepository(ABC):
+    @abstractmethod
+    async def add(self, url: URL) -> URL: ...
+
+    async def add_if_key_free(self, url: URL) -> Optional[URL]:
+        if await self.get_by_key(url.key):
+            return None
+        return await self.add(url)
+
+    async def add_many(self, urls: List[URL]) -> List[Optional[URL]]:
+        return [await self.add_if_key_free(url) for url in urls]
+
+    @abstractmethod
+    async def reserve_key_ids(self, count: int) -> List[int]: ...
+
+    @abstractmethod
+    async def get_by_key(self, key: str) -> Optional[URL]: ...
+
+    @abstractmethod
+    async def get_by_secret_key(self, secret_key: str) -> Optional[URL]: ...
+
+    @abstractmethod
+    async def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URL]: ...
+
+    @abstractmethod
+    async def update(self, url: URL) -> URL: ...
+
+    @abstractmethod
+    async def log_click(self, url: URL): ...
+
+    @abstractmethod
+    async def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]: ...
 
 
 class AbstractUserRepository(ABC):
@@ -1,36 +1,100 @@
 from datetime import datetime, timedelta
+from typing import Iterator
 import nanoid
 from .entities import URL, URLStats
-from .repositories import AbstractURLRepository
+from .exceptions import KeyAllocationError
+from .key_allocation import KEY_SIZE, KeyAllocator, RefillableKeyAllocator
+from .repositories import AbstractAsyncURLRepository, AbstractURLRepository
 from ..core.config import settings
+from ..core.metrics import REDIRECTS
+
+MAX_KEY_ATTEMPTS = 5
+
+
+def _new_url(key: str, target_url: str, cacheable: bool = True) -> URL:
+    secret_key = f"{key}_{nanoid.generate(size=10)}"
+    expires_at = datetime.utcnow() + timedelta(days=settings.DEFAULT_EXPIRATION_DAYS)
+    return URL(id=None, target_url=target_url, key=key, secret_key=secret_key, expires_at=expires_at, cacheable=cacheable)
+
+
+def _redirect_outcome(url: URL | None) -> str:
+    if not url:
+        return "not_found"
+    if not url.is_active:
+        return "inactive"
+    if url.is_expired():
+        return "expired"
+    return "hit"
 
 
 class URLUseCases:
-    def __init__(self, repo: AbstractURLRepository):
+    def __init__(self, repo: AbstractURLRepository, key_allocator: KeyAllocator | None = None):
         self.repo = repo
+        self.key_allocator = key_allocator
 
     def _generate_unique_key(self) -> str:
-        key = nanoid.generate(size=10)
+        key = nanoid.generate(size=KEY_SIZE)
         while self.repo.get_by_key(key):
-            key = nanoid.generate(size=10)
+            key = nanoid.generate(size=KEY_SIZE)
         return key
 
-    def create_url(self, target_url: str) -> URL:
-        key = self._generate_unique_key()
-        secret_key = f"{key}_{nanoid.generate(size=10)}"
-        expires_at = datetime.utcnow() + timedelta(days=settings.DEFAULT_EXPIRATION_DAYS)
-        new_url_entity = URL(id=None, target_url=target_url, key=key, secret_key=secret_key, expires_at=expires_at)
-        return self.repo.add(new_url_entity)
+    def _next_key(self) -> str:
+        key = self.key_allocator.take()
+        while key is None:
+            if not isinstance(self.key_allocator, RefillableKeyAllocator):
+                raise KeyAllocationError("Key allocator ran out of keys")
+            self.key_allocator.refill(self.repo.reserve_key_ids(self.key_allocator.block_size))
+            key = self.key_allocator.take()
+        return key
+
+    def create_url(self, target_url: str, cacheable: bool = True) -> URL:
+        if self.key_allocator is None:
+            key = self._generate_unique_key()
+            return self.repo.add(_new_url(key, target_url, cacheable))
+        for _ in range(MAX_KEY_ATTEMPTS):
+            url = self.repo.add_if_key_free(_new_url(self._next_key(), target_url, cacheable))
+            if url is not None:
+                return url
+        raise KeyAllocationError(f"No free key after {MAX_KEY_ATTEMPTS} attempts")
+
+    def _batch_key(self) -> str:
+        return self._next_key() if self.key_allocator is not None else nanoid.generate(size=KEY_SIZE)
+
+    def create_urls(self, target_urls: list[str]) -> list[URL | None]:
+        """Создаёт ссылки пачкой; None — для адресов, которым не удалось выделить ключ."""
+        results: list[URL | None] = [None] * len(target_urls)
+        pending = list(range(len(target_urls)))
+        for _ in range(MAX_KEY_ATTEMPTS):
+            if not pending:
+                break
+            created = self.repo.add_many([_new_url(self._batch_key(), target_urls[i]) for i in pending])
+            for index, url in zip(pending, created):
+                results[index] = url
+            pending = [index for index, url in zip(pending, created) if url is None]
+        return results
 
-    def find_and_process_url(self, key: str) -> URL | None:
+    def find_and_process_url(self, key: str, log_click: bool = True) -> URL | None:
+        # Один запрос по ключу: активность и срок действия проверяются здесь, заодно
+        # различая несуществующую и деактивированную ссылку для redirects_total
         url = self.repo.get_by_key(key)
-        if not url or not url.is_active or url.is_expired():
+        outcome = _redirect_outcome(url)
+        REDIRECTS.inc(outcome)
+        if outcome != "hit":
             return None
-        self.repo.log_click(url)
+        if log_click:
+            self.repo.log_click(url)
         return url
-        
-    def get_all_urls(self, skip: int, limit: int, active_only: bool) -> list[URL]:
-        return self.repo.get_all(skip=skip, limit=limit, active_only=active_only)
+
+    def register_click(self, key: str) -> bool:
+        """Учитывает клик, о котором сообщил клиент (beacon); False — ссылка не активна."""
+        url = self.repo.get_by_key(key)
+        if _redirect_outcome(url) != "hit":
+            return False
+        self.repo.log_click(url)
+        return True
+
+    def get_all_urls(self, skip: int, limit: int, active_only: bool, before_id: int | None = None) -> list[URL]:
+        return self.repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
 
     def deactivate_url(self, secret_key: str) -> URL | None:
         url = self.repo.get_by_secret_key(secret_key)
@@ -39,5 +103,86 @@ class URLUseCases:
         url.deactivate()
         return self.repo.update(url)
 
-    def get_url_stats(self) -> list[URLStats]:
-        return self.repo.get_stats()
\ No newline at end of file
+    def get_url_stats(self, limit: int | None = None, after_id: int | None = None, top: int | None = None) -> list[URLStats]:
+        return self.repo.get_stats(limit=limit, after_id=after_id, top=top)
+
+    def iter_url_stats(self, limit: int | None = None, after_id: int | None = None, top: int | None = None) -> Iterator[URLStats]:
+        return self.repo.iter_stats(limit=limit, after_id=after_id, top=top)
+
+
+class AsyncURLUseCases:
+    """Асинхронный вариант URLUseCases для работы поверх async-репозитория."""
+
+    def __init__(self, repo: AbstractAsyncURLRepository, key_allocator: KeyAllocator | None = None):
+        self.repo = repo
+        self.key_allocator = key_allocator
+
+    async def _generate_unique_key(self) -> str:
+        key = nanoid.generate(size=KEY_SIZE)
+        while await self.repo.get_by_key(key):
+            key = nanoid.generate(size=KEY_SIZE)
+        return key
+
+    async def _next_key(self) -> str:
+        key = self.key_allocator.take()
+        while key is None:
+            if not isinstance(self.key_allocator, RefillableKeyAllocator):
+                raise KeyAllocationError("Key allocator ran out of keys")
+            self.key_allocator.refill(await self.repo.reserve_key_ids(self.key_allocator.block_size))
+            key = self.key_allocator.take()
+        return key
+
+    async def create_url(self, target_url: str, cacheable: bool = True) -> URL:
+        if self.key_allocator is None:
+            key = await self._generate_unique_key()
+            return await self.repo.add(_new_url(key, target_url, cacheable))
+        for _ in range(MAX_KEY_ATTEMPTS):
+            url = await self.repo.add_if_key_free(_new_url(await self._next_key(), target_url, cacheable))
+            if url is not None:
+                return url
+        raise KeyAllocationError(f"No free key after {MAX_KEY_ATTEMPTS} attempts")
+
+    async def _batch_key(self) -> str:
+        return await self._next_key() if self.key_allocator is not None else nanoid.generate(size=KEY_SIZE)
+
+    async def create_urls(self, target_urls: list[str]) -> list[URL | None]:
+        results: list[URL | None] = [None] * len(target_urls)
+        pending = list(range(len(target_urls)))
+        for _ in range(MAX_KEY_ATTEMPTS):
+            if not pending:
+                break
+            created = await self.repo.add_many([_new_url(await self._batch_key(), target_urls[i]) for i in pending])
+            for index, url in zip(pending, created):
+                results[index] = url
+            pending = [index for index, url in zip(pending, created) if url is None]
+        return results
+
+    async def find_and_process_url(self, key: str, log_click: bool = True) -> URL | None:
+        url = await self.repo.get_by_key(key)
+        outcome = _redirect_outcome(url)
+        REDIRECTS.inc(outcome)
+        if outcome != "hit":
+            return None
+        if log_click:
+            await self.repo.log_click(url)
+        return url
+
+    async def register_click(self, key: str) -> bool:
+        url = await self.repo.get_by_key(key)
+        if _redirect_outcome(url) != "hit":
+            return False
+        await self.repo.log_click(url)
+        return True
+
+    async def get_all_urls(self, skip: int, limit: int, active_only: bool, before_id: int | None = None) -> list[URL]:
+        return await self.repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    async def deactivate_url(self, secret_key: str) -> URL | None:
+        url = await self.repo.get_by_secret_key(secret_key)
+        if not url or not url.is_active:
+            return None
+        url.deactivate()
+        return await self.repo.update(url)
+
+    async def get_url_stats(self, limit: int | None = None, after_id: int | None = None, top: int | None = None) -> list[URLStats]:
+        return await self.repo.get_stats(limit=limit, after_id=after_id, top=top)
@@ -0,0 +1,362 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+from urllib.parse import urlsplit
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.metrics import ANALYTICS_FLUSHES, ANALYTICS_UNTRACKED_CLICKS
+from app.core.sketches import CountMinSketch, HyperLogLog, SpaceSaving
+from . import models
+from .periodic import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# Виды скетчей в click_sketches. visitors ведётся по каждой ссылке, остальные — общие.
+VISITORS = "visitors"
+TOP_LINKS = "top_links"
+TOP_REFERRERS = "top_referrers"
+TOP_USER_AGENTS = "top_user_agents"
+LINK_COUNTS = "link_counts"
+REFERRER_COUNTS = "referrer_counts"
+
+SKETCH_TYPES = {
+    VISITORS: HyperLogLog,
+    TOP_LINKS: SpaceSaving,
+    TOP_REFERRERS: SpaceSaving,
+    TOP_USER_AGENTS: SpaceSaving,
+    LINK_COUNTS: CountMinSketch,
+    REFERRER_COUNTS: CountMinSketch,
+}
+
+# Измерения top-K и скетч count-min, уточняющий их счётчики
+DIMENSIONS = {
+    "links": (TOP_LINKS, LINK_COUNTS),
+    "referrers": (TOP_REFERRERS, REFERRER_COUNTS),
+    "user_agents": (TOP_USER_AGENTS, None),
+}
+
+MERGE_ATTEMPTS = 3
+MERGE_CHUNK_SIZE = 500
+
+# Порядок важен: Edge и Opera тоже пишут Chrome/ и Safari/ в User-Agent
+_USER_AGENT_FAMILIES = [
+    ("bot", re.compile(r"bot|crawl|spider|slurp|preview|facebookexternalhit", re.IGNORECASE)),
+    ("Edge", re.compile(r"Edg(e|A|iOS)?/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/")),
+    ("Chrome", re.compile(r"Chrome/|CriOS/")),
+    ("Safari", re.compile(r"Safari/")),
+    ("curl", re.compile(r"^curl/")),
+    ("script", re.compile(r"python|httpx|aiohttp|Go-http-client|okhttp|Java/|wget", re.IGNORECASE)),
+]
+
+SketchKey = tuple[str, str, datetime]
+_EPOCH = datetime(1970, 1, 1)
+
+
+def user_agent_family(user_agent: str | None) -> str:
+    if not user_agent:
+        return "unknown"
+    for family, pattern in _USER_AGENT_FAMILIES:
+        if pattern.search(user_agent):
+            return family
+    return "other"
+
+
+def referrer_host(referrer: str | None) -> str:
+    if not referrer:
+        return "direct"
+    try:
+        host = urlsplit(referrer).hostname
+    except ValueError:
+        host = None
+    return host or "unknown"
+
+
+def window_start(moment: datetime, window_seconds: int) -> datetime:
+    seconds = int((moment - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % window_seconds)
+
+
+class ClickAnalytics:
+    """Скетчи кликов процесса за текущие окна, ещё не записанные в хранилище.
+
+    IP клиента в скетчи не попадает: уникальность посетителя считается по хешу
+    IP и User-Agent с солью. HyperLogLog заводится не больше чем для max_tracked_links
+    ссылок между сбросами — память процесса ограничена независимо от трафика.
+    """
+
+    def __init__(
+        self,
+        window_seconds: int,
+        hll_precision: int,
+        top_k: int,
+        cms_width: int,
+        cms_depth: int,
+        max_tracked_links: int,
+        visitor_salt: str,
+    ):
+        self.window_seconds = window_seconds
+        self.hll_precision = hll_precision
+        self.top_k = top_k
+        self.cms_width = cms_width
+        self.cms_depth = cms_depth
+        self.max_tracked_links = max_tracked_links
+        self._salt = hashlib.blake2b(visitor_salt.encode(), digest_size=16).digest()
+        self._pending: dict[SketchKey, HyperLogLog | SpaceSaving | CountMinSketch] = {}
+        self._tracked_links = 0
+        self._lock = threading.Lock()
+
+    def new_sketch(self, kind: str):
+        sketch_type = SKETCH_TYPES[kind]
+        if sketch_type is HyperLogLog:
+            return HyperLogLog(self.hll_precision)
+        if sketch_type is CountMinSketch:
+            return CountMinSketch(self.cms_width, self.cms_depth)
+        return SpaceSaving(self.top_k)
+
+    def _sketch(self, kind: str, subject: str, window: datetime):
+        key = (kind, subject, window)
+        sketch = self._pending.get(key)
+        if sketch is None:
+            sketch = self._pending[key] = self.new_sketch(kind)
+        return sketch
+
+    def record(
+        self,
+        key: str,
+        client_ip: str,
+        referrer: str | None,
+        user_agent: str | None,
+        now: datetime | None = None,
+    ) -> None:
+        window = window_start(now or datetime.utcnow(), self.window_seconds)
+        visitor = hashlib.blake2b(f"{client_ip}\n{user_agent or ''}".encode(), key=self._salt, digest_size=16).digest()
+        host = referrer_host(referrer)
+        family = user_agent_family(user_agent)
+        with self._lock:
+            visitors = self._pending.get((VISITORS, key, window))
+            if visitors is None and self._tracked_links < self.max_tracked_links:
+                visitors = self._sketch(VISITORS, key, window)
+                self._tracked_links += 1
+            if visitors is not None:
+                visitors.add(visitor)
+            else:
+                ANALYTICS_UNTRACKED_CLICKS.inc()
+            self._sketch(TOP_LINKS, "", window).add(key)
+            self._sketch(LINK_COUNTS, "", window).add(key)
+            self._sketch(TOP_REFERRERS, "", window).add(host)
+            self._sketch(REFERRER_COUNTS, "", window).add(host)
+            self._sketch(TOP_USER_AGENTS, "", window).add(family)
+
+    def drain(self) -> dict[SketchKey, object]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._tracked_links = 0
+        return pending
+
+    def restore(self, pending: dict[SketchKey, object]) -> None:
+        """Возвращает несохранённые скетчи, чтобы записать их со следующим сбросом."""
+        with self._lock:
+            for key, sketch in pending.items():
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = sketch
+                    self._tracked_links += key[0] == VISITORS
+                else:
+                    current.merge(sketch)
+
+
+class SQLSketchStore:
+    """Скетчи по окнам в таблице click_sketches: сохранение слиянием с уже записанными."""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def merge(self, pending: dict[SketchKey, object]) -> None:
+        # Строки блокируются в одном порядке во всех процессах — без взаимных блокировок:
+        # группы по (kind, window), внутри группы — по subject
+        groups: dict[tuple[str, datetime], dict[str, object]] = {}
+        for (kind, subject, window), sketch in sorted(pending.items(), key=lambda item: item[0]):
+            groups.setdefault((kind, window), {})[subject] = sketch
+        for attempt in range(MERGE_ATTEMPTS):
+            try:
+                with self.session_factory() as db:
+                    for (kind, window), sketches in sorted(groups.items(), key=lambda item: item[0]):
+                        self._merge_group(db, kind, window, sketches)
+                    db.commit()
+                return
+            except IntegrityError:
+                # Ту же строку одновременно создал другой процесс — при повторе она уже есть
+                if attempt == MERGE_ATTEMPTS - 1:
+                    raise
+
+    @staticmethod
+    def _merge_group(db: Session, kind: str, window: datetime, sketches: dict[str, object]) -> None:
+        subjects = list(sketches)
+        for start in range(0, len(subjects), MERGE_CHUNK_SIZE):
+            chunk = subjects[start:start + MERGE_CHUNK_SIZE]
+            rows = db.scalars(
+                select(models.ClickSketch)
+                .where(
+                    models.ClickSketch.kind == kind,
+                    models.ClickSketch.window_start == window,
+                    models.ClickSketch.subject.in_(chunk),
+                )
+                .with_for_update()
+            )
+            existing = {row.subject: row for row in rows}
+            for subject in chunk:
+                sketch = sketches[subject]
+                row = existing.get(subject)
+                if row is None:
+                    db.add(models.ClickSketch(kind=kind, subject=subject, window_start=window, data=sketch.to_bytes()))
+                    continue
+                stored = SKETCH_TYPES[kind].from_bytes(row.data)
+                stored.merge(sketch)
+                row.data = stored.to_bytes()
+
+    def load(self, kind: str, subject: str, since: datetime) -> list:
+        with self.session_factory() as db:
+            rows = db.scalars(
+                select(models.ClickSketch.data).where(
+                    models.ClickSketch.kind == kind,
+                    models.ClickSketch.subject == subject,
+                    models.ClickSketch.window_start >= since,
+                )
+            )
+            return [SKETCH_TYPES[kind].from_bytes(data) for data in rows]
+
+    def delete_before(self, cutoff: datetime) -> int:
+        with self.session_factory() as db:
+            deleted = db.execute(delete(models.ClickSketch).where(models.ClickSketch.window_start < cutoff)).rowcount
+            db.commit()
+            return deleted
+
+
+class MemorySketchStore:
+    """Хранилище скетчей в памяти процесса для STORAGE_BACKEND=memory."""
+
+    def __init__(self):
+        self._sketches: dict[SketchKey, bytes] = {}
+        self._lock = threading.Lock()
+
+    def merge(self, pending: dict[SketchKey, object]) -> None:
+        with self._lock:
+            for key, sketch in pending.items():
+                data = self._sketches.get(key)
+                if data is not None:
+                    stored = SKETCH_TYPES[key[0]].from_bytes(data)
+                    stored.merge(sketch)
+                    sketch = stored
+                self._sketches[key] = sketch.to_bytes()
+
+    def load(self, kind: str, subject: str, since: datetime) -> list:
+        with self._lock:
+            rows = [
+                data for (row_kind, row_subject, window), data in self._sketches.items()
+                if row_kind == kind and row_subject == subject and window >= since
+            ]
+        return [SKETCH_TYPES[kind].from_bytes(data) for data in rows]
+
+    def delete_before(self, cutoff: datetime) -> int:
+        with self._lock:
+            expired = [key for key in self._sketches if key[2] < cutoff]
+            for key in expired:
+                del self._sketches[key]
+        return len(expired)
+
+
+class ClickAnalyticsReader:
+    """Запросы к скетчам за последние hours часов: читается по строке на окно, независимо от трафика."""
+
+    def __init__(self, store: SQLSketchStore | MemorySketchStore, window_seconds: int):
+        self.store = store
+        self.window_seconds = window_seconds
+
+    def _since(self, hours: int, now: datetime | None) -> datetime:
+        return window_start((now or datetime.utcnow()) - timedelta(hours=hours), self.window_seconds)
+
+    def _merged(self, kind: str, subject: str, since: datetime):
+        merged = None
+        for sketch in self.store.load(kind, subject, since):
+            if merged is None:
+                merged = sketch
+            else:
+                merged.merge(sketch)
+        return merged
+
+    def unique_visitors(self, key: str, hours: int, now: datetime | None = None) -> tuple[int, float]:
+        """Оценка числа уникальных посетителей ссылки и её относительная погрешность."""
+        sketch = self._merged(VISITORS, key, self._since(hours, now))
+        if sketch is None:
+            return 0, 0.0
+        return sketch.count(), sketch.relative_error
+
+    def top(self, dimension: str, hours: int, limit: int, now: datetime | None = None) -> list[tuple[str, int, int]]:
+        """(значение, клики, максимальное завышение) для самых частых значений измерения."""
+        top_kind, counts_kind = DIMENSIONS[dimension]
+        since = self._since(hours, now)
+        top = self._merged(top_kind, "", since)
+        if top is None:
+            return []
+        counts = self._merged(counts_kind, "", since) if counts_kind else None
+        result = []
+        for value, clicks, overcount in top.top():
+            if counts is not None:
+                # Обе оценки не меньше истинной, поэтому меньшая из них точнее
+                estimate = counts.estimate(value)
+                overcount -= clicks - min(clicks, estimate)
+                clicks = min(clicks, estimate)
+            result.append((value, clicks, max(0, overcount)))
+        result.sort(key=lambda item: item[1], reverse=True)
+        return result[:limit]
+
+
+class ClickAnalyticsFlusher(PeriodicWorker):
+    """Раз в interval секунд сливает скетчи процесса в хранилище и удаляет окна старше retention."""
+
+    thread_name = "click-analytics-flusher"
+
+    def __init__(
+        self,
+        analytics: ClickAnalytics,
+        store: SQLSketchStore | MemorySketchStore,
+        interval: float,
+        retention: timedelta,
+    ):
+        super().__init__(interval)
+        self.analytics = analytics
+        self.store = store
+        self.retention = retention
+        self._pruned_at = -math.inf
+
+    def run_once(self) -> int:
+        pending = self.analytics.drain()
+        if pending:
+            try:
+                self.store.merge(pending)
+                ANALYTICS_FLUSHES.inc("ok")
+            except Exception:
+                logger.exception("Failed to persist %d click sketches", len(pending))
+                ANALYTICS_FLUSHES.inc("error")
+                self.analytics.restore(pending)
+                return 0
+        if time.monotonic() - self._pruned_at >= self.analytics.window_seconds:
+            try:
+                self.store.delete_before(datetime.utcnow() - self.retention)
+                self._pruned_at = time.monotonic()
+            except Exception:
+                logger.exception("Failed to delete expired click sketches")
+        return len(pending)
+
+    def stop(self, timeout: float | None = None) -> None:
+        super().stop(timeout)
+        # Скетчи последнего интервала записываются до остановки процесса
+        self.run_once()
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Literal
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from . import models
+from .rollups import increment_rollups
+
+logger = logging.getLogger(__name__)
+
+DropPolicy = Literal["drop_newest", "drop_oldest", "block"]
+
+
+@dataclass
+class ClickBufferStats:
+    queue_depth: int
+    capacity: int
+    enqueued: int
+    dropped: int
+    flushed: int
+    flushes: int
+    failed_flushes: int
+    last_flush_seconds: float
+    max_flush_seconds: float
+    total_flush_seconds: float
+
+
+class ClickBuffer:
+    """Буфер кликов с фоновой пакетной записью в БД (write-behind).
+
+    Редирект только кладёт (url_id, timestamp) в ограниченную очередь; фоновый поток
+    сбрасывает её пачками по достижении batch_size или раз в flush_interval секунд.
+    При переполнении очереди действует drop_policy:
+      * drop_newest — новый клик отбрасывается;
+      * drop_oldest — вытесняется самый старый клик в очереди;
+      * block — ждём освобождения места до block_timeout, затем отбрасываем новый клик.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        drop_policy: DropPolicy = "drop_newest",
+        block_timeout: float = 0.05,
+        rollup_bucket_seconds: int = 60,
+    ):
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.rollup_bucket_seconds = rollup_bucket_seconds
+        self._queue: deque[tuple[int, datetime]] = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._enqueued = 0
+        self._dropped = 0
+        self._flushed = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._last_flush_seconds = 0.0
+        self._max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+    def record(self, url_id: int, timestamp: datetime | None = None) -> bool:
+        """Ставит клик в очередь; возвращает False, если клик был отброшен."""
+        item = (url_id, timestamp or datetime.utcnow())
+        with self._cond:
+            if len(self._queue) >= self.max_size and not self._make_room():
+                self._dropped += 1
+                return False
+            self._queue.append(item)
+            self._enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _make_room(self) -> bool:
+        """Освобождает место в заполненной очереди согласно drop_policy (под self._cond)."""
+        if self.drop_policy == "drop_oldest":
+            self._queue.popleft()
+            self._dropped += 1
+            return True
+        if self.drop_policy == "block":
+            return self._cond.wait_for(lambda: len(self._queue) < self.max_size, timeout=self.block_timeout)
+        return False
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="click-buffer-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Останавливает фоновый поток и сбрасывает всё, что осталось в очереди."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Синхронно записывает содержимое очереди; возвращает число записанных кликов."""
+        written = 0
+        with self._flush_lock:
+            while batch := self._take_batch():
+                if not self._write(batch):
+                    break
+                written += len(batch)
+        return written
+
+    def _take_batch(self) -> list[tuple[int, datetime]]:
+        with self._cond:
+            size = min(self.batch_size, len(self._queue))
+            batch = [self._queue.popleft() for _ in range(size)]
+            self._cond.notify_all()
+        return batch
+
+    def _write(self, batch: list[tuple[int, datetime]]) -> bool:
+        started = time.perf_counter()
+        try:
+            with self.session_factory() as db:
+                db.execute(
+                    insert(models.ClickEvent),
+                    [{"url_id": url_id, "timestamp": timestamp} for url_id, timestamp in batch],
+                )
+                increment_rollups(db, batch, self.rollup_bucket_seconds)
+                db.commit()
+        except Exception:
+            logger.exception("Failed to flush %d click events", len(batch))
+            self._requeue(batch)
+            return False
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self._flushed += len(batch)
+            self._flushes += 1
+            self._last_flush_seconds = elapsed
+            self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+            self._total_flush_seconds += elapsed
+        return True
+
+    def _requeue(self, batch: list[tuple[int, datetime]]) -> None:
+        with self._cond:
+            self._failed_flushes += 1
+            free = max(self.max_size - len(self._queue), 0)
+            self._dropped += max(len(batch) - free, 0)
+            self._queue.extendleft(reversed(batch[:free]))
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._queue) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                if self._stopping:
+                    return
+                failures = self._failed_flushes
+            self.flush()
+            if self._failed_flushes != failures:
+                # БД недоступна: ждём следующего интервала, а не повторяем запись в цикле
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopping, timeout=self.flush_interval)
+
+    def stats(self) -> ClickBufferStats:
+        with self._cond:
+            return ClickBufferStats(
+                queue_depth=len(self._queue), capacity=self.max_size,
+                enqueued=self._enqueued, dropped=self._dropped,
+                flushed=self._flushed, flushes=self._flushes, failed_flushes=self._failed_flushes,
+                last_flush_seconds=self._last_flush_seconds,
+                max_flush_seconds=self._max_flush_seconds,
+                total_flush_seconds=self._total_flush_seconds,
+            )
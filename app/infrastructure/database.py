@@ -1,7 +1,89 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import settings
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from app.core.config import asyncpg_url, settings
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
-engine = create_engine(settings.DATABASE_URL)
+
+def _pool_options(pool_size: int, max_overflow: int) -> dict:
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW),
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+# Фоновые задачи (сброс буфера кликов) берут соединения из отдельного пула и не
+# конкурируют с обработчиками запросов.
+background_engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    **_pool_options(settings.DB_BACKGROUND_POOL_SIZE, 0),
+)
+BackgroundSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=background_engine)
+
+# Реплики только для чтения (DATABASE_REPLICA_URLS); выбор реплики — app/infrastructure/replicas.py
+replica_engines: dict[str, Engine] = {
+    f"replica{number}": create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW),
+    )
+    for number, url in enumerate(settings.replica_urls, start=1)
+}
+ReplicaSessionLocals = {
+    name: sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    for name, replica_engine in replica_engines.items()
+}
+
+# Async-движок создаётся только при включённом асинхронном режиме, чтобы синхронный
+# режим не требовал установленного asyncpg.
+async_engine = create_async_engine(
+    settings.async_database_url,
+    poolclass=InstrumentedAsyncQueuePool,
+    **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW),
+) if settings.DB_ASYNC_ENABLED else None
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+# Async-движки реплик под теми же именами, что и синхронные: реплику выбирает и
+# проверяет ReplicaRouter, а читают из неё async-обработчики
+async_replica_engines = {
+    name: create_async_engine(
+        asyncpg_url(url),
+        poolclass=InstrumentedAsyncQueuePool,
+        **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW),
+    )
+    for name, url in zip(replica_engines, settings.replica_urls)
+} if settings.DB_ASYNC_ENABLED else {}
+AsyncReplicaSessionLocals = {
+    name: async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False)
+    for name, replica_engine in async_replica_engines.items()
+}
+
+
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def dialect_insert(db: Session, table):
+    """INSERT с поддержкой ON CONFLICT для диалекта текущего подключения."""
+    return _DIALECT_INSERTS[db.get_bind().dialect.name](table)
+
+
+def engines() -> dict[str, Engine]:
+    """Движки процесса по ролям — для статистики пулов."""
+    result = {"main": engine, "background": background_engine, **replica_engines}
+    if async_engine is not None:
+        result["async"] = async_engine.sync_engine
+    result.update({f"async-{name}": replica_engine.sync_engine for name, replica_engine in async_replica_engines.items()})
+    return result
@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Literal
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+
+ExportTable = Literal["urls", "clicks"]
+ExportFormat = Literal["ndjson", "csv"]
+
+# secret_key не выгружается: он даёт право деактивировать ссылку
+URL_EXPORT_COLUMNS = (
+    models.URL.id, models.URL.key, models.URL.target_url, models.URL.is_active,
+    models.URL.expires_at, models.URL.cacheable, models.URL.created_at,
+)
+CLICK_EXPORT_COLUMNS = (models.ClickEvent.id, models.ClickEvent.url_id, models.ClickEvent.timestamp)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def export_query(
+    table: ExportTable,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    active_only: bool = False,
+):
+    """Запрос выгрузки: urls фильтруются по created_at, клики — по timestamp, интервал [since, until).
+
+    active_only, как и в списке ссылок, оставляет активные неистёкшие ссылки.
+
+    Клики выгружаются без сортировки: по диапазону времени PostgreSQL читает только
+    нужные дневные партиции и не сортирует сотни миллионов строк.
+    """
+    active = (models.URL.is_active == True, models.URL.expires_at > datetime.utcnow())
+    if table == "urls":
+        query = select(*URL_EXPORT_COLUMNS).order_by(models.URL.id)
+        moment = models.URL.created_at
+        if active_only:
+            query = query.where(*active)
+    else:
+        query = select(*CLICK_EXPORT_COLUMNS)
+        moment = models.ClickEvent.timestamp
+        if active_only:
+            query = query.join(models.URL, models.URL.id == models.ClickEvent.url_id).where(*active)
+    if since is not None:
+        query = query.where(moment >= since)
+    if until is not None:
+        query = query.where(moment < until)
+    return query
+
+
+def naive_utc(value: datetime | None) -> datetime | None:
+    """Время с часовым поясом приводится к UTC без пояса, как оно хранится в базе."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def iter_export_rows(db: Session, query, batch_size: int) -> Iterator[tuple]:
+    # yield_per включает серверный курсор: в памяти не больше batch_size строк
+    for row in db.execute(query.execution_options(yield_per=batch_size)):
+        yield tuple(row)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def ndjson_lines(columns: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(_json_value, row))), separators=(",", ":")) + "\n"
+
+
+def csv_lines(columns: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(_json_value(value) for value in row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_chunks(lines: Iterable[str], compress: bool = False, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Склеивает строки в куски ~chunk_size байт, при compress — потоково сжимает в gzip."""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    parts: list[bytes] = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            chunk = b"".join(parts)
+            parts, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    tail = b"".join(parts)
+    if compressor:
+        tail = compressor.compress(tail) + compressor.flush()
+    if tail:
+        yield tail
+
+
+def export_chunks(
+    db: Session,
+    table: ExportTable,
+    output_format: ExportFormat,
+    compress: bool,
+    batch_size: int,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    active_only: bool = False,
+) -> Iterator[bytes]:
+    """Выгрузка таблицы в NDJSON или CSV потоком байтовых кусков постоянного размера."""
+    query = export_query(table, since=since, until=until, active_only=active_only)
+    columns = [column.key for column in query.selected_columns]
+    rows = iter_export_rows(db, query, batch_size)
+    lines = ndjson_lines(columns, rows) if output_format == "ndjson" else csv_lines(columns, rows)
+    return encode_chunks(lines, compress=compress)
@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.bloom import BloomFilter
+from app.core.metrics import KEY_FILTER_KEYS, KEY_FILTER_LOOKUPS, KEY_FILTER_REBUILDS, KEY_FILTER_REBUILD_DURATION
+from . import models
+from .periodic import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# id выдаются при вставке, а видны после коммита — не обязательно по порядку. Дочитка
+# начинается с запасом в REFRESH_OVERLAP номеров, чтобы не пропустить поздние коммиты;
+# уже прочитанные id из этого окна запоминаются и повторно в фильтр не добавляются.
+REFRESH_OVERLAP = 1000
+
+
+@dataclass
+class KeyFilterStats:
+    ready: bool
+    capacity: int
+    fp_rate: float
+    size_bytes: int
+    hashes: int
+    keys: int
+    estimated_fp_rate: float
+    last_id: int
+    last_rebuild_seconds: float
+
+
+def _overlap_window(ids: set[int], last_id: int) -> set[int]:
+    return {url_id for url_id in ids if url_id > last_id - REFRESH_OVERLAP}
+
+
+class URLKeyFilter:
+    """Фильтр Блума по ключам таблицы urls.
+
+    Пока фильтр не построен, might_exist отвечает «возможно есть» на любой ключ.
+    Ключи, добавленные во время перестроения, попадают и в новый фильтр.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self._filter: BloomFilter | None = None
+        self._building: BloomFilter | None = None
+        self._lock = threading.Lock()
+        self.last_id = 0
+        self.last_rebuild_seconds = 0.0
+        self._seen_ids: set[int] = set()
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_exist(self, key: str) -> bool:
+        current = self._filter
+        if current is None or key in current:
+            KEY_FILTER_LOOKUPS.inc("passed")
+            return True
+        KEY_FILTER_LOOKUPS.inc("rejected")
+        return False
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            for target in (self._filter, self._building):
+                if target is not None:
+                    target.add(key)
+            if self._filter is not None:
+                KEY_FILTER_KEYS.set(self._filter.count)
+
+    def rebuild(self, db: Session, batch_size: int) -> int:
+        """Строит фильтр заново по всем ключам urls; возвращает число ключей."""
+        started = time.perf_counter()
+        building = BloomFilter(self.capacity, self.fp_rate)
+        with self._lock:
+            self._building = building
+        last_id = 0
+        seen_ids: set[int] = set()
+        try:
+            rows = db.execute(select(models.URL.id, models.URL.key).execution_options(yield_per=batch_size))
+            for url_id, key in rows:
+                building.add(key)
+                last_id = max(last_id, url_id)
+                if url_id > last_id - REFRESH_OVERLAP:
+                    seen_ids.add(url_id)
+                    if len(seen_ids) > 4 * REFRESH_OVERLAP:
+                        seen_ids = _overlap_window(seen_ids, last_id)
+        except Exception:
+            with self._lock:
+                self._building = None
+            KEY_FILTER_REBUILDS.inc("failed")
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._filter = building
+            self._building = None
+            self.last_id = last_id
+            self._seen_ids = _overlap_window(seen_ids, last_id)
+            self.last_rebuild_seconds = elapsed
+        KEY_FILTER_REBUILDS.inc("ok")
+        KEY_FILTER_REBUILD_DURATION.observe(elapsed)
+        KEY_FILTER_KEYS.set(building.count)
+        if building.count > self.capacity:
+            logger.warning(
+                "Key filter holds %d keys over its capacity %d, false positive rate is %.4f",
+                building.count, self.capacity, building.estimated_fp_rate(),
+            )
+        return building.count
+
+    def refresh(self, db: Session) -> int:
+        """Добавляет ключи, созданные другими процессами после последнего чтения; возвращает их число."""
+        rows = db.execute(
+            select(models.URL.id, models.URL.key).where(models.URL.id > self.last_id - REFRESH_OVERLAP)
+        ).all()
+        added = 0
+        for url_id, key in rows:
+            if url_id in self._seen_ids:
+                continue
+            self.add(key)
+            self._seen_ids.add(url_id)
+            self.last_id = max(self.last_id, url_id)
+            added += 1
+        self._seen_ids = _overlap_window(self._seen_ids, self.last_id)
+        return added
+
+    def stats(self) -> KeyFilterStats:
+        current = self._filter
+        return KeyFilterStats(
+            ready=current is not None,
+            capacity=self.capacity,
+            fp_rate=self.fp_rate,
+            size_bytes=current.size_bytes if current else 0,
+            hashes=current.hashes if current else 0,
+            keys=current.count if current else 0,
+            estimated_fp_rate=current.estimated_fp_rate() if current else 0.0,
+            last_id=self.last_id,
+            last_rebuild_seconds=self.last_rebuild_seconds,
+        )
+
+
+class KeyFilterRefresher(PeriodicWorker):
+    """Строит фильтр при старте, затем раз в interval секунд дочитывает новые ключи.
+
+    Ключи, созданные этим процессом, попадают в фильтр сразу; созданные другими
+    процессами и узлами — не позже чем через interval секунд.
+    """
+
+    thread_name = "key-filter-refresher"
+
+    def __init__(self, session_factory: Callable[[], Session], key_filter: URLKeyFilter, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.session_factory = session_factory
+        self.key_filter = key_filter
+        self.batch_size = batch_size
+
+    def run_once(self) -> int:
+        try:
+            with self.session_factory() as db:
+                if not self.key_filter.ready:
+                    return self.key_filter.rebuild(db, self.batch_size)
+                return self.key_filter.refresh(db)
+        except Exception:
+            logger.exception("Failed to update the key filter")
+            return 0
+
+    def _run(self) -> None:
+        # Первое построение на больших таблицах долгое, поэтому идёт в потоке, а не при старте
+        self.run_once()
+        super()._run()
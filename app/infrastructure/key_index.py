@@ -0,0 +1,206 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.metrics import KEY_INDEX_LOOKUPS
+from app.domain.entities import URL as URLEntity
+from . import models
+
+# Формат файла индекса (little-endian):
+#   заголовок  — magic, версия, время сборки (unix), число записей, число слотов, смещение таблицы;
+#   записи     — url_id, expires_at, created_at (unix, NaN — нет), флаги, длины и байты key/target_url;
+#   таблица    — открытая адресация с линейным пробированием: в слоте смещение записи + 1 (0 — пусто).
+# secret_key в файл не попадает: индекс лежит на диске и читается всеми воркерами.
+MAGIC = b"URLIDX01"
+VERSION = 1
+_HEADER = struct.Struct("<8sIdQQQ")
+_RECORD = struct.Struct("<qddBHI")
+_SLOT = struct.Struct("<Q")
+_ACTIVE = 1
+_CACHEABLE = 2
+LOAD_FACTOR = 0.75
+# Сколько строк сборка индекса держит в памяти за раз
+BUILD_BATCH_SIZE = 10_000
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def _timestamp(value: datetime | None) -> float:
+    return (value - _EPOCH).total_seconds() if value is not None else math.nan
+
+
+def _datetime(value: float) -> datetime | None:
+    return None if math.isnan(value) else datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+def build_key_index(db: Session, path: str, batch_size: int = BUILD_BATCH_SIZE, now: datetime | None = None) -> int:
+    """Записывает индекс активных неистёкших ссылок в path; возвращает число записей.
+
+    Файл собирается рядом под временным именем и подменяется через os.replace, поэтому
+    воркеры видят либо старую, либо новую версию целиком.
+    """
+    now = now or datetime.utcnow()
+    # Время сборки берётся до запроса: forget() процесса во время сборки получит
+    # changed_at не раньше built_at и не будет сброшен при загрузке этого снимка
+    built_at = time.time()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    hashes = array("Q")
+    offsets = array("Q")
+    query = (
+        select(
+            models.URL.id, models.URL.key, models.URL.target_url, models.URL.is_active,
+            models.URL.expires_at, models.URL.cacheable, models.URL.created_at,
+        )
+        .where(models.URL.is_active == True, models.URL.expires_at > now)
+        .execution_options(yield_per=batch_size)
+    )
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(b"\0" * _HEADER.size)
+            position = _HEADER.size
+            for url_id, key, target_url, is_active, expires_at, cacheable, created_at in db.execute(query):
+                key_bytes = key.encode()
+                target_bytes = target_url.encode()
+                flags = (_ACTIVE if is_active else 0) | (_CACHEABLE if cacheable else 0)
+                out.write(_RECORD.pack(
+                    url_id, _timestamp(expires_at), _timestamp(created_at), flags, len(key_bytes), len(target_bytes),
+                ))
+                out.write(key_bytes)
+                out.write(target_bytes)
+                hashes.append(_hash(key_bytes))
+                offsets.append(position)
+                position += _RECORD.size + len(key_bytes) + len(target_bytes)
+
+            slot_count = max(8, math.ceil(len(offsets) / LOAD_FACTOR))
+            table = array("Q", bytes(8 * slot_count))
+            for key_hash, offset in zip(hashes, offsets):
+                slot = key_hash % slot_count
+                while table[slot]:
+                    slot = (slot + 1) % slot_count
+                table[slot] = offset + 1
+            if sys.byteorder != "little":
+                table.byteswap()
+            out.write(table.tobytes())
+            out.seek(0)
+            out.write(_HEADER.pack(MAGIC, VERSION, built_at, len(offsets), slot_count, position))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(offsets)
+
+
+class KeyIndexSnapshot:
+    """Открытый через mmap файл индекса. Страницы файла общие для всех процессов хоста."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, self.built_at, self.count, self.slot_count, self.table_offset = _HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a key index file")
+
+    def lookup(self, key: str) -> URLEntity | None:
+        key_bytes = key.encode()
+        view = self._view
+        slot = _hash(key_bytes) % self.slot_count
+        while True:
+            (stored,) = _SLOT.unpack_from(view, self.table_offset + slot * _SLOT.size)
+            if not stored:
+                return None
+            offset = stored - 1
+            url_id, expires_at, created_at, flags, key_length, target_length = _RECORD.unpack_from(view, offset)
+            start = offset + _RECORD.size
+            # Сравнение через memoryview не копирует байты ключа из файла
+            if key_length == len(key_bytes) and view[start:start + key_length] == key_bytes:
+                target_start = start + key_length
+                return URLEntity(
+                    id=url_id, key=key, secret_key="",
+                    target_url=str(view[target_start:target_start + target_length], "utf-8"),
+                    is_active=bool(flags & _ACTIVE), expires_at=_datetime(expires_at),
+                    cacheable=bool(flags & _CACHEABLE), created_at=_datetime(created_at),
+                )
+            slot = (slot + 1) % self.slot_count
+
+
+class KeyIndex:
+    """Индекс ключей из файла, который периодически пересобирает scripts/build_key_index.py.
+
+    Раз в check_interval секунд проверяется, не подменён ли файл, и при подмене
+    открывается новая версия. Снимок старше max_age секунд не используется: поиск
+    уходит в БД, пока сборщик не обновит файл. Ключи, изменённые в этом процессе через
+    forget(), ищутся мимо индекса до появления снимка, собранного после изменения.
+    """
+
+    def __init__(self, path: str, max_age: float, check_interval: float):
+        self.path = path
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._snapshot: KeyIndexSnapshot | None = None
+        self._file_id: tuple[int, int] | None = None
+        self._checked_at = -math.inf
+        self._lock = threading.Lock()
+        self._forgotten: dict[str, float] = {}
+
+    def _reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            stat = os.stat(self.path)
+            file_id = (stat.st_ino, stat.st_mtime_ns)
+            if file_id != self._file_id:
+                # Старый mmap не закрывается явно: его могут читать другие потоки,
+                # память освободится вместе с последней ссылкой на снимок
+                snapshot = KeyIndexSnapshot(self.path)
+                self._snapshot = snapshot
+                self._file_id = file_id
+                self._forgotten = {
+                    key: changed_at for key, changed_at in self._forgotten.items() if changed_at >= snapshot.built_at
+                }
+        except (OSError, ValueError):
+            self._snapshot = None
+            self._file_id = None
+        finally:
+            self._lock.release()
+
+    def snapshot(self) -> KeyIndexSnapshot | None:
+        """Актуальный снимок или None, если файла нет или он устарел."""
+        self._reload()
+        snapshot = self._snapshot
+        if snapshot is None:
+            KEY_INDEX_LOOKUPS.inc("unavailable")
+            return None
+        if time.time() - snapshot.built_at > self.max_age:
+            KEY_INDEX_LOOKUPS.inc("stale")
+            return None
+        return snapshot
+
+    def forget(self, key: str) -> None:
+        self._forgotten[key] = time.time()
+
+    def lookup(self, key: str) -> URLEntity | None:
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        changed_at = self._forgotten.get(key)
+        if changed_at is not None and changed_at >= snapshot.built_at:
+            KEY_INDEX_LOOKUPS.inc("forgotten")
+            return None
+        url = snapshot.lookup(key)
+        KEY_INDEX_LOOKUPS.inc("hit" if url is not None else "miss")
+        return url
@@ -1,7 +1,10 @@
-from sqlalchemy import (Boolean, Column, Integer, String, DateTime, func, ForeignKey)
+from sqlalchemy import (BigInteger, Boolean, Column, DDL, Integer, LargeBinary, String, DateTime, event, func, ForeignKey, Index, Sequence, text, true)
 from sqlalchemy.orm import relationship
 from .database import Base
 
+# Источник номеров для стратегии выделения ключей "sequence" (только PostgreSQL)
+url_key_seq = Sequence("url_key_seq", metadata=Base.metadata)
+
 
 class URL(Base):
     __tablename__ = "urls"
@@ -11,17 +14,74 @@ class URL(Base):
     target_url = Column(String, index=True, nullable=False)
     is_active = Column(Boolean, default=True)
     expires_at = Column(DateTime, nullable=False)
+    cacheable = Column(Boolean, nullable=False, default=True, server_default=true())
     created_at = Column(DateTime, server_default=func.now())
     clicks = relationship("ClickEvent", back_populates="url", cascade="all, delete-orphan")
+    click_rollups = relationship("ClickRollup", cascade="all, delete-orphan")
+
+    # Частичные индексы по активным ссылкам для листинга active_only и sweeper'а: их размер
+    # следует числу живых ссылок, истёкшие ссылки выводит из них фоновый sweeper
+    # (app/infrastructure/sweeper.py). Редирект читает по уникальному индексу key.
+    __table_args__ = (
+        Index("ix_urls_active_id", "id", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index(
+            "ix_urls_active_expires_at", "expires_at",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active"),
+        ),
+    )
 
 
 class ClickEvent(Base):
+    """Сырой клик. В PostgreSQL таблица секционирована по дням (app/infrastructure/partitions.py),
+    поэтому timestamp входит в первичный ключ, а id берётся из последовательности.
+
+    SQLite не умеет автоинкремент в составном ключе и последовательностей не знает:
+    там id остаётся NULL, поэтому клики пишутся через Core insert, а не через ORM.
+    """
     __tablename__ = "click_events"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"), Sequence("click_events_id_seq"),
+        primary_key=True, nullable=True,
+    )
     url_id = Column(Integer, ForeignKey("urls.id"), nullable=False)
-    timestamp = Column(DateTime, nullable=False, server_default=func.now())
+    timestamp = Column(DateTime, primary_key=True, server_default=func.now())
     url = relationship("URL", back_populates="clicks")
 
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
+
+
+# Без партиций вставка в секционированную таблицу невозможна: при create_all создаём
+# партицию по умолчанию, дневные партиции добавляет PartitionMaintainer.
+event.listen(
+    ClickEvent.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS click_events_default PARTITION OF click_events DEFAULT").execute_if(dialect="postgresql"),
+)
+
+
+class ClickRollup(Base):
+    """Число кликов по ссылке за один временной бакет (CLICK_ROLLUP_BUCKET_SECONDS)."""
+    __tablename__ = "click_rollups"
+    url_id = Column(Integer, ForeignKey("urls.id"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    clicks = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_click_rollups_bucket_start", "bucket_start"),)
+
+
+class ClickSketch(Base):
+    """Скетч кликов (app/core/sketches.py) за одно окно ANALYTICS_WINDOW_SECONDS.
+
+    subject — короткий ключ ссылки для скетчей по ссылке или "" для общих по сервису.
+    """
+    __tablename__ = "click_sketches"
+    kind = Column(String(32), primary_key=True)
+    subject = Column(String, primary_key=True)
+    window_start = Column(DateTime, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (Index("ix_click_sketches_window_start", "window_start"),)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -0,0 +1,172 @@
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import Callable
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from .periodic import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# Дневные партиции click_events (только PostgreSQL): click_events_p20250131 хранит клики
+# за [2025-01-31, 2025-02-01). Строки вне существующих партиций попадают в click_events_default.
+PARENT_TABLE = "click_events"
+DEFAULT_PARTITION = "click_events_default"
+_PARTITION_NAME = re.compile(r"^click_events_p(\d{8})$")
+
+_LIST_PARTITIONS_SQL = text("""
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = :parent
+""")
+_IS_PARTITIONED_SQL = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+        WHERE pg_class.relname = :parent
+    )
+""")
+
+
+def partition_name(day: date) -> str:
+    return f"{PARENT_TABLE}_p{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> date | None:
+    match = _PARTITION_NAME.match(name)
+    return datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+
+def is_partitioned(db: Session) -> bool:
+    """Разбита ли click_events на партиции, то есть применена ли миграция 0005."""
+    return bool(db.execute(_IS_PARTITIONED_SQL, {"parent": PARENT_TABLE}).scalar())
+
+
+def list_partitions(db: Session) -> list[str]:
+    return sorted(db.execute(_LIST_PARTITIONS_SQL, {"parent": PARENT_TABLE}).scalars())
+
+
+def ensure_partitions(db: Session, days_ahead: int, today: date | None = None) -> list[str]:
+    """Создаёт дневные партиции с сегодняшнего дня на days_ahead дней вперёд.
+
+    Каждая партиция создаётся в своей транзакции: если за какой-то день клики уже
+    попали в click_events_default (например, после долгого простоя) или партицию
+    параллельно создал другой экземпляр, ошибка не мешает остальным дням.
+    """
+    today = today or datetime.utcnow().date()
+    existing = set(list_partitions(db))
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = partition_name(day)
+        if name in existing:
+            continue
+        try:
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+            db.commit()
+        except DBAPIError:
+            db.rollback()
+            logger.warning("Could not create partition %s", name, exc_info=True)
+            continue
+        created.append(name)
+    return created
+
+
+def expired_partitions(names: list[str], retention_days: int, today: date) -> list[str]:
+    """Дневные партиции, все клики которых старше retention_days дней."""
+    cutoff = today - timedelta(days=retention_days)
+    expired = []
+    for name in names:
+        day = partition_day(name)
+        # Правая граница партиции за день day — начало следующего дня
+        if day is not None and day + timedelta(days=1) <= cutoff:
+            expired.append(name)
+    return expired
+
+
+def drop_expired_partitions(db: Session, retention_days: int, today: date | None = None) -> list[str]:
+    """Удаляет партиции старше срока хранения.
+
+    DROP TABLE партиции освобождает место сразу, без длинного DELETE, VACUUM и
+    раздувания индексов.
+    """
+    today = today or datetime.utcnow().date()
+    dropped = expired_partitions(list_partitions(db), retention_days, today)
+    for name in dropped:
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+    db.commit()
+    return dropped
+
+
+def purge_default_partition(db: Session, retention_days: int, today: date | None = None) -> int:
+    """Удаляет из click_events_default клики старше срока хранения; возвращает их число.
+
+    В default попадают клики за дни без своей партиции (например, после долгого простоя).
+    Целиком её не удалить, поэтому старые строки удаляются DELETE; обычно их немного.
+    """
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=retention_days)
+    deleted = db.execute(
+        text(f'DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" < :cutoff'), {"cutoff": cutoff}
+    ).rowcount
+    db.commit()
+    if deleted:
+        logger.info("Deleted %d expired clicks from %s", deleted, DEFAULT_PARTITION)
+    return deleted
+
+
+def maintain_partitions(db: Session, days_ahead: int, retention_days: int | None) -> tuple[list[str], list[str]]:
+    """Создаёт будущие партиции и удаляет вышедшие за срок хранения.
+
+    Вне PostgreSQL и на схеме без миграции 0005 ничего не делает.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return [], []
+    if not is_partitioned(db):
+        logger.warning("%s is not partitioned, skipping maintenance; apply migration 0005", PARENT_TABLE)
+        return [], []
+    created = ensure_partitions(db, days_ahead)
+    dropped = []
+    if retention_days:
+        dropped = drop_expired_partitions(db, retention_days)
+        purge_default_partition(db, retention_days)
+    return created, dropped
+
+
+class PartitionMaintainer(PeriodicWorker):
+    """Периодически вызывает maintain_partitions; первый проход — сразу при старте."""
+
+    thread_name = "click-partition-maintainer"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float,
+        days_ahead: int,
+        retention_days: int | None,
+    ):
+        super().__init__(interval)
+        self.session_factory = session_factory
+        self.days_ahead = days_ahead
+        self.retention_days = retention_days
+
+    def start(self) -> None:
+        self.run_once()
+        super().start()
+
+    def run_once(self) -> tuple[list[str], list[str]]:
+        try:
+            with self.session_factory() as db:
+                created, dropped = maintain_partitions(db, self.days_ahead, self.retention_days)
+        except Exception:
+            logger.exception("Failed to maintain click_events partitions")
+            return [], []
+        if created or dropped:
+            logger.info("click_events partitions created: %s, dropped: %s", created, dropped)
+        return created, dropped
@@ -0,0 +1,96 @@
+import threading
+import time
+from dataclasses import dataclass
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+@dataclass
+class PoolStats:
+    name: str
+    size: int
+    max_overflow: int
+    timeout_seconds: float
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+
+class PoolMetrics:
+    """Счётчики выдачи соединений из пула; переживают пересоздание пула (dispose)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class _InstrumentedPoolMixin:
+    """Замеряет ожидание соединения и считает таймауты "QueuePool limit ... reached".
+
+    Время ожидания включает установку нового соединения, если пул открывает его в
+    пределах max_overflow.
+    """
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(name: str, engine: Engine) -> PoolStats:
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    return PoolStats(
+        name=name,
+        size=pool.size(),
+        max_overflow=pool._max_overflow,
+        timeout_seconds=pool.timeout(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=metrics.checkouts,
+        timeouts=metrics.timeouts,
+        total_wait_seconds=metrics.total_wait_seconds,
+        max_wait_seconds=metrics.max_wait_seconds,
+    )
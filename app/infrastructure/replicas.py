@@ -0,0 +1,109 @@
+import itertools
+import logging
+import math
+import threading
+from typing import Callable
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.metrics import DB_REPLICA_LAG
+from .periodic import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики PostgreSQL в секундах. Без входящего WAL реплика догнала primary,
+# даже если последняя применённая транзакция была давно. Но равенство принятой и
+# применённой позиций ничего не говорит, если приёмник WAL отключился: реплика просто
+# перестала получать изменения. Тогда запрос возвращает NULL и реплика исключается.
+# Статус приёмника виден ролям с pg_read_all_stats (pg_monitor) или суперпользователю.
+_PG_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Сколько недавно записанных ключей процесс помнит для чтения с primary
+RECENT_WRITES_MAX_SIZE = 100_000
+
+
+class ReplicaRouter:
+    """Выбор реплики для чтения и учёт недавних записей процесса.
+
+    Реплика используется, только если последняя проверка отставания прошла успешно и
+    отставание не больше max_lag. Реплики выбираются по кругу. Ключи, записанные
+    процессом за последние max_lag секунд, читаются с primary (read-after-write).
+    """
+
+    def __init__(self, replicas: dict[str, Callable[[], Session]], max_lag: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self._lag: dict[str, float] = {name: math.inf for name in replicas}
+        self._order = itertools.cycle(list(replicas))
+        self._lock = threading.Lock()
+        self._recent_writes: TTLCache[str, bool] = TTLCache(max_size=RECENT_WRITES_MAX_SIZE, ttl=max_lag)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def healthy(self) -> list[str]:
+        return [name for name, lag in self._lag.items() if lag <= self.max_lag]
+
+    def choose(self) -> tuple[str, Callable[[], Session]] | None:
+        """Следующая пригодная реплика или None — тогда читать с primary."""
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                name = next(self._order)
+                if self._lag[name] <= self.max_lag:
+                    return name, self.replicas[name]
+        return None
+
+    def record_lag(self, name: str, lag: float) -> None:
+        self._lag[name] = lag
+        DB_REPLICA_LAG.set(lag, name)
+
+    def mark_failed(self, name: str) -> None:
+        """Реплика не отвечает: исключается до следующей успешной проверки."""
+        self._lag[name] = math.inf
+        DB_REPLICA_LAG.set(-1, name)
+
+    def note_write(self, key: str) -> None:
+        self._recent_writes.set(key, True)
+
+    def recently_written(self, key: str) -> bool:
+        return self._recent_writes.get(key) is not None
+
+
+class ReplicaLagMonitor(PeriodicWorker):
+    """Раз в interval секунд измеряет отставание каждой реплики."""
+
+    thread_name = "replica-lag-monitor"
+
+    def __init__(self, router: ReplicaRouter, interval: float):
+        super().__init__(interval)
+        self.router = router
+
+    def check(self, name: str, session_factory: Callable[[], Session]) -> float | None:
+        """Отставание в секундах или None, если реплика не получает WAL от primary."""
+        with session_factory() as db:
+            if db.get_bind().dialect.name != "postgresql":
+                # Для SQLite-заглушек реплик отставание не измеряется
+                db.execute(text("SELECT 1"))
+                return 0.0
+            lag = db.execute(_PG_LAG_QUERY).scalar()
+            return None if lag is None else float(lag)
+
+    def run_once(self) -> None:
+        for name, session_factory in self.router.replicas.items():
+            try:
+                lag = self.check(name, session_factory)
+            except Exception:
+                logger.warning("Replica %s is unavailable", name, exc_info=True)
+                self.router.mark_failed(name)
+                continue
+            if lag is None:
+                logger.warning("Replica %s is not streaming WAL from the primary", name)
+                self.router.mark_failed(name)
+            else:
+                self.router.record_lag(name, lag)
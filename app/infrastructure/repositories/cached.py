@@ -0,0 +1,149 @@
+from datetime import datetime
+from typing import Iterator, List, Optional
+from app.core.cache import TTLCache
+from app.domain.entities import URL as URLEntity, URLStats, User as UserEntity
+from app.domain.repositories import AbstractURLRepository, AbstractUserRepository
+from ..shared_cache import SharedURLCache
+
+
+class CachedURLRepository(AbstractURLRepository):
+    """Декоратор репозитория: кэширует поиск по ключу в памяти процесса.
+
+    Время жизни записи не превышает ни TTL кэша, ни срок действия самой ссылки.
+    """
+
+    def __init__(self, repo: AbstractURLRepository, cache: TTLCache[str, URLEntity]):
+        self.repo = repo
+        self.cache = cache
+
+    def add(self, url: URLEntity) -> URLEntity:
+        return self.repo.add(url)
+
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        return self.repo.add_if_key_free(url)
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        return self.repo.add_many(urls)
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        return self.repo.reserve_key_ids(count)
+
+    def get_by_key(self, key: str) -> Optional[URLEntity]:
+        url = self.cache.get(key)
+        if url is not None:
+            return url
+        url = self.repo.get_by_key(key)
+        if url is not None:
+            self.cache.set(key, url, ttl=(url.expires_at - datetime.utcnow()).total_seconds())
+        return url
+
+    def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        return self.repo.get_by_secret_key(secret_key)
+
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        return self.repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    def update(self, url: URLEntity) -> URLEntity:
+        updated = self.repo.update(url)
+        self.cache.invalidate(updated.key)
+        return updated
+
+    def log_click(self, url: URLEntity):
+        self.repo.log_click(url)
+
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        return self.repo.get_stats(limit=limit, after_id=after_id, top=top)
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        return self.repo.iter_stats(limit=limit, after_id=after_id, top=top)
+
+
+class CachedUserRepository(AbstractUserRepository):
+    """Декоратор репозитория пользователей: кэширует поиск по username.
+
+    Запись сбрасывается при изменении пользователя через этот репозиторий; изменения
+    из других процессов (например, scripts/create_user.py) видны по истечении TTL.
+    """
+
+    def __init__(self, repo: AbstractUserRepository, cache: TTLCache[str, UserEntity]):
+        self.repo = repo
+        self.cache = cache
+
+    def add(self, user: UserEntity) -> UserEntity:
+        added = self.repo.add(user)
+        self.cache.invalidate(added.username)
+        return added
+
+    def get_by_username(self, username: str) -> Optional[UserEntity]:
+        user = self.cache.get(username)
+        if user is not None:
+            return user
+        user = self.repo.get_by_username(username)
+        if user is not None:
+            self.cache.set(username, user)
+        return user
+
+
+class SharedCachedURLRepository(AbstractURLRepository):
+    """Декоратор репозитория: поиск по ключу через общий для всех узлов кэш (Redis).
+
+    Ставится под CachedURLRepository: локальный кэш отвечает без сети, а его промахи
+    разных узлов сходятся в один запрос к БД. Изменение ссылки удаляет её из общего
+    кэша и рассылает инвалидацию локальным кэшам остальных узлов.
+    """
+
+    def __init__(self, repo: AbstractURLRepository, cache: SharedURLCache):
+        self.repo = repo
+        self.cache = cache
+
+    def add(self, url: URLEntity) -> URLEntity:
+        added = self.repo.add(url)
+        self.cache.forget(added.key)
+        return added
+
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        added = self.repo.add_if_key_free(url)
+        if added is not None:
+            self.cache.forget(added.key)
+        return added
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        added = self.repo.add_many(urls)
+        for url in added:
+            if url is not None:
+                self.cache.forget(url.key)
+        return added
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        return self.repo.reserve_key_ids(count)
+
+    def get_by_key(self, key: str) -> Optional[URLEntity]:
+        return self.cache.get_or_load(key, lambda: self.repo.get_by_key(key))
+
+    def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        return self.repo.get_by_secret_key(secret_key)
+
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        return self.repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    def update(self, url: URLEntity) -> URLEntity:
+        updated = self.repo.update(url)
+        self.cache.invalidate(updated.key)
+        return updated
+
+    def log_click(self, url: URLEntity):
+        self.repo.log_click(url)
+
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        return self.repo.get_stats(limit=limit, after_id=after_id, top=top)
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        return self.repo.iter_stats(limit=limit, after_id=after_id, top=top)
@@ -0,0 +1,63 @@
+from typing import Iterator, List, Optional
+from app.domain.entities import URL as URLEntity, URLStats
+from app.domain.repositories import AbstractURLRepository
+from ..key_filter import URLKeyFilter
+
+
+class KeyFilteredURLRepository(AbstractURLRepository):
+    """Декоратор репозитория: ключ, которого точно нет в фильтре Блума, ищется без обращения к кэшам и БД.
+
+    Отсекает запросы сканеров и опечатки в редиректах, а также проверку занятости
+    свежего ключа при создании ссылки (стратегия check).
+    """
+
+    def __init__(self, repo: AbstractURLRepository, key_filter: URLKeyFilter):
+        self.repo = repo
+        self.key_filter = key_filter
+
+    def add(self, url: URLEntity) -> URLEntity:
+        added = self.repo.add(url)
+        self.key_filter.add(added.key)
+        return added
+
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        added = self.repo.add_if_key_free(url)
+        # Ключ занят в любом случае: либо этой ссылкой, либо созданной в другом процессе
+        self.key_filter.add(url.key)
+        return added
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        added = self.repo.add_many(urls)
+        for url in urls:
+            self.key_filter.add(url.key)
+        return added
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        return self.repo.reserve_key_ids(count)
+
+    def get_by_key(self, key: str) -> Optional[URLEntity]:
+        if not self.key_filter.might_exist(key):
+            return None
+        return self.repo.get_by_key(key)
+
+    def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        return self.repo.get_by_secret_key(secret_key)
+
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        return self.repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    def update(self, url: URLEntity) -> URLEntity:
+        return self.repo.update(url)
+
+    def log_click(self, url: URLEntity):
+        self.repo.log_click(url)
+
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        return self.repo.get_stats(limit=limit, after_id=after_id, top=top)
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        return self.repo.iter_stats(limit=limit, after_id=after_id, top=top)
@@ -0,0 +1,56 @@
+from typing import Iterator, List, Optional
+from app.domain.entities import URL as URLEntity, URLStats
+from app.domain.repositories import AbstractURLRepository
+from ..key_index import KeyIndex
+
+
+class KeyIndexedURLRepository(AbstractURLRepository):
+    """Декоратор репозитория: поиск по ключу сначала идёт в общий для воркеров хоста индекс.
+
+    Отвечает индекс только на попадания; промах, устаревший или отсутствующий снимок
+    передаются нижележащему репозиторию.
+    """
+
+    def __init__(self, repo: AbstractURLRepository, key_index: KeyIndex):
+        self.repo = repo
+        self.key_index = key_index
+
+    def add(self, url: URLEntity) -> URLEntity:
+        return self.repo.add(url)
+
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        return self.repo.add_if_key_free(url)
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        return self.repo.add_many(urls)
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        return self.repo.reserve_key_ids(count)
+
+    def get_by_key(self, key: str) -> Optional[URLEntity]:
+        url = self.key_index.lookup(key)
+        return url if url is not None else self.repo.get_by_key(key)
+
+    def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        return self.repo.get_by_secret_key(secret_key)
+
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        return self.repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    def update(self, url: URLEntity) -> URLEntity:
+        updated = self.repo.update(url)
+        self.key_index.forget(updated.key)
+        return updated
+
+    def log_click(self, url: URLEntity):
+        self.repo.log_click(url)
+
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        return self.repo.get_stats(limit=limit, after_id=after_id, top=top)
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        return self.repo.iter_stats(limit=limit, after_id=after_id, top=top)
@@ -0,0 +1,63 @@
+from typing import Iterator, List, Optional
+from app.core.metrics import DB_QUERY_DURATION
+from app.domain.entities import URL as URLEntity, URLStats
+from app.domain.repositories import AbstractURLRepository
+
+
+class InstrumentedURLRepository(AbstractURLRepository):
+    """Декоратор репозитория: пишет время каждого метода в гистограмму DB_QUERY_DURATION.
+
+    Оборачивает хранилище напрямую (под кэшем), поэтому попадания в кэш в замеры
+    не входят.
+    """
+
+    def __init__(self, repo: AbstractURLRepository):
+        self.repo = repo
+
+    def add(self, url: URLEntity) -> URLEntity:
+        with DB_QUERY_DURATION.time("add"):
+            return self.repo.add(url)
+
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        with DB_QUERY_DURATION.time("add_if_key_free"):
+            return self.repo.add_if_key_free(url)
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        with DB_QUERY_DURATION.time("add_many"):
+            return self.repo.add_many(urls)
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        with DB_QUERY_DURATION.time("reserve_key_ids"):
+            return self.repo.reserve_key_ids(count)
+
+    def get_by_key(self, key: str) -> Optional[URLEntity]:
+        with DB_QUERY_DURATION.time("get_by_key"):
+            return self.repo.get_by_key(key)
+
+    def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        with DB_QUERY_DURATION.time("get_by_secret_key"):
+            return self.repo.get_by_secret_key(secret_key)
+
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        with DB_QUERY_DURATION.time("get_all"):
+            return self.repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    def update(self, url: URLEntity) -> URLEntity:
+        with DB_QUERY_DURATION.time("update"):
+            return self.repo.update(url)
+
+    def log_click(self, url: URLEntity):
+        with DB_QUERY_DURATION.time("log_click"):
+            self.repo.log_click(url)
+
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        with DB_QUERY_DURATION.time("get_stats"):
+            return self.repo.get_stats(limit=limit, after_id=after_id, top=top)
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        # Поток читается уже после выхода из обработчика; его время видно в метриках маршрута
+        return self.repo.iter_stats(limit=limit, after_id=after_id, top=top)
@@ -0,0 +1,211 @@
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.domain.entities import URL as URLEntity, URLStats, User as UserEntity
+from app.domain.repositories import AbstractURLRepository, AbstractUserRepository
+
+
+class _URLRecord:
+    __slots__ = ("id", "key", "secret_key", "target_url", "is_active", "expires_at", "cacheable", "created_at")
+
+    def __init__(
+        self, id: int, key: str, secret_key: str, target_url: str, is_active: bool, expires_at: datetime,
+        cacheable: bool, created_at: datetime,
+    ):
+        self.id = id
+        self.key = key
+        self.secret_key = secret_key
+        self.target_url = target_url
+        self.is_active = is_active
+        self.expires_at = expires_at
+        self.cacheable = cacheable
+        self.created_at = created_at
+
+    def to_entity(self) -> URLEntity:
+        return URLEntity(
+            id=self.id, key=self.key, secret_key=self.secret_key, target_url=self.target_url,
+            is_active=self.is_active, expires_at=self.expires_at, cacheable=self.cacheable,
+            created_at=self.created_at,
+        )
+
+
+class _UserRecord:
+    __slots__ = ("id", "username", "hashed_password")
+
+    def __init__(self, id: int, username: str, hashed_password: str):
+        self.id = id
+        self.username = username
+        self.hashed_password = hashed_password
+
+
+class MemoryStore:
+    """Хранилище процесса для in-memory бэкенда; данные теряются при перезапуске.
+
+    Ссылки индексируются словарями по key и secret_key, для постраничного get_all
+    хранится возрастающий список id. Клики лежат в кольцевом буфере на click_capacity
+    событий в порядке времени: статистика просматривает только клики за последние
+    сутки, а при переполнении буфера самые старые клики вытесняются.
+    """
+
+    def __init__(self, click_capacity: int):
+        self.lock = threading.Lock()
+        self.urls_by_id: dict[int, _URLRecord] = {}
+        self.urls_by_key: dict[str, _URLRecord] = {}
+        self.urls_by_secret_key: dict[str, _URLRecord] = {}
+        self.url_ids: list[int] = []
+        self.clicks: deque[tuple[datetime, int]] = deque(maxlen=click_capacity)
+        self.users: dict[str, _UserRecord] = {}
+        self.next_url_id = 1
+        self.next_user_id = 1
+        self.next_key_id = 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.urls_by_id.clear()
+            self.urls_by_key.clear()
+            self.urls_by_secret_key.clear()
+            self.url_ids.clear()
+            self.clicks.clear()
+            self.users.clear()
+
+
+class MemoryURLRepository(AbstractURLRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def _insert(self, url: URLEntity) -> URLEntity:
+        """Добавляет запись; вызывается под store.lock."""
+        store = self.store
+        record = _URLRecord(
+            store.next_url_id, url.key, url.secret_key, url.target_url, url.is_active, url.expires_at,
+            url.cacheable, datetime.utcnow(),
+        )
+        store.next_url_id += 1
+        store.urls_by_id[record.id] = record
+        store.urls_by_key[record.key] = record
+        store.urls_by_secret_key[record.secret_key] = record
+        # id растут монотонно, поэтому список остаётся отсортированным
+        store.url_ids.append(record.id)
+        url.id = record.id
+        url.created_at = record.created_at
+        return url
+
+    def add(self, url: URLEntity) -> URLEntity:
+        with self.store.lock:
+            if url.key in self.store.urls_by_key:
+                raise ValueError(f"Key {url.key!r} already exists")
+            return self._insert(url)
+
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        with self.store.lock:
+            if url.key in self.store.urls_by_key:
+                return None
+            return self._insert(url)
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        with self.store.lock:
+            return [None if url.key in self.store.urls_by_key else self._insert(url) for url in urls]
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        with self.store.lock:
+            start = self.store.next_key_id
+            self.store.next_key_id += count
+        return list(range(start, start + count))
+
+    def get_by_key(self, key: str) -> Optional[URLEntity]:
+        record = self.store.urls_by_key.get(key)
+        return record.to_entity() if record else None
+
+    def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        record = self.store.urls_by_secret_key.get(secret_key)
+        return record.to_entity() if record else None
+
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        result: list[URLEntity] = []
+        now = datetime.utcnow()
+        with self.store.lock:
+            ids = self.store.url_ids
+            end = bisect_left(ids, before_id) if before_id is not None else len(ids)
+            for position in range(end - 1, -1, -1):
+                record = self.store.urls_by_id[ids[position]]
+                # Как в PostgresURLRepository: активная и ещё не истёкшая ссылка
+                if active_only and not (record.is_active and record.expires_at > now):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                if len(result) >= limit:
+                    break
+                result.append(record.to_entity())
+        return result
+
+    def update(self, url: URLEntity) -> URLEntity:
+        with self.store.lock:
+            record = self.store.urls_by_id[url.id]
+            record.target_url = url.target_url
+            record.is_active = url.is_active
+            record.expires_at = url.expires_at
+        return url
+
+    def log_click(self, url: URLEntity):
+        with self.store.lock:
+            self.store.clicks.append((datetime.utcnow(), url.id))
+
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        now = datetime.utcnow()
+        hour_from = now - timedelta(hours=1)
+        day_from = now - timedelta(days=1)
+        last_hour: Counter[int] = Counter()
+        last_day: Counter[int] = Counter()
+        with self.store.lock:
+            # Клики упорядочены по времени: идём с конца и останавливаемся на суточной границе
+            for timestamp, url_id in reversed(self.store.clicks):
+                if timestamp < day_from:
+                    break
+                last_day[url_id] += 1
+                if timestamp >= hour_from:
+                    last_hour[url_id] += 1
+            # Ссылки без кликов за сутки тоже попадают в выдачу — с нулями
+            records = list(self.store.urls_by_id.values())
+
+        # Порядок тот же, что у PostgresURLRepository.get_stats
+        if after_id is not None:
+            records = [record for record in records if record.id > after_id]
+        if top is not None:
+            records = sorted(records, key=lambda record: (-last_day[record.id], record.id))[:top]
+        elif limit is None and after_id is None:
+            records = sorted(records, key=lambda record: (-last_day[record.id], record.id))
+        else:
+            records = sorted(records, key=lambda record: record.id)[:limit]
+        return [
+            URLStats(
+                id=record.id, key=record.key, secret_key=record.secret_key, target_url=record.target_url,
+                is_active=record.is_active, expires_at=record.expires_at, cacheable=record.cacheable,
+                created_at=record.created_at, last_hour_clicks=last_hour[record.id], last_day_clicks=last_day[record.id],
+            )
+            for record in records
+        ]
+
+
+class MemoryUserRepository(AbstractUserRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def add(self, user: UserEntity) -> UserEntity:
+        with self.store.lock:
+            existing = self.store.users.get(user.username)
+            user.id = existing.id if existing else self.store.next_user_id
+            if not existing:
+                self.store.next_user_id += 1
+            self.store.users[user.username] = _UserRecord(user.id, user.username, user.hashed_password)
+        return user
+
+    def get_by_username(self, username: str) -> Optional[UserEntity]:
+        record = self.store.users.get(username)
+        if record is None:
+            return None
+        return UserEntity(id=record.id, username=record.username, hashed_password=record.hashed_password)
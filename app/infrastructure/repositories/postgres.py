@@ -1,44 +1,112 @@
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import func, case, insert, select
+from app.core.config import settings
 from app.domain.entities import URL as URLEntity, User as UserEntity, URLStats
 from app.domain.repositories import AbstractURLRepository, AbstractUserRepository
 from .. import models
+from ..click_buffer import ClickBuffer
+from ..database import dialect_insert
+from ..rollups import bucket_start, increment_rollups
+
+STREAM_BATCH_SIZE = 1000
+
+# Чтение идёт выборкой колонок, а не ORM-объектов: без identity map и отслеживания
+# изменений. Колонки перечислены в порядке полей URLEntity, поэтому строка результата
+# распаковывается в сущность напрямую. ORM остаётся для записи.
+URL_COLUMNS = (
+    models.URL.id, models.URL.key, models.URL.secret_key, models.URL.target_url,
+    models.URL.is_active, models.URL.expires_at, models.URL.cacheable, models.URL.created_at,
+)
 
 
 class PostgresURLRepository(AbstractURLRepository):
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, click_buffer: ClickBuffer | None = None):
         self.db = session
+        self.click_buffer = click_buffer
 
     def _to_entity(self, db_url: models.URL) -> URLEntity:
         return URLEntity(
             id=db_url.id, key=db_url.key, secret_key=db_url.secret_key,
             target_url=db_url.target_url, is_active=db_url.is_active,
-            expires_at=db_url.expires_at,
+            expires_at=db_url.expires_at, cacheable=db_url.cacheable, created_at=db_url.created_at,
         )
 
     def add(self, url: URLEntity) -> URLEntity:
-        db_url = models.URL(key=url.key, secret_key=url.secret_key, target_url=url.target_url, is_active=url.is_active, expires_at=url.expires_at)
+        db_url = models.URL(
+            key=url.key, secret_key=url.secret_key, target_url=url.target_url, is_active=url.is_active,
+            expires_at=url.expires_at, cacheable=url.cacheable,
+        )
         self.db.add(db_url)
         self.db.commit()
         self.db.refresh(db_url)
         return self._to_entity(db_url)
 
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        # Одна вставка вместо SELECT + INSERT; гонка между проверкой и записью исключена
+        stmt = (
+            dialect_insert(self.db, models.URL)
+            .values(
+                key=url.key, secret_key=url.secret_key, target_url=url.target_url, is_active=url.is_active,
+                expires_at=url.expires_at, cacheable=url.cacheable,
+            )
+            # Конфликт только по key: совпадение secret_key — ошибка, а не «ключ занят»
+            .on_conflict_do_nothing(index_elements=[models.URL.key])
+            .returning(models.URL.id)
+        )
+        url_id = self.db.execute(stmt).scalar_one_or_none()
+        self.db.commit()
+        if url_id is None:
+            return None
+        url.id = url_id
+        return url
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        if not urls:
+            return []
+        # Один многострочный INSERT в одной транзакции; занятые ключи пропускаются
+        stmt = (
+            dialect_insert(self.db, models.URL)
+            .values([
+                {"key": url.key, "secret_key": url.secret_key, "target_url": url.target_url,
+                 "is_active": url.is_active, "expires_at": url.expires_at, "cacheable": url.cacheable}
+                for url in urls
+            ])
+            .on_conflict_do_nothing(index_elements=[models.URL.key])
+            .returning(models.URL.id, models.URL.key)
+        )
+        ids_by_key = {key: url_id for url_id, key in self.db.execute(stmt)}
+        self.db.commit()
+        created: List[Optional[URLEntity]] = []
+        for url in urls:
+            url.id = ids_by_key.get(url.key)
+            created.append(url if url.id is not None else None)
+        return created
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        stmt = select(models.url_key_seq.next_value()).select_from(func.generate_series(1, count))
+        return list(self.db.execute(stmt).scalars())
+
+    def _find_one(self, *criteria) -> Optional[URLEntity]:
+        row = self.db.execute(select(*URL_COLUMNS).where(*criteria).limit(1)).first()
+        return URLEntity(*row) if row else None
+
     def get_by_key(self, key: str) -> Optional[URLEntity]:
-        db_url = self.db.query(models.URL).filter(models.URL.key == key).first()
-        return self._to_entity(db_url) if db_url else None
+        return self._find_one(models.URL.key == key)
     
     def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
-        db_url = self.db.query(models.URL).filter(models.URL.secret_key == secret_key).first()
-        return self._to_entity(db_url) if db_url else None
+        return self._find_one(models.URL.secret_key == secret_key)
         
-    def get_all(self, skip: int, limit: int, active_only: bool) -> List[URLEntity]:
-        query = self.db.query(models.URL)
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        query = select(*URL_COLUMNS)
         if active_only:
-            query = query.filter(models.URL.is_active == True, models.URL.expires_at > datetime.utcnow())
-        db_urls = query.order_by(models.URL.id.desc()).offset(skip).limit(limit).all()
-        return [self._to_entity(url) for url in db_urls]
+            query = query.where(models.URL.is_active == True, models.URL.expires_at > datetime.utcnow())
+        if before_id is not None:
+            # Keyset-пагинация: продолжаем с места по индексу, не пропуская skip строк
+            query = query.where(models.URL.id < before_id)
+        rows = self.db.execute(query.order_by(models.URL.id.desc()).offset(skip).limit(limit))
+        return [URLEntity(*row) for row in rows]
 
     def update(self, url: URLEntity) -> URLEntity:
         db_url = self.db.get(models.URL, url.id)
@@ -50,41 +118,63 @@ class PostgresURLRepository(AbstractURLRepository):
         raise ValueError("URL not found for update")
         
     def log_click(self, url: URLEntity):
-        click = models.ClickEvent(url_id=url.id)
-        self.db.add(click)
+        if self.click_buffer is not None:
+            self.click_buffer.record(url.id)
+            return
+        timestamp = datetime.utcnow()
+        self.db.execute(insert(models.ClickEvent).values(url_id=url.id, timestamp=timestamp))
+        increment_rollups(self.db, [(url.id, timestamp)], settings.CLICK_ROLLUP_BUCKET_SECONDS)
         self.db.commit()
 
-    def get_stats(self) -> List[URLStats]:
+    def _stats_query(self, limit: Optional[int], after_id: Optional[int], top: Optional[int]):
+        # Суммируем только бакеты за последние сутки: стоимость агрегации зависит от числа
+        # недавно активных ссылок, а не от всей истории кликов. Ссылки без кликов за сутки
+        # остаются в выдаче с нулями, как и до перехода на агрегаты.
         now = datetime.utcnow()
-        one_hour_ago = now - timedelta(hours=1)
-        one_day_ago = now - timedelta(days=1)
-
-        clicks_subquery = (
-            self.db.query(
-                models.ClickEvent.url_id,
-                func.count(models.ClickEvent.id).label("total_clicks"),
-                func.count(case((models.ClickEvent.timestamp >= one_hour_ago, 1))).label("last_hour_clicks"),
-                func.count(case((models.ClickEvent.timestamp >= one_day_ago, 1))).label("last_day_clicks"),
-            ).group_by(models.ClickEvent.url_id).subquery()
+        bucket_seconds = settings.CLICK_ROLLUP_BUCKET_SECONDS
+        hour_from = bucket_start(now - timedelta(hours=1), bucket_seconds)
+        day_from = bucket_start(now - timedelta(days=1), bucket_seconds)
+
+        recent_clicks = (
+            select(
+                models.ClickRollup.url_id,
+                func.sum(case((models.ClickRollup.bucket_start >= hour_from, models.ClickRollup.clicks), else_=0)).label("last_hour_clicks"),
+                func.sum(models.ClickRollup.clicks).label("last_day_clicks"),
+            ).where(models.ClickRollup.bucket_start >= day_from)
         )
+        if after_id is not None:
+            recent_clicks = recent_clicks.where(models.ClickRollup.url_id > after_id)
+        recent_clicks = recent_clicks.group_by(models.ClickRollup.url_id).subquery()
 
-        results = (
-            self.db.query(
-                models.URL,
-                func.coalesce(clicks_subquery.c.last_hour_clicks, 0).label("lh_clicks"),
-                func.coalesce(clicks_subquery.c.last_day_clicks, 0).label("ld_clicks"),
-            ).outerjoin(clicks_subquery, models.URL.id == clicks_subquery.c.url_id)
-            .order_by(func.coalesce(clicks_subquery.c.total_clicks, 0).desc())
-            .all()
+        last_hour_clicks = func.coalesce(recent_clicks.c.last_hour_clicks, 0)
+        last_day_clicks = func.coalesce(recent_clicks.c.last_day_clicks, 0)
+        # Колонки URL_COLUMNS и затем клики — порядок полей URLStats
+        query = (
+            select(*URL_COLUMNS, last_hour_clicks.label("last_hour_clicks"), last_day_clicks.label("last_day_clicks"))
+            .outerjoin(recent_clicks, models.URL.id == recent_clicks.c.url_id)
         )
+        if after_id is not None:
+            query = query.where(models.URL.id > after_id)
+        # top и полный список упорядочены по кликам, постраничная выдача — по id ссылки
+        if top is not None or (limit is None and after_id is None):
+            query = query.order_by(last_day_clicks.desc(), models.URL.id)
+            return query.limit(top) if top is not None else query
+        query = query.order_by(models.URL.id)
+        return query.limit(limit) if limit is not None else query
 
-        return [
-            URLStats(
-                id=url.id, key=url.key, secret_key=url.secret_key, target_url=url.target_url,
-                is_active=url.is_active, expires_at=url.expires_at,
-                last_hour_clicks=lh_clicks, last_day_clicks=ld_clicks
-            ) for url, lh_clicks, ld_clicks in results
-        ]
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        rows = self.db.execute(self._stats_query(limit=limit, after_id=after_id, top=top))
+        return [URLStats(*row) for row in rows]
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        # yield_per включает серверный курсор: строки читаются порциями, память не растёт
+        query = self._stats_query(limit=limit, after_id=after_id, top=top)
+        for row in self.db.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE)):
+            yield URLStats(*row)
 
 
 class PostgresUserRepository(AbstractUserRepository):
@@ -100,10 +190,9 @@ class PostgresUserRepository(AbstractUserRepository):
         return user
 
     def get_by_username(self, username: str) -> Optional[UserEntity]:
-        db_user = self.db.query(models.User).filter(models.User.username == username).first()
-        if db_user:
-            return UserEntity(
-                id=db_user.id, username=db_user.username,
-                hashed_password=db_user.hashed_password
-            )
-        return None
\ No newline at end of file
+        row = self.db.execute(
+            select(models.User.id, models.User.username, models.User.hashed_password)
+            .where(models.User.username == username)
+            .limit(1)
+        ).first()
+        return UserEntity(*row) if row else None
\ No newline at end of file
@@ -0,0 +1,67 @@
+from typing import Callable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.domain.entities import URL as URLEntity, URLStats
+from app.domain.repositories import AbstractAsyncURLRepository, AbstractURLRepository
+from .postgres import PostgresURLRepository
+
+
+class AsyncPostgresURLRepository(AbstractAsyncURLRepository):
+    """Асинхронный репозиторий поверх AsyncSession.
+
+    Запросы выполняет синхронная реализация (PostgresURLRepository вместе с её
+    декораторами) через AsyncSession.run_sync: SQL описан в одном месте, а
+    ввод-вывод идёт через асинхронный драйвер, не занимая поток из threadpool.
+
+    Сессия реплики (replica) передаётся фабрике вместе с именем: внутри run_sync
+    запросы к ней тоже идут через её async-движок. Декораторы выполняются в потоке
+    event loop, поэтому блокирующих среди них быть не должно (см. DB_ASYNC_ENABLED).
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        repo_factory: Callable[..., AbstractURLRepository] = PostgresURLRepository,
+        replica: tuple[str, AsyncSession] | None = None,
+    ):
+        self.session = session
+        if replica is None:
+            self.repo = repo_factory(session.sync_session)
+        else:
+            replica_name, replica_session = replica
+            self.repo = repo_factory(session.sync_session, (replica_name, replica_session.sync_session))
+
+    async def _run(self, method, *args, **kwargs):
+        return await self.session.run_sync(lambda _: method(*args, **kwargs))
+
+    async def add(self, url: URLEntity) -> URLEntity:
+        return await self._run(self.repo.add, url)
+
+    async def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        return await self._run(self.repo.add_if_key_free, url)
+
+    async def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        return await self._run(self.repo.add_many, urls)
+
+    async def reserve_key_ids(self, count: int) -> List[int]:
+        return await self._run(self.repo.reserve_key_ids, count)
+
+    async def get_by_key(self, key: str) -> Optional[URLEntity]:
+        return await self._run(self.repo.get_by_key, key)
+
+    async def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        return await self._run(self.repo.get_by_secret_key, secret_key)
+
+    async def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        return await self._run(self.repo.get_all, skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+
+    async def update(self, url: URLEntity) -> URLEntity:
+        return await self._run(self.repo.update, url)
+
+    async def log_click(self, url: URLEntity):
+        return await self._run(self.repo.log_click, url)
+
+    async def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        return await self._run(self.repo.get_stats, limit=limit, after_id=after_id, top=top)
@@ -0,0 +1,112 @@
+import logging
+from typing import Callable, Iterator, List, Optional, TypeVar
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.metrics import DB_REPLICA_FALLBACKS, DB_ROUTED_READS
+from app.domain.entities import URL as URLEntity, URLStats
+from app.domain.repositories import AbstractURLRepository
+from ..replicas import ReplicaRouter
+from .postgres import PostgresURLRepository
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ReplicaRoutedURLRepository(AbstractURLRepository):
+    """Декоратор репозитория: поиск по ключу, список и статистика читаются с реплики.
+
+    Запись и чтение по secret_key (перед деактивацией) идут на primary. Поиск по ключу
+    возвращается на primary, если ключ недавно записан этим процессом или реплика его
+    не нашла: ссылка могла быть создана другим процессом и ещё не доехать до реплики.
+    Ошибка реплики исключает её из выбора до следующей проверки отставания.
+
+    Цена возврата при промахе: запрос несуществующего ключа (404, перебор ключей
+    сканерами) стоит два запроса — к реплике и к primary — и разгрузить primary от
+    такого трафика реплики не могут. От перебора ключей primary защищают фильтр
+    ключей и ограничение частоты запросов, а не реплики.
+    """
+
+    def __init__(self, repo: AbstractURLRepository, replica: PostgresURLRepository, replica_name: str, router: ReplicaRouter):
+        self.repo = repo
+        self.replica: PostgresURLRepository | None = replica
+        self.replica_name = replica_name
+        self.router = router
+
+    def _read(self, operation: str, read: Callable[[AbstractURLRepository], T]) -> T:
+        if self.replica is not None:
+            try:
+                result = read(self.replica)
+                DB_ROUTED_READS.inc(self.replica_name, operation)
+                return result
+            except SQLAlchemyError:
+                logger.warning("Read from replica %s failed, falling back to primary", self.replica_name, exc_info=True)
+                self.replica.db.rollback()
+                self.router.mark_failed(self.replica_name)
+                self.replica = None
+                DB_REPLICA_FALLBACKS.inc("error")
+        DB_ROUTED_READS.inc("primary", operation)
+        return read(self.repo)
+
+    def _read_key(self, operation: str, key: str, read: Callable[[AbstractURLRepository], Optional[URLEntity]]):
+        if self.router.recently_written(key):
+            DB_REPLICA_FALLBACKS.inc("recent_write")
+            DB_ROUTED_READS.inc("primary", operation)
+            return read(self.repo)
+        url = self._read(operation, read)
+        if url is None and self.replica is not None:
+            DB_REPLICA_FALLBACKS.inc("miss")
+            DB_ROUTED_READS.inc("primary", operation)
+            url = read(self.repo)
+        return url
+
+    def add(self, url: URLEntity) -> URLEntity:
+        added = self.repo.add(url)
+        self.router.note_write(added.key)
+        return added
+
+    def add_if_key_free(self, url: URLEntity) -> Optional[URLEntity]:
+        added = self.repo.add_if_key_free(url)
+        if added is not None:
+            self.router.note_write(added.key)
+        return added
+
+    def add_many(self, urls: List[URLEntity]) -> List[Optional[URLEntity]]:
+        added = self.repo.add_many(urls)
+        for url in added:
+            if url is not None:
+                self.router.note_write(url.key)
+        return added
+
+    def reserve_key_ids(self, count: int) -> List[int]:
+        return self.repo.reserve_key_ids(count)
+
+    def get_by_key(self, key: str) -> Optional[URLEntity]:
+        return self._read_key("get_by_key", key, lambda repo: repo.get_by_key(key))
+
+    def get_by_secret_key(self, secret_key: str) -> Optional[URLEntity]:
+        return self.repo.get_by_secret_key(secret_key)
+
+    def get_all(self, skip: int, limit: int, active_only: bool, before_id: Optional[int] = None) -> List[URLEntity]:
+        return self._read(
+            "get_all", lambda repo: repo.get_all(skip=skip, limit=limit, active_only=active_only, before_id=before_id)
+        )
+
+    def update(self, url: URLEntity) -> URLEntity:
+        updated = self.repo.update(url)
+        self.router.note_write(updated.key)
+        return updated
+
+    def log_click(self, url: URLEntity):
+        self.repo.log_click(url)
+
+    def get_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> List[URLStats]:
+        return self._read("get_stats", lambda repo: repo.get_stats(limit=limit, after_id=after_id, top=top))
+
+    def iter_stats(
+        self, limit: Optional[int] = None, after_id: Optional[int] = None, top: Optional[int] = None
+    ) -> Iterator[URLStats]:
+        # Ошибку посреди потока уже не перенаправить на primary
+        DB_ROUTED_READS.inc(self.replica_name if self.replica is not None else "primary", "iter_stats")
+        return (self.replica if self.replica is not None else self.repo).iter_stats(limit=limit, after_id=after_id, top=top)
@@ -0,0 +1,70 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from . import models
+from .database import dialect_insert
+from .periodic import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(timestamp: datetime, bucket_seconds: int) -> datetime:
+    """Начало бакета, в который попадает timestamp (naive UTC)."""
+    seconds = int((timestamp - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % bucket_seconds)
+
+
+def increment_rollups(db: Session, clicks: Iterable[tuple[int, datetime]], bucket_seconds: int) -> None:
+    """Добавляет клики (url_id, timestamp) в click_rollups одним upsert-запросом.
+
+    Изменения не коммитятся: вызывающий код делает commit вместе с записью самих кликов.
+    """
+    counts = Counter((url_id, bucket_start(timestamp, bucket_seconds)) for url_id, timestamp in clicks)
+    if not counts:
+        return
+    stmt = dialect_insert(db, models.ClickRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.ClickRollup.url_id, models.ClickRollup.bucket_start],
+        set_={"clicks": models.ClickRollup.clicks + stmt.excluded.clicks},
+    )
+    # Единый порядок строк снижает риск взаимных блокировок между параллельными сбросами
+    rows = [
+        {"url_id": url_id, "bucket_start": start, "clicks": n}
+        for (url_id, start), n in sorted(counts.items())
+    ]
+    db.execute(stmt, rows)
+
+
+def delete_expired_rollups(db: Session, retention: timedelta, now: datetime | None = None) -> int:
+    """Удаляет бакеты старше retention; статистика за день читает только последние 24 часа."""
+    cutoff = (now or datetime.utcnow()) - max(retention, timedelta(days=1))
+    deleted = db.execute(delete(models.ClickRollup).where(models.ClickRollup.bucket_start < cutoff)).rowcount
+    db.commit()
+    return deleted
+
+
+class ClickRollupPruner(PeriodicWorker):
+    """Раз в interval секунд удаляет бакеты click_rollups, вышедшие за срок хранения."""
+
+    thread_name = "click-rollup-pruner"
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float, retention: timedelta):
+        super().__init__(interval)
+        self.session_factory = session_factory
+        self.retention = retention
+
+    def run_once(self) -> int:
+        try:
+            with self.session_factory() as db:
+                deleted = delete_expired_rollups(db, self.retention)
+        except Exception:
+            logger.exception("Failed to delete expired click rollups")
+            return 0
+        if deleted:
+            logger.info("Deleted %d expired click rollup buckets", deleted)
+        return deleted
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from app.core.cache import TTLCache
+from app.core.metrics import SHARED_CACHE_LOOKUPS
+from app.domain.entities import URL as URLEntity
+from .periodic import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# Отсутствующий ключ кэшируется как пустая строка, чтобы запросы к несуществующему
+# популярному ключу тоже не уходили в БД с каждого узла
+_MISSING = ""
+# Метка инвалидации: пока она жива, значение ключа читается из БД и не кэшируется
+_INVALIDATED = "-"
+
+
+def create_redis_client(url: str, socket_timeout: float | None):
+    """Клиент Redis; пакет redis нужен только при SHARED_CACHE_ENABLED (pip install .[redis])."""
+    import redis
+
+    return redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+
+
+def _in_event_loop() -> bool:
+    """True, если код выполняется в потоке event loop (async-режим БД через run_sync)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _dump(url: Optional[URLEntity]) -> str:
+    # secret_key в Redis не попадает (как и в индекс ключей): он даёт право деактивировать
+    # ссылку, а редиректу не нужен
+    if url is None:
+        return _MISSING
+    return json.dumps({
+        "id": url.id, "key": url.key, "target_url": url.target_url,
+        "is_active": url.is_active, "expires_at": url.expires_at.isoformat(), "cacheable": url.cacheable,
+        "created_at": url.created_at.isoformat() if url.created_at else None,
+    })
+
+
+def _load(raw: bytes | str) -> Optional[URLEntity]:
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    if raw == _MISSING:
+        return None
+    data = json.loads(raw)
+    data["secret_key"] = ""
+    data["expires_at"] = datetime.fromisoformat(data["expires_at"])
+    if data.get("created_at"):
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return URLEntity(**data)
+
+
+class SharedURLCache:
+    """Кэш ключ → ссылка в Redis, общий для всех узлов (cache-aside).
+
+    Промах по ключу загружает из БД только тот, кто взял блокировку lock:<ключ>;
+    остальные до lock_wait секунд ждут, пока значение появится в кэше. В потоке event
+    loop (DB_ASYNC_ENABLED) ожидание заблокировало бы все запросы процесса, поэтому там
+    значение сразу читается из БД. Ошибки Redis не прерывают запрос: чтение идёт напрямую в БД.
+
+    Инвалидация побеждает загрузку, начатую до неё: invalidate и forget оставляют на
+    lock_ttl секунд метку, которую запись загруженного значения (SET NX) не перезаписывает,
+    а держатель блокировки, чья блокировка истекла, значение не записывает вовсе.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl: float,
+        missing_ttl: float,
+        lock_ttl: float,
+        lock_wait: float,
+        prefix: str = "url:",
+        channel: str = "url-invalidations",
+        poll_interval: float = 0.01,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.prefix = prefix
+        self.channel = channel
+        self.poll_interval = poll_interval
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.prefix}lock:{key}"
+
+    def _get(self, key: str) -> tuple[str, Optional[URLEntity]]:
+        """("hit", ссылка или None для отсутствующего ключа), ("miss", None) или ("invalidated", None)."""
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            return "miss", None
+        if raw in (_INVALIDATED, _INVALIDATED.encode()):
+            return "invalidated", None
+        return "hit", _load(raw)
+
+    def _set(self, key: str, url: Optional[URLEntity]) -> None:
+        ttl = self.missing_ttl if url is None else min(self.ttl, (url.expires_at - datetime.utcnow()).total_seconds())
+        if ttl > 0:
+            # NX: значение не перезаписывает метку инвалидации и уже записанную версию
+            self.client.set(self._key(key), _dump(url), nx=True, px=int(ttl * 1000))
+
+    def _wait_for(self, key: str) -> tuple[str, Optional[URLEntity]]:
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            state, url = self._get(key)
+            if state != "miss":
+                return state, url
+        return "miss", None
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[URLEntity]]) -> Optional[URLEntity]:
+        try:
+            state, url = self._get(key)
+            if state == "hit":
+                SHARED_CACHE_LOOKUPS.inc("hit")
+                return url
+            if state == "invalidated":
+                SHARED_CACHE_LOOKUPS.inc("invalidated")
+                return loader()
+            token = secrets.token_hex(8)
+            if not self.client.set(self._lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000)):
+                if _in_event_loop():
+                    SHARED_CACHE_LOOKUPS.inc("wait_skipped")
+                    return loader()
+                state, url = self._wait_for(key)
+                if state == "hit":
+                    SHARED_CACHE_LOOKUPS.inc("wait_hit")
+                    return url
+                if state == "invalidated":
+                    SHARED_CACHE_LOOKUPS.inc("invalidated")
+                    return loader()
+                # Держатель блокировки не успел: читаем сами, не дожидаясь его
+                SHARED_CACHE_LOOKUPS.inc("wait_timeout")
+                return loader()
+        except Exception:
+            SHARED_CACHE_LOOKUPS.inc("error")
+            logger.warning("Shared cache unavailable, reading %s from the database", key)
+            return loader()
+
+        SHARED_CACHE_LOOKUPS.inc("miss")
+        url = loader()
+        try:
+            # Блокировка истекла — метка инвалидации, поставленная после начала загрузки,
+            # тоже могла истечь, поэтому значение не записывается; чужую блокировку не трогаем
+            if self.client.get(self._lock_key(key)) in (token, token.encode()):
+                self._set(key, url)
+                self.client.delete(self._lock_key(key))
+        except Exception:
+            SHARED_CACHE_LOOKUPS.inc("error")
+            logger.warning("Could not store %s in the shared cache", key)
+        return url
+
+    def put(self, key: str, url: URLEntity) -> None:
+        """Кладёт ссылку в общий кэш без загрузки из БД (прогрев)."""
+        try:
+            self._set(key, url)
+        except Exception:
+            SHARED_CACHE_LOOKUPS.inc("error")
+            logger.warning("Could not store %s in the shared cache", key)
+
+    def _mark_invalidated(self, key: str) -> None:
+        self.client.set(self._key(key), _INVALIDATED, px=int(self.lock_ttl * 1000))
+
+    def forget(self, key: str) -> None:
+        """Удаляет ключ из общего кэша (например, после создания ссылки с этим ключом)."""
+        try:
+            self._mark_invalidated(key)
+        except Exception:
+            SHARED_CACHE_LOOKUPS.inc("error")
+            logger.warning("Could not delete %s from the shared cache", key)
+
+    def invalidate(self, key: str) -> None:
+        """Удаляет ключ из общего кэша и рассылает узлам сигнал сбросить локальные копии."""
+        try:
+            self._mark_invalidated(key)
+            self.client.publish(self.channel, key)
+        except Exception:
+            SHARED_CACHE_LOOKUPS.inc("error")
+            logger.warning("Could not invalidate %s in the shared cache", key)
+
+
+class SharedCacheInvalidationListener(PeriodicWorker):
+    """Поток, сбрасывающий записи локального кэша по сообщениям из канала инвалидаций.
+
+    После обрыва соединения сообщения могли потеряться, поэтому локальный кэш
+    очищается целиком.
+    """
+
+    thread_name = "shared-cache-invalidations"
+
+    def __init__(self, client, channel: str, local_cache: TTLCache, poll_timeout: float = 1.0):
+        # Интервал нулевой: run_once сам ждёт сообщения до poll_timeout секунд
+        super().__init__(interval=0)
+        self.client = client
+        self.channel = channel
+        self.local_cache = local_cache
+        self.poll_timeout = poll_timeout
+        self._pubsub = None
+
+    def _subscribe(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def run_once(self) -> int:
+        try:
+            if self._pubsub is None:
+                self._pubsub = self._subscribe()
+                self.local_cache.clear()
+            message = self._pubsub.get_message(timeout=self.poll_timeout)
+        except Exception:
+            logger.warning("Lost subscription to %s, resubscribing", self.channel)
+            self._pubsub = None
+            self._stop.wait(self.poll_timeout)
+            return 0
+        if message is None or message.get("type") != "message":
+            return 0
+        key = message["data"]
+        self.local_cache.invalidate(key.decode() if isinstance(key, bytes) else key)
+        return 1
+
+    def stop(self, timeout: float | None = None) -> None:
+        super().stop(timeout)
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
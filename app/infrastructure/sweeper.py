@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.metrics import EXPIRED_LINKS_DEACTIVATED
+from . import models
+from .periodic import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+
+def deactivate_expired(db: Session, batch_size: int, now: datetime | None = None) -> int:
+    """Деактивирует до batch_size истёкших активных ссылок; возвращает их число."""
+    now = now or datetime.utcnow()
+    # Поиск идёт по частичному индексу ix_urls_active_expires_at
+    expired_ids = (
+        select(models.URL.id)
+        .where(models.URL.is_active == True, models.URL.expires_at < now)
+        .order_by(models.URL.expires_at)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Несколько экземпляров sweeper'а разбирают разные пачки, не дожидаясь друг друга
+        expired_ids = expired_ids.with_for_update(skip_locked=True)
+    result = db.execute(
+        update(models.URL)
+        .where(models.URL.id.in_(expired_ids.scalar_subquery()))
+        .values(is_active=False)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    EXPIRED_LINKS_DEACTIVATED.inc(amount=result.rowcount)
+    return result.rowcount
+
+
+def sweep_expired(session_factory: Callable[[], Session], batch_size: int, max_batches: int | None = None) -> int:
+    """Деактивирует истёкшие ссылки пачками по batch_size, каждая в своей транзакции."""
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with session_factory() as db:
+            deactivated = deactivate_expired(db, batch_size)
+        total += deactivated
+        batches += 1
+        if deactivated < batch_size:
+            break
+    return total
+
+
+class ExpirySweeper(PeriodicWorker):
+    """Фоновый поток, раз в interval секунд деактивирующий истёкшие ссылки.
+
+    За один проход обрабатывается не больше max_batches пачек, чтобы после долгого
+    простоя sweeper не держал соединение и не нагружал БД непрерывно.
+    """
+
+    thread_name = "expiry-sweeper"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float,
+        batch_size: int,
+        max_batches: int,
+    ):
+        super().__init__(interval)
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+
+    def run_once(self) -> int:
+        try:
+            deactivated = sweep_expired(self.session_factory, self.batch_size, self.max_batches)
+        except Exception:
+            logger.exception("Failed to deactivate expired links")
+            return 0
+        if deactivated:
+            logger.info("Deactivated %d expired links", deactivated)
+        return deactivated
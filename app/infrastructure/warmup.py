@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterator
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from app.core.metrics import CACHE_WARMUP_DURATION, CACHE_WARMUP_KEYS
+from app.domain.entities import URL as URLEntity
+from . import models
+from .repositories.postgres import URL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+WARMUP_BATCH_SIZE = 500
+
+
+@dataclass
+class WarmupReport:
+    ready: bool
+    loaded: int
+    seconds: float
+    timed_out: bool
+    error: str | None
+
+
+def iter_popular_urls(db: Session, limit: int, window: timedelta, now: datetime | None = None) -> Iterator[URLEntity]:
+    """Активные ссылки с наибольшим числом кликов за окно window, самые популярные первыми.
+
+    Клики берутся из click_rollups: агрегаты по бакетам дешевле, чем сканирование
+    сырых click_events.
+    """
+    now = now or datetime.utcnow()
+    # GROUP BY по первичному ключу позволяет выбирать остальные колонки urls
+    query = (
+        select(*URL_COLUMNS)
+        .join(models.ClickRollup, models.ClickRollup.url_id == models.URL.id)
+        .where(
+            models.ClickRollup.bucket_start >= now - window,
+            models.URL.is_active == True,
+            models.URL.expires_at > now,
+        )
+        .group_by(models.URL.id)
+        .order_by(func.sum(models.ClickRollup.clicks).desc())
+        .limit(limit)
+        .execution_options(yield_per=WARMUP_BATCH_SIZE)
+    )
+    for row in db.execute(query):
+        yield URLEntity(*row)
+
+
+class CacheWarmer:
+    """Фоновая загрузка популярных ссылок в кэши редиректов после старта процесса.
+
+    До завершения прогрева ready() возвращает False — по нему /health/ready отвечает
+    503 и балансировщик не направляет на узел трафик. Прогрев ограничен time_budget
+    секундами: по истечении бюджета узел объявляется готовым с тем, что успел загрузить.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        sinks: list[Callable[[URLEntity], None]],
+        top_n: int,
+        window: timedelta,
+        time_budget: float,
+    ):
+        self.session_factory = session_factory
+        self.sinks = sinks
+        self.top_n = top_n
+        self.window = window
+        self.time_budget = time_budget
+        self._done = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._report = WarmupReport(ready=False, loaded=0, seconds=0.0, timed_out=False, error=None)
+
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def report(self) -> WarmupReport:
+        return self._report
+
+    def mark_ready(self) -> None:
+        """Прогрев не нужен (выключен или нечего греть)."""
+        self._report = WarmupReport(ready=True, loaded=0, seconds=0.0, timed_out=False, error=None)
+        self._done.set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name="cache-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> WarmupReport:
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+        loaded = 0
+        timed_out = False
+        error = None
+        try:
+            with self.session_factory() as db:
+                if db.get_bind().dialect.name == "postgresql":
+                    # Медленный запрос не должен держать узел неготовым дольше бюджета
+                    db.execute(text(f"SET LOCAL statement_timeout = {max(1, int(self.time_budget * 1000))}"))
+                for url in iter_popular_urls(db, self.top_n, self.window):
+                    for sink in self.sinks:
+                        sink(url)
+                    loaded += 1
+                    if time.perf_counter() >= deadline:
+                        timed_out = loaded < self.top_n
+                        break
+        except Exception as exc:
+            # Холодный кэш — не повод не принимать трафик
+            logger.exception("Cache warm-up failed")
+            error = str(exc)
+        elapsed = time.perf_counter() - started
+        CACHE_WARMUP_KEYS.set(loaded)
+        CACHE_WARMUP_DURATION.set(elapsed)
+        self._report = WarmupReport(ready=True, loaded=loaded, seconds=elapsed, timed_out=timed_out, error=error)
+        self._done.set()
+        logger.info("Cache warm-up loaded %d keys in %.2fs%s", loaded, elapsed, " (time budget exceeded)" if timed_out else "")
+        return self._report
@@ -1,8 +1,81 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.responses import RedirectResponse
-from app.api.v1.endpoints import urls as urls_v1
-from app.api.dependencies import get_url_use_cases
-from app.domain.use_cases import URLUseCases
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.v1.endpoints import urls as urls_v1, admin as admin_v1, export as export_v1
+from app.api.dependencies import (
+    cache_warmer, click_analytics, click_analytics_flusher, click_buffer, expiry_sweeper, get_async_url_use_cases,
+    key_filter_refresher, partition_maintainer, replica_lag_monitor, replica_router, rollup_pruner,
+    shared_cache_listener,
+)
+from app.api.middleware import AdmissionControlMiddleware, MetricsMiddleware
+from app.api.redirects import redirect_response
+from app.core.admission import ConcurrencyLimiter, RateLimiter
+from app.core.config import settings
+from app.core.metrics import REGISTRY
+from app.domain.use_cases import AsyncURLUseCases
+from app.infrastructure.database import async_engine, async_replica_engines
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    uses_db = settings.STORAGE_BACKEND == "postgres"
+    sweeper_enabled = settings.SWEEPER_ENABLED and uses_db
+    partitions_enabled = settings.CLICK_PARTITION_MAINTENANCE_ENABLED and uses_db
+    rollup_pruning_enabled = settings.CLICK_ROLLUP_RETENTION_HOURS is not None and uses_db
+    key_filter_enabled = settings.KEY_FILTER_ENABLED and uses_db
+    warmup_enabled = settings.CACHE_WARMUP_ENABLED and uses_db and bool(cache_warmer.sinks)
+    replicas_enabled = replica_router.enabled and uses_db
+    if replicas_enabled:
+        # До первой проверки отставания реплики не используются
+        await run_in_threadpool(replica_lag_monitor.run_once)
+        replica_lag_monitor.start()
+    if partitions_enabled:
+        # Первый проход синхронный: партиция на сегодня нужна до первого клика
+        await run_in_threadpool(partition_maintainer.start)
+    if rollup_pruning_enabled:
+        rollup_pruner.start()
+    if settings.CLICK_BUFFER_ENABLED:
+        click_buffer.start()
+    if sweeper_enabled:
+        expiry_sweeper.start()
+    if shared_cache_listener is not None:
+        shared_cache_listener.start()
+    if key_filter_enabled:
+        # Пока фильтр строится, запросы проходят мимо него
+        key_filter_refresher.start()
+    if settings.ANALYTICS_ENABLED:
+        click_analytics_flusher.start()
+    if warmup_enabled:
+        # Прогрев идёт в фоне; до его окончания /health/ready отвечает 503
+        cache_warmer.start()
+    else:
+        cache_warmer.mark_ready()
+    yield
+    if warmup_enabled:
+        await run_in_threadpool(cache_warmer.stop)
+    if key_filter_enabled:
+        await run_in_threadpool(key_filter_refresher.stop)
+    if shared_cache_listener is not None:
+        await run_in_threadpool(shared_cache_listener.stop)
+    if sweeper_enabled:
+        await run_in_threadpool(expiry_sweeper.stop)
+    if partitions_enabled:
+        await run_in_threadpool(partition_maintainer.stop)
+    if rollup_pruning_enabled:
+        await run_in_threadpool(rollup_pruner.stop)
+    if settings.ANALYTICS_ENABLED:
+        await run_in_threadpool(click_analytics_flusher.stop)
+    if settings.CLICK_BUFFER_ENABLED:
+        # Сбрасываем накопленные клики до остановки процесса
+        await run_in_threadpool(click_buffer.stop)
+    if replicas_enabled:
+        await run_in_threadpool(replica_lag_monitor.stop)
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica_engine in async_replica_engines.values():
+        await replica_engine.dispose()
 
 
 app = FastAPI(
@@ -11,20 +84,104 @@ app = FastAPI(
     version="2.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 app.include_router(urls_v1.router, prefix="/api/v1/urls", tags=["URL Management"])
+app.include_router(admin_v1.router, prefix="/api/v1/admin", tags=["Administration"])
+app.include_router(export_v1.router, prefix="/api/v1/export", tags=["Export"])
+
+
+def _admission_limiters() -> dict[str, ConcurrencyLimiter]:
+    limits = {
+        "redirect": (settings.ADMISSION_REDIRECT_CONCURRENCY, settings.ADMISSION_REDIRECT_QUEUE_SIZE,
+                     settings.ADMISSION_REDIRECT_MAX_WAIT_SECONDS),
+        "create": (settings.ADMISSION_CREATE_CONCURRENCY, settings.ADMISSION_CREATE_QUEUE_SIZE,
+                   settings.ADMISSION_CREATE_MAX_WAIT_SECONDS),
+    }
+    return {
+        route: ConcurrencyLimiter(limit, queue_size, max_wait)
+        for route, (limit, queue_size, max_wait) in limits.items() if limit > 0
+    }
+
+
+# Добавляется раньше MetricsMiddleware, чтобы отклонённые запросы попадали в метрики HTTP
+if settings.ADMISSION_ENABLED or settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        limiters=_admission_limiters() if settings.ADMISSION_ENABLED else {},
+        rate_limiter=RateLimiter(
+            rate=settings.RATE_LIMIT_PER_SECOND, burst=settings.RATE_LIMIT_BURST, max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+        ) if settings.RATE_LIMIT_ENABLED else None,
+        address_rate_limiter=RateLimiter(
+            rate=settings.RATE_LIMIT_ADDRESS_PER_SECOND, burst=settings.RATE_LIMIT_ADDRESS_BURST,
+            max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+        ) if settings.RATE_LIMIT_ENABLED else None,
+        retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    )
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    # Регистрируется до "/{short_key}", иначе путь был бы принят за короткий ключ
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/health/ready", summary="Готовность принимать трафик", tags=["Health"])
+def readiness():
+    report = cache_warmer.report()
+    return JSONResponse(
+        {"ready": report.ready, "warmup": asdict(report)},
+        status_code=status.HTTP_200_OK if report.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+def _record_click(request: Request, key: str, referrer: str | None) -> None:
+    if settings.ANALYTICS_ENABLED:
+        client_ip = request.client.host if request.client else ""
+        click_analytics.record(key, client_ip, referrer, request.headers.get("user-agent"))
 
 
 @app.get("/{short_key}", summary="Перенаправление на оригинальный URL", tags=["Public Redirect"])
-def forward_to_target_url(
+async def forward_to_target_url(
     short_key: str,
-    use_cases: URLUseCases = Depends(get_url_use_cases),
+    request: Request,
+    use_cases: AsyncURLUseCases = Depends(get_async_url_use_cases),
 ):
-    url = use_cases.find_and_process_url(short_key)
+    # В режиме beacon клик учитывает POST /{short_key}/click со страницы перехода
+    url = await use_cases.find_and_process_url(short_key, log_click=settings.REDIRECT_MODE != "beacon")
     if not url:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="URL not found, has expired, or is inactive."
         )
-    return RedirectResponse(url=url.target_url)
\ No newline at end of file
+    if settings.REDIRECT_MODE != "beacon":
+        _record_click(request, url.key, request.headers.get("referer"))
+    return redirect_response(request, url)
+
+
+@app.post(
+    "/{short_key}/click",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Учёт перехода со страницы beacon",
+    tags=["Public Redirect"],
+)
+async def register_click(
+    short_key: str,
+    request: Request,
+    referrer: str | None = None,
+    use_cases: AsyncURLUseCases = Depends(get_async_url_use_cases),
+):
+    # Вне режима beacon клик уже учтён редиректом: иначе любой мог бы накручивать счётчики
+    if settings.REDIRECT_MODE != "beacon":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not await use_cases.register_click(short_key):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="URL not found, has expired, or is inactive."
+        )
+    # Referer самого beacon-запроса — страница перехода; исходный источник страница передаёт параметром
+    _record_click(request, short_key, referrer)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -0,0 +1,41 @@
+import argparse
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+sys.path.append('.')
+
+from app.infrastructure.database import SessionLocal
+from app.infrastructure.rollups import bucket_start
+from app.core.config import settings
+
+# Пересчитывает бакеты целиком, поэтому скрипт можно безопасно запускать повторно.
+BACKFILL_SQL = text("""
+    INSERT INTO click_rollups (url_id, bucket_start, clicks)
+    SELECT url_id,
+           timestamp 'epoch' + floor(extract(epoch FROM "timestamp") / :bucket) * :bucket * interval '1 second',
+           count(*)
+    FROM click_events
+    WHERE "timestamp" >= :since
+    GROUP BY 1, 2
+    ON CONFLICT (url_id, bucket_start) DO UPDATE SET clicks = EXCLUDED.clicks
+""")
+
+
+def main(days: int):
+    # Окно начинается с границы бакета: иначе первый бакет пересчитался бы не целиком
+    # и перезаписал бы верный счётчик меньшим.
+    since = bucket_start(datetime.utcnow() - timedelta(days=days), settings.CLICK_ROLLUP_BUCKET_SECONDS)
+    print(f"Backfilling click_rollups from click_events since {since:%Y-%m-%d %H:%M:%S}...")
+    db = SessionLocal()
+    result = db.execute(BACKFILL_SQL, {"bucket": settings.CLICK_ROLLUP_BUCKET_SECONDS, "since": since})
+    db.commit()
+    print(f"Done: {result.rowcount} buckets written.")
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill click_rollups from raw click_events (PostgreSQL).")
+    parser.add_argument("--days", type=int, default=1, help="How many days of history to aggregate.")
+    args = parser.parse_args()
+    main(days=args.days)
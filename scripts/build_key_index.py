@@ -0,0 +1,32 @@
+import argparse
+import sys
+import time
+
+sys.path.append('.')
+
+from app.infrastructure.database import SessionLocal
+from app.infrastructure.key_index import BUILD_BATCH_SIZE, build_key_index
+from app.core.config import settings
+
+
+def main(path: str, batch_size: int, interval: float | None):
+    while True:
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            count = build_key_index(db, path, batch_size)
+        print(f"Key index {path}: {count} links in {time.perf_counter() - started:.2f}s.", flush=True)
+        if interval is None:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the shared key index file read by all workers on this host.")
+    parser.add_argument("--path", default=settings.KEY_INDEX_PATH)
+    parser.add_argument("--batch-size", type=int, default=BUILD_BATCH_SIZE)
+    parser.add_argument(
+        "--interval", type=float, default=None,
+        help="Rebuild every N seconds (default: build once). Keep it well below KEY_INDEX_MAX_AGE_SECONDS.",
+    )
+    args = parser.parse_args()
+    main(path=args.path, batch_size=args.batch_size, interval=args.interval)
@@ -0,0 +1,46 @@
+import argparse
+import sys
+from datetime import datetime
+
+sys.path.append('.')
+
+from app.infrastructure.database import SessionLocal
+from app.infrastructure.export import export_chunks, naive_utc
+from app.core.config import settings
+
+
+def utc_datetime(value: str) -> datetime:
+    return naive_utc(datetime.fromisoformat(value))
+
+
+def main(table: str, output_format: str, compress: bool, output: str, batch_size: int,
+         since: datetime | None, until: datetime | None, active_only: bool):
+    written = 0
+    target = sys.stdout.buffer if output == "-" else open(output, "wb")
+    try:
+        with SessionLocal() as db:
+            for chunk in export_chunks(db, table, output_format, compress, batch_size,
+                                       since=since, until=until, active_only=active_only):
+                target.write(chunk)
+                written += len(chunk)
+    finally:
+        if target is not sys.stdout.buffer:
+            target.close()
+    print(f"Exported {table}: {written} bytes.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream urls or click_events as NDJSON/CSV using a server-side cursor.")
+    parser.add_argument("table", choices=["urls", "clicks"])
+    parser.add_argument("--format", dest="output_format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip.")
+    parser.add_argument("--output", "-o", default="-", help="Output file (default: stdout).")
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    parser.add_argument("--since", type=utc_datetime, default=None, help="Inclusive start, UTC (ISO 8601).")
+    parser.add_argument("--until", type=utc_datetime, default=None, help="Exclusive end, UTC (ISO 8601).")
+    parser.add_argument("--active-only", action="store_true", help="Only active, unexpired links (for clicks: clicks on them).")
+    args = parser.parse_args()
+    main(
+        table=args.table, output_format=args.output_format, compress=args.gzip, output=args.output,
+        batch_size=args.batch_size, since=args.since, until=args.until, active_only=args.active_only,
+    )
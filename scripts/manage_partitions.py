@@ -0,0 +1,32 @@
+import argparse
+import sys
+
+sys.path.append('.')
+
+from app.infrastructure.database import SessionLocal
+from app.infrastructure.partitions import (
+    drop_expired_partitions, ensure_partitions, list_partitions, purge_default_partition,
+)
+from app.core.config import settings
+
+
+def main(days_ahead: int, retention_days: int | None):
+    db = SessionLocal()
+    created = ensure_partitions(db, days_ahead)
+    print(f"Created partitions: {', '.join(created) or 'none'}")
+    if retention_days:
+        dropped = drop_expired_partitions(db, retention_days)
+        print(f"Dropped partitions older than {retention_days} days: {', '.join(dropped) or 'none'}")
+        purged = purge_default_partition(db, retention_days)
+        print(f"Deleted {purged} expired clicks from the default partition")
+    print(f"Partitions: {', '.join(list_partitions(db))}")
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming and drop expired click_events partitions (PostgreSQL).")
+    parser.add_argument("--days-ahead", type=int, default=settings.CLICK_PARTITION_DAYS_AHEAD)
+    parser.add_argument("--retention-days", type=int, default=settings.CLICK_RETENTION_DAYS,
+                        help="Drop partitions and default-partition clicks older than this many days (default: CLICK_RETENTION_DAYS).")
+    args = parser.parse_args()
+    main(days_ahead=args.days_ahead, retention_days=args.retention_days)
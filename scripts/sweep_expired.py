@@ -0,0 +1,22 @@
+import argparse
+import sys
+
+sys.path.append('.')
+
+from app.infrastructure.database import SessionLocal
+from app.infrastructure.sweeper import sweep_expired
+from app.core.config import settings
+
+
+def main(batch_size: int, max_batches: int | None):
+    print(f"Deactivating expired links in batches of {batch_size}...")
+    deactivated = sweep_expired(SessionLocal, batch_size, max_batches)
+    print(f"Done: {deactivated} links deactivated.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deactivate expired short links in bounded batches.")
+    parser.add_argument("--batch-size", type=int, default=settings.SWEEPER_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches (default: all).")
+    args = parser.parse_args()
+    main(batch_size=args.batch_size, max_batches=args.max_batches)
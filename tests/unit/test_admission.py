@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.middleware import AdmissionControlMiddleware, admission_route
+from app.core.admission import ConcurrencyLimiter, RateLimiter
+
+
+def test_limiter_queues_until_deadline_and_sheds_when_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, queue_size=1, max_wait=0.2)
+        assert await limiter.acquire() == "admitted"
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        assert await limiter.acquire() == "queue_full"
+        limiter.release()
+        assert await queued == "queued" and limiter.in_flight == 1
+
+        assert await limiter.acquire() == "deadline" and limiter.queued == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_rate_limiter_refills_per_client():
+    limiter = RateLimiter(rate=2, burst=2, max_clients=1)
+    assert limiter.take("a", now=0) == 0 and limiter.take("a", now=0) == 0
+    assert limiter.take("a", now=0) == 0.5
+    assert limiter.take("a", now=0.5) == 0
+    # Вытесненный клиент начинает с полной корзины
+    assert limiter.take("b", now=0.5) == 0 and limiter.take("a", now=0.5) == 0
+
+
+def test_admission_routes():
+    assert admission_route("GET", "/abc123") == "redirect"
+    assert admission_route("POST", "/abc123/click") == "redirect"
+    assert admission_route("POST", "/api/v1/urls/") == "create"
+    assert admission_route("POST", "/api/v1/urls/batch") == "create"
+    assert admission_route("GET", "/metrics") is None
+    assert admission_route("GET", "/api/v1/urls/") is None
+    assert admission_route("GET", "/health/ready") is None
+
+
+def test_middleware_sheds_and_rate_limits():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/{key}")
+    async def slow(key: str):
+        if key == "slow":
+            await release.wait()
+        return {"key": key}
+
+    @app.get("/api/v1/urls/")
+    async def urls():
+        return []
+
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        limiters={"redirect": ConcurrencyLimiter(limit=1, queue_size=0, max_wait=0)},
+        rate_limiter=RateLimiter(rate=0.5, burst=1, max_clients=10),
+        retry_after=3,
+    )
+    client = TestClient(app)
+
+    async def overloaded():
+        # Первый запрос держит единственное место, второй отклоняется сразу
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            first = asyncio.create_task(http.get("/slow"))
+            await asyncio.sleep(0.05)
+            shed = await http.get("/other")
+            release.set()
+            return (await first).status_code, shed
+
+    first_status, shed = asyncio.run(overloaded())
+    assert first_status == 200
+    assert shed.status_code == 503 and shed.headers["retry-after"] == "3"
+
+    assert client.get("/api/v1/urls/", auth=("u", "p")).status_code == 200
+    limited = client.get("/api/v1/urls/", auth=("u", "p"))
+    assert limited.status_code == 429 and limited.headers["retry-after"] == "2"
+    assert client.get("/api/v1/urls/", auth=("u", "other")).status_code == 200
+    assert client.get("/api/v1/urls/").status_code == 200
+
+
+def test_random_credentials_share_the_address_bucket():
+    app = FastAPI()
+
+    @app.get("/api/v1/urls/")
+    async def urls():
+        return []
+
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        limiters={},
+        rate_limiter=RateLimiter(rate=0.5, burst=1, max_clients=10),
+        address_rate_limiter=RateLimiter(rate=0.5, burst=3, max_clients=10),
+        retry_after=3,
+    )
+    client = TestClient(app)
+
+    # Каждый случайный пароль получает новую корзину учётных данных, но не адреса
+    statuses = [client.get("/api/v1/urls/", auth=("admin", f"guess{i}")).status_code for i in range(3)]
+    assert statuses == [200, 200, 200]
+    assert client.get("/api/v1/urls/", auth=("admin", "guess3")).status_code == 429
+    assert client.get("/api/v1/urls/").status_code == 429
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import Settings
+from app.infrastructure.analytics import (
+    ClickAnalytics, ClickAnalyticsFlusher, ClickAnalyticsReader, MemorySketchStore, SQLSketchStore,
+    referrer_host, user_agent_family,
+)
+from app.infrastructure.database import Base
+
+CHROME = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+EDGE = CHROME + " Edg/126.0"
+
+
+def make_analytics(max_tracked_links: int = 100) -> ClickAnalytics:
+    return ClickAnalytics(
+        window_seconds=3600, hll_precision=10, top_k=20, cms_width=256, cms_depth=4,
+        max_tracked_links=max_tracked_links, visitor_salt="test",
+    )
+
+
+def test_click_metadata_is_reduced():
+    assert user_agent_family(CHROME) == "Chrome" and user_agent_family(EDGE) == "Edge"
+    assert user_agent_family("Googlebot/2.1") == "bot" and user_agent_family(None) == "unknown"
+    assert referrer_host("https://news.example.com/item?id=1") == "news.example.com"
+    assert referrer_host(None) == "direct" and referrer_host("not a url") == "unknown"
+
+
+def test_sketches_are_merged_across_flushes_and_processes():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    store = SQLSketchStore(sessionmaker(bind=engine))
+    now = datetime.utcnow()
+    # Два процесса со своими скетчами пишут в одно хранилище
+    for worker in range(2):
+        analytics = make_analytics()
+        flusher = ClickAnalyticsFlusher(analytics, store, interval=60, retention=timedelta(hours=2))
+        for i in range(300):
+            analytics.record("hot", f"10.0.{worker}.{i % 100}", "https://news.example.com/", CHROME, now=now)
+        for i in range(50):
+            analytics.record("warm", "10.0.0.1", None, EDGE, now=now)
+        analytics.record("old", "10.0.0.1", None, CHROME, now=now - timedelta(hours=5))
+        assert flusher.run_once() > 0
+        assert analytics.drain() == {}
+
+    reader = ClickAnalyticsReader(store, window_seconds=3600)
+    visitors, error = reader.unique_visitors("hot", hours=1, now=now)
+    assert abs(visitors - 200) <= 200 * 4 * error
+    assert reader.unique_visitors("warm", hours=1, now=now)[0] == 1
+    assert reader.unique_visitors("missing", hours=1, now=now) == (0, 0.0)
+
+    links = reader.top("links", hours=1, limit=10, now=now)
+    assert [(value, clicks) for value, clicks, _ in links] == [("hot", 600), ("warm", 100)]
+    assert reader.top("referrers", hours=1, limit=1, now=now)[0][:2] == ("news.example.com", 600)
+    assert {value for value, _, _ in reader.top("user_agents", hours=1, limit=10, now=now)} == {"Chrome", "Edge"}
+    # Окна старше retention удалены при сбросе
+    assert "old" not in {value for value, _, _ in reader.top("links", hours=24, limit=10, now=now)}
+    engine.dispose()
+
+
+def test_tracked_links_are_capped_and_failed_flush_is_retried():
+    analytics = make_analytics(max_tracked_links=1)
+    analytics.record("a", "10.0.0.1", None, CHROME)
+    analytics.record("b", "10.0.0.1", None, CHROME)
+
+    class FailingStore(MemorySketchStore):
+        def merge(self, pending):
+            raise RuntimeError("db is down")
+
+    assert ClickAnalyticsFlusher(analytics, FailingStore(), interval=60, retention=timedelta(hours=1)).run_once() == 0
+    store = MemorySketchStore()
+    ClickAnalyticsFlusher(analytics, store, interval=60, retention=timedelta(hours=1)).run_once()
+    reader = ClickAnalyticsReader(store, window_seconds=3600)
+    assert reader.unique_visitors("a", hours=1)[0] == 1 and reader.unique_visitors("b", hours=1)[0] == 0
+    assert sorted(value for value, _, _ in reader.top("links", hours=1, limit=10)) == ["a", "b"]
+
+
+def test_analytics_requires_visitor_salt():
+    options = {"DATABASE_URL": "sqlite://", "TEST_DATABASE_URL": "sqlite://"}
+    with pytest.raises(ValidationError, match="ANALYTICS_VISITOR_SALT"):
+        Settings(**options, ANALYTICS_ENABLED=True)
+    assert Settings(**options, ANALYTICS_ENABLED=True, ANALYTICS_VISITOR_SALT="s3cret").ANALYTICS_ENABLED
+    assert Settings(**options).ANALYTICS_VISITOR_SALT is None
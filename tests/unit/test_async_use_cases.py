@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.api import dependencies
+from app.core.cache import TTLCache
+from app.core.config import Settings, settings
+from app.domain.entities import URL, URLStats
+from app.domain.repositories import AbstractAsyncURLRepository
+from app.domain.use_cases import AsyncURLUseCases
+from app.infrastructure.database import Base
+from app.infrastructure.repositories.cached import CachedURLRepository
+from app.infrastructure.repositories.postgres import PostgresURLRepository
+from app.infrastructure.repositories.postgres_async import AsyncPostgresURLRepository
+
+
+class AsyncInMemoryURLRepository(AbstractAsyncURLRepository):
+    """Фейковый асинхронный репозиторий для unit-тестов."""
+    def __init__(self):
+        self._data: dict[str, URL] = {}
+        self._secrets: dict[str, URL] = {}
+        self._clicks: list[int] = []
+
+    async def add(self, url: URL) -> URL:
+        url.id = len(self._data) + 1
+        self._data[url.key] = url
+        self._secrets[url.secret_key] = url
+        return url
+
+    async def get_by_key(self, key: str) -> URL | None: return self._data.get(key)
+    async def get_by_secret_key(self, key: str) -> URL | None: return self._secrets.get(key)
+    async def get_all(self, skip, limit, active_only, before_id=None): return list(self._data.values())[skip:skip+limit]
+    async def update(self, url: URL) -> URL: self._data[url.key] = url; return url
+    async def log_click(self, url: URL): self._clicks.append(url.id)
+    async def get_stats(self) -> list[URLStats]: return []
+    async def reserve_key_ids(self, count: int) -> list[int]: return list(range(count))
+
+
+def test_async_create_redirect_and_deactivate():
+    async def scenario():
+        use_cases = AsyncURLUseCases(repo=AsyncInMemoryURLRepository())
+        url = await use_cases.create_url("https://example.com")
+        assert (await use_cases.find_and_process_url(url.key)).target_url == "https://example.com"
+        assert use_cases.repo._clicks == [url.id]
+
+        await use_cases.deactivate_url(url.secret_key)
+        assert await use_cases.find_and_process_url(url.key) is None
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def async_databases(tmp_path, monkeypatch):
+    # Два SQLite-файла вместо primary и реплики; «репликация» — ручная вставка в оба
+    paths = {name: tmp_path / f"{name}.db" for name in ("primary", "replica1")}
+    for name, path in paths.items():
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            PostgresURLRepository(db).add(URL(
+                id=None, key="both", secret_key="both_s", target_url=f"https://{name}.example.com/both",
+                expires_at=datetime.utcnow() + timedelta(days=1),
+            ))
+        engine.dispose()
+    for flag in ("URL_CACHE_ENABLED", "KEY_FILTER_ENABLED", "METRICS_ENABLED"):
+        monkeypatch.setattr(settings, flag, True)
+    monkeypatch.setattr(dependencies, "memory_store", None)
+    monkeypatch.setattr(dependencies, "url_cache", TTLCache(max_size=100, ttl=60))
+    return {name: f"sqlite+aiosqlite:///{path}" for name, path in paths.items()}
+
+
+class RecordingDatabaseURLRepository(PostgresURLRepository):
+    """Запоминает, в каком потоке выполнялся запрос."""
+
+    threads: list[int] = []
+
+    def get_by_key(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get_by_key(key)
+
+
+def test_native_async_repo_reads_replica_through_decorator_chain(async_databases, monkeypatch):
+    monkeypatch.setattr(dependencies, "PostgresURLRepository", RecordingDatabaseURLRepository)
+    RecordingDatabaseURLRepository.threads = []
+
+    async def scenario():
+        engines = {name: create_async_engine(url) for name, url in async_databases.items()}
+        try:
+            primary, replica = (async_sessionmaker(engine)() for engine in engines.values())
+            async with primary, replica:
+                repo = AsyncPostgresURLRepository(primary, dependencies.build_url_repo, replica=("replica1", replica))
+                assert isinstance(repo.repo.repo, CachedURLRepository)
+                use_cases = AsyncURLUseCases(repo)
+
+                assert (await use_cases.find_and_process_url("both")).target_url == "https://replica1.example.com/both"
+                # Повторный переход отвечает локальный кэш, без запроса к реплике
+                lookups = len(RecordingDatabaseURLRepository.threads)
+                assert (await use_cases.find_and_process_url("both")).target_url == "https://replica1.example.com/both"
+                assert len(RecordingDatabaseURLRepository.threads) == lookups
+
+                # Только что созданная ссылка читается с primary (read-after-write)
+                created = await use_cases.create_url("https://example.com/new")
+                assert (await use_cases.find_and_process_url(created.key)).id == created.id
+                await use_cases.deactivate_url(created.secret_key)
+                assert await use_cases.find_and_process_url(created.key) is None
+            return threading.get_ident()
+        finally:
+            for engine in engines.values():
+                await engine.dispose()
+
+    loop_thread = asyncio.run(scenario())
+    # Декораторы и синхронные репозитории выполняются в потоке event loop, а не в threadpool
+    assert set(RecordingDatabaseURLRepository.threads) == {loop_thread}
+
+
+def test_shared_cache_is_rejected_in_async_mode():
+    options = {"DATABASE_URL": "sqlite://", "TEST_DATABASE_URL": "sqlite://", "SHARED_CACHE_ENABLED": True}
+    with pytest.raises(ValidationError, match="Redis"):
+        Settings(**options, DB_ASYNC_ENABLED=True)
+    assert Settings(**options).SHARED_CACHE_ENABLED
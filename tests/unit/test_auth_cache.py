@@ -0,0 +1,52 @@
+from unittest.mock import patch
+from app.core import auth
+from app.core.auth import CredentialCache, get_password_hash
+from app.core.cache import TTLCache
+from app.domain.entities import User
+from app.infrastructure.repositories.cached import CachedUserRepository
+
+
+class InMemoryUserRepository:
+    def __init__(self):
+        self.users: dict[str, User] = {}
+        self.lookups = 0
+
+    def add(self, user: User) -> User:
+        self.users[user.username] = user
+        return user
+
+    def get_by_username(self, username: str) -> User | None:
+        self.lookups += 1
+        return self.users.get(username)
+
+
+def test_credential_cache_skips_bcrypt_after_first_success():
+    cache = CredentialCache(max_size=10, ttl=60)
+    hashed = get_password_hash("secret")
+    with patch.object(auth, "verify_password", wraps=auth.verify_password) as verify:
+        assert cache.verify("admin", "secret", hashed)
+        assert cache.verify("admin", "secret", hashed)
+        assert verify.call_count == 1
+        # Неверный пароль не кэшируется и каждый раз проверяется заново
+        assert not cache.verify("admin", "wrong", hashed)
+        assert not cache.verify("admin", "wrong", hashed)
+        assert verify.call_count == 3
+    assert cache.cache.stats().hits == 1
+
+
+def test_credential_cache_rechecks_after_password_change():
+    cache = CredentialCache(max_size=10, ttl=60)
+    assert cache.verify("admin", "secret", get_password_hash("secret"))
+    assert not cache.verify("admin", "secret", get_password_hash("other"))
+
+
+def test_cached_user_repository_invalidates_on_add():
+    repo = InMemoryUserRepository()
+    cached = CachedUserRepository(repo, TTLCache(max_size=10, ttl=60))
+    cached.add(User(id=1, username="admin", hashed_password="old"))
+    assert cached.get_by_username("admin").hashed_password == "old"
+    assert cached.get_by_username("admin").hashed_password == "old"
+    assert repo.lookups == 1
+    cached.add(User(id=1, username="admin", hashed_password="new"))
+    assert cached.get_by_username("admin").hashed_password == "new"
+    assert repo.lookups == 2
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.bloom import BloomFilter, optimal_parameters
+from app.domain.use_cases import URLUseCases
+from app.infrastructure import models
+from app.infrastructure.database import Base
+from app.infrastructure.key_filter import URLKeyFilter
+from app.infrastructure.repositories.filtered import KeyFilteredURLRepository
+from app.infrastructure.repositories.postgres import PostgresURLRepository
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=10_000, fp_rate=0.01)
+    for i in range(10_000):
+        bloom.add(f"key{i}")
+    assert all(f"key{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"other{i}" in bloom for i in range(10_000))
+    assert false_positives < 200
+
+
+def test_sizing_for_hundred_million_keys():
+    bits, hashes = optimal_parameters(10**8, 0.01)
+    assert 110 * 2**20 < bits / 8 < 120 * 2**20
+    assert hashes == 7
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        for i in range(3):
+            db.add(models.URL(key=f"key{i}", secret_key=f"key{i}_s", target_url="https://example.com",
+                              expires_at=datetime.utcnow() + timedelta(days=1)))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+class CountingRepository(PostgresURLRepository):
+    lookups = 0
+
+    def get_by_key(self, key):
+        self.lookups += 1
+        return super().get_by_key(key)
+
+def test_unknown_keys_skip_the_database(session_factory):
+    key_filter = URLKeyFilter(capacity=1000, fp_rate=0.001)
+    with session_factory() as db:
+        inner = CountingRepository(db)
+        repo = KeyFilteredURLRepository(inner, key_filter)
+        # До построения фильтр пропускает всё
+        assert repo.get_by_key("missing") is None
+        assert inner.lookups == 1
+
+        assert key_filter.rebuild(db, batch_size=2) == 3
+        assert repo.get_by_key("missing") is None
+        assert repo.get_by_key("key1").key == "key1"
+        assert inner.lookups == 2
+
+        created = URLUseCases(repo).create_url("https://example.org")
+        assert inner.lookups == 2
+        assert repo.get_by_key(created.key).id == created.id
+
+
+def test_refresh_picks_up_keys_from_other_processes(session_factory):
+    key_filter = URLKeyFilter(capacity=1000, fp_rate=0.001)
+    with session_factory() as db:
+        key_filter.rebuild(db, batch_size=100)
+        db.add(models.URL(key="elsewhere", secret_key="elsewhere_s", target_url="https://example.com",
+                          expires_at=datetime.utcnow() + timedelta(days=1)))
+        db.commit()
+        assert not key_filter.might_exist("elsewhere")
+        key_filter.refresh(db)
+    assert key_filter.might_exist("elsewhere")
+    assert key_filter.stats().last_id == 4
+
+
+def test_refresh_does_not_recount_keys_in_overlap(session_factory):
+    key_filter = URLKeyFilter(capacity=1000, fp_rate=0.001)
+    with session_factory() as db:
+        key_filter.rebuild(db, batch_size=100)
+        assert key_filter.refresh(db) == 0
+        db.add(models.URL(key="late", secret_key="late_s", target_url="https://example.com",
+                          expires_at=datetime.utcnow() + timedelta(days=1)))
+        db.commit()
+        assert key_filter.refresh(db) == 1
+        keys = key_filter.stats().keys
+        assert key_filter.refresh(db) == 0 and key_filter.refresh(db) == 0
+    assert key_filter.stats().keys == keys == 4
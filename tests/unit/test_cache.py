@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from app.core.cache import TTLCache
+from app.domain.entities import URL
+from app.infrastructure.repositories.cached import CachedURLRepository
+
+
+class CountingURLRepository:
+    """Минимальный репозиторий, считающий обращения к get_by_key."""
+    def __init__(self, url: URL):
+        self.url = url
+        self.lookups = 0
+
+    def get_by_key(self, key: str) -> URL | None:
+        self.lookups += 1
+        return self.url if key == self.url.key else None
+
+    def update(self, url: URL) -> URL:
+        self.url = url
+        return url
+
+
+def make_url(expires_in: timedelta = timedelta(days=1)) -> URL:
+    return URL(id=1, key="abc", secret_key="abc_secret", target_url="https://example.com",
+               expires_at=datetime.utcnow() + expires_in)
+
+
+def test_lru_eviction():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats().evictions == 1
+
+
+def test_ttl_expiration(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(max_size=10, ttl=5)
+    cache.set("a", 1)
+    now[0] += 6
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats.expirations == 1 and stats.misses == 1
+
+
+def test_cached_repo_hits_cache():
+    inner = CountingURLRepository(make_url())
+    repo = CachedURLRepository(inner, TTLCache(max_size=10, ttl=60))
+    for _ in range(5):
+        assert repo.get_by_key("abc") is not None
+    assert inner.lookups == 1
+
+
+def test_cached_repo_does_not_cache_expired_links():
+    inner = CountingURLRepository(make_url(expires_in=timedelta(seconds=-1)))
+    repo = CachedURLRepository(inner, TTLCache(max_size=10, ttl=60))
+    repo.get_by_key("abc")
+    repo.get_by_key("abc")
+    assert inner.lookups == 2
+
+
+def test_cached_repo_invalidates_on_update():
+    url = make_url()
+    inner = CountingURLRepository(url)
+    repo = CachedURLRepository(inner, TTLCache(max_size=10, ttl=60))
+    repo.get_by_key("abc")
+    url.deactivate()
+    repo.update(url)
+    assert repo.get_by_key("abc").is_active is False
+    assert inner.lookups == 2
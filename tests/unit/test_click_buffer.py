@@ -0,0 +1,63 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import Settings
+from app.infrastructure import models
+from app.infrastructure.click_buffer import ClickBuffer
+from app.infrastructure.database import Base
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(models.URL(key="abc", secret_key="abc_secret", target_url="https://example.com",
+                          expires_at=func.now()))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def count_clicks(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(models.ClickEvent))
+
+
+def test_flush_writes_in_batches(session_factory):
+    buffer = ClickBuffer(session_factory, max_size=100, batch_size=3, flush_interval=60)
+    for _ in range(7):
+        buffer.record(1)
+    assert buffer.flush() == 7
+    assert count_clicks(session_factory) == 7
+    stats = buffer.stats()
+    assert stats.flushes == 3 and stats.queue_depth == 0
+
+
+@pytest.mark.parametrize("policy,expected_first", [("drop_newest", 1), ("drop_oldest", 2)])
+def test_drop_policies(session_factory, policy, expected_first):
+    buffer = ClickBuffer(session_factory, max_size=2, batch_size=10, flush_interval=60, drop_policy=policy)
+    results = [buffer.record(url_id) for url_id in (1, 2, 3)]
+    assert buffer.stats().dropped == 1
+    assert results[-1] is (policy != "drop_newest")
+    assert buffer._queue[0][0] == expected_first
+
+
+def test_stop_flushes_pending_clicks(session_factory):
+    buffer = ClickBuffer(session_factory, max_size=100, batch_size=50, flush_interval=60)
+    buffer.start()
+    for _ in range(5):
+        buffer.record(1)
+    buffer.stop(timeout=5)
+    assert count_clicks(session_factory) == 5
+
+
+def test_block_policy_is_rejected_in_async_mode():
+    options = {"DATABASE_URL": "sqlite://", "TEST_DATABASE_URL": "sqlite://", "CLICK_BUFFER_ENABLED": True}
+    with pytest.raises(ValidationError, match="event loop"):
+        Settings(**options, DB_ASYNC_ENABLED=True, CLICK_BUFFER_DROP_POLICY="block")
+    assert Settings(**options, DB_ASYNC_ENABLED=True, CLICK_BUFFER_DROP_POLICY="drop_oldest").DB_ASYNC_ENABLED
+    assert Settings(**options, CLICK_BUFFER_DROP_POLICY="block").CLICK_BUFFER_DROP_POLICY == "block"
@@ -0,0 +1,15 @@
+import pytest
+from fastapi import HTTPException
+from app.api.v1.cursors import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    payload = {"stats_after_id": 42}
+    assert decode_cursor(encode_cursor(payload)) == payload
+
+
+@pytest.mark.parametrize("token", ["not-base64!", "bnVsbA", "WzFd"])
+def test_invalid_cursor_is_rejected(token):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token)
+    assert exc.value.status_code == 400
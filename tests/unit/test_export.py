@@ -0,0 +1,66 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.infrastructure import models
+from app.infrastructure.database import Base
+from app.infrastructure.export import encode_chunks, export_chunks, naive_utc
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        session.execute(insert(models.URL), [
+            {"key": f"k{i}", "secret_key": f"k{i}_s", "target_url": f"https://example.com/{i},\"q\"",
+             "is_active": i % 2 == 0, "expires_at": datetime.utcnow() + timedelta(days=-1 if i == 4 else 1),
+             "created_at": NOW + timedelta(hours=i)}
+            for i in range(10)
+        ])
+        session.execute(insert(models.ClickEvent), [
+            {"url_id": 1 + i % 10, "timestamp": NOW + timedelta(minutes=i)} for i in range(100)
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def read(chunks, compressed=False) -> str:
+    data = b"".join(chunks)
+    return (gzip.decompress(data) if compressed else data).decode()
+
+
+def test_export_urls_ndjson_with_filters(db):
+    lines = read(export_chunks(db, "urls", "ndjson", False, batch_size=3, since=NOW + timedelta(hours=2),
+                               until=NOW + timedelta(hours=8), active_only=True)).splitlines()
+    rows = [json.loads(line) for line in lines]
+    # k4 активна, но истекла
+    assert [row["key"] for row in rows] == ["k2", "k6"]
+    assert "secret_key" not in rows[0] and rows[0]["created_at"] == (NOW + timedelta(hours=2)).isoformat()
+
+
+def test_export_clicks_csv_gzip(db):
+    text = read(export_chunks(db, "clicks", "csv", True, batch_size=7, active_only=True), compressed=True)
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert len(rows) == 40 and {int(row["url_id"]) for row in rows} == {1, 3, 7, 9}
+
+    urls = list(csv.reader(io.StringIO(read(export_chunks(db, "urls", "csv", False, batch_size=3)))))
+    assert urls[0][:3] == ["id", "key", "target_url"] and urls[1][2] == 'https://example.com/0,"q"'
+
+
+def test_chunks_are_bounded():
+    chunks = list(encode_chunks((f"{i}\n" for i in range(100_000)), chunk_size=1024))
+    assert len(chunks) > 100 and max(map(len, chunks)) < 2048
+
+
+def test_naive_utc_converts_aware_bounds():
+    assert naive_utc(datetime(2026, 10, 18, 15, 0, tzinfo=timezone(timedelta(hours=3)))) == NOW
+    assert naive_utc(NOW) == NOW and naive_utc(None) is None
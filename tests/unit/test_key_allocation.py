@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.domain.entities import URL
+from app.domain.exceptions import KeyAllocationError
+from app.domain.key_allocation import KEY_SIZE, SequenceKeyAllocator, encode_base62, sequence_key
+from app.domain.use_cases import URLUseCases
+from app.infrastructure.database import Base
+from app.infrastructure.repositories.postgres import PostgresURLRepository
+from test_use_cases import InMemoryURLRepository
+
+
+class SequenceInMemoryURLRepository(InMemoryURLRepository):
+    def __init__(self):
+        super().__init__()
+        self._sequence = 0
+        self.reservations = 0
+
+    def reserve_key_ids(self, count: int) -> list[int]:
+        self.reservations += 1
+        ids = list(range(self._sequence, self._sequence + count))
+        self._sequence += count
+        return ids
+
+
+def test_encode_base62():
+    assert encode_base62(0) == "0" * KEY_SIZE
+    assert encode_base62(61, width=2) == "0z"
+
+
+def test_sequence_keys_are_unique_and_not_sequential():
+    keys = [sequence_key(n) for n in range(10_000)]
+    assert len(set(keys)) == len(keys)
+    assert all(len(key) == KEY_SIZE for key in keys)
+    assert keys[1] != encode_base62(1)
+
+
+def test_sequence_allocator_reserves_blocks():
+    repo = SequenceInMemoryURLRepository()
+    use_cases = URLUseCases(repo, key_allocator=SequenceKeyAllocator(block_size=10))
+    urls = [use_cases.create_url("https://example.com") for _ in range(25)]
+    assert len({url.key for url in urls}) == 25
+    assert repo.reservations == 3
+
+
+def test_create_url_gives_up_after_repeated_conflicts():
+    class TakenKeys(InMemoryURLRepository):
+        def add_if_key_free(self, url):
+            return None
+
+    class FixedAllocator:
+        block_size = 0
+        def take(self): return "taken"
+
+    with pytest.raises(KeyAllocationError):
+        URLUseCases(TakenKeys(), key_allocator=FixedAllocator()).create_url("https://example.com")
+
+
+def test_create_urls_retries_only_conflicting_items():
+    class OneConflict(InMemoryURLRepository):
+        conflicted = False
+        def add_if_key_free(self, url):
+            if not self.conflicted:
+                self.conflicted = True
+                return None
+            return super().add_if_key_free(url)
+
+    repo = OneConflict()
+    urls = URLUseCases(repo).create_urls(["https://a.com", "https://b.com", "https://c.com"])
+    assert [url.target_url for url in urls] == ["https://a.com", "https://b.com", "https://c.com"]
+    assert len(repo._data) == 3
+
+
+def test_only_key_conflicts_mean_key_taken():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    with Session(engine) as db:
+        repo = PostgresURLRepository(db)
+        assert repo.add_if_key_free(URL(None, "a", "a_s", "https://a.com", expires_at=expires_at)).id == 1
+        assert repo.add_if_key_free(URL(None, "a", "b_s", "https://a.com", expires_at=expires_at)) is None
+        assert repo.add_many([URL(None, "a", "c_s", "https://a.com", expires_at=expires_at)]) == [None]
+        # Совпавший secret_key не должен выдаваться за занятый ключ
+        with pytest.raises(IntegrityError):
+            repo.add_if_key_free(URL(None, "b", "a_s", "https://b.com", expires_at=expires_at))
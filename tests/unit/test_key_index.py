@@ -0,0 +1,102 @@
+import os
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.domain.entities import URL
+from app.infrastructure.database import Base
+from app.infrastructure.key_index import KeyIndex, build_key_index
+from app.infrastructure.repositories.indexed import KeyIndexedURLRepository
+from app.infrastructure.repositories.memory import MemoryStore, MemoryURLRepository
+from app.infrastructure.repositories.postgres import PostgresURLRepository
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def add_urls(db, keys, is_active=True, days=1):
+    repo = PostgresURLRepository(db)
+    return [
+        repo.add(URL(id=None, key=key, secret_key=f"{key}_s", target_url=f"https://example.com/{key}/ü",
+                     is_active=is_active, expires_at=datetime.utcnow() + timedelta(days=days), cacheable=False))
+        for key in keys
+    ]
+
+
+def test_index_round_trip(db, tmp_path):
+    path = str(tmp_path / "keys.idx")
+    created = add_urls(db, [f"k{i}" for i in range(200)])
+    add_urls(db, ["off"], is_active=False)
+    add_urls(db, ["gone"], days=-1)
+    assert build_key_index(db, path, batch_size=50) == 200
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    index = KeyIndex(path, max_age=60, check_interval=0)
+    for url in created:
+        found = index.lookup(url.key)
+        assert found.id == url.id and found.target_url == url.target_url and found.secret_key == ""
+        assert (found.is_active, found.cacheable, found.expires_at) == (True, False, url.expires_at)
+    assert index.lookup("off") is None and index.lookup("gone") is None and index.lookup("missing") is None
+
+
+def test_index_swaps_and_falls_back_to_repository(db, tmp_path):
+    path = str(tmp_path / "keys.idx")
+    add_urls(db, ["old"])
+    build_key_index(db, path)
+
+    store = MemoryStore(click_capacity=100)
+    inner = MemoryURLRepository(store)
+    fresh = inner.add(URL(id=None, key="fresh", secret_key="fresh_s", target_url="https://example.com/fresh",
+                          expires_at=datetime.utcnow() + timedelta(days=1)))
+    index = KeyIndex(path, max_age=60, check_interval=0)
+    repo = KeyIndexedURLRepository(inner, index)
+
+    assert repo.get_by_key("old").target_url == "https://example.com/old/ü"
+    # Ключа, созданного после сборки, в снимке нет — ответ из нижележащего репозитория
+    assert repo.get_by_key("fresh") == fresh
+
+    add_urls(db, ["new"])
+    build_key_index(db, path)
+    assert repo.get_by_key("new") is not None
+
+    # Изменённый в этом процессе ключ не читается из снимка, собранного до изменения
+    repo.update(inner.add(URL(id=None, key="new", secret_key="new_s", target_url="https://example.com/moved",
+                              expires_at=datetime.utcnow() + timedelta(days=1))))
+    assert repo.get_by_key("new").target_url == "https://example.com/moved"
+
+    index.max_age = 0
+    assert index.lookup("new") is None
+
+
+def test_missing_or_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / "keys.idx"
+    index = KeyIndex(str(path), max_age=60, check_interval=0)
+    assert index.lookup("abc") is None
+    path.write_bytes(b"garbage" * 10)
+    assert index.lookup("abc") is None
+
+
+def test_change_during_build_is_not_served_from_new_snapshot(db, tmp_path, monkeypatch):
+    path = str(tmp_path / "keys.idx")
+    add_urls(db, ["busy"])
+    build_key_index(db, path)
+    index = KeyIndex(path, max_age=60, check_interval=0)
+    assert index.lookup("busy") is not None
+
+    execute = db.execute
+
+    def execute_after_change(*args, **kwargs):
+        # Ссылка меняется в этом процессе, пока сборка читает таблицу
+        index.forget("busy")
+        return execute(*args, **kwargs)
+
+    monkeypatch.setattr(db, "execute", execute_after_change)
+    build_key_index(db, path)
+    assert index.lookup("busy") is None
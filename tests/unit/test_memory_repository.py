@@ -0,0 +1,83 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+from app.domain.entities import URL, User
+from app.domain.key_allocation import SequenceKeyAllocator
+from app.domain.use_cases import URLUseCases
+from app.infrastructure.repositories.memory import MemoryStore, MemoryURLRepository, MemoryUserRepository
+
+
+def _url(key: str) -> URL:
+    return URL(id=None, key=key, secret_key=f"{key}_s", target_url=f"https://example.com/{key}",
+               expires_at=datetime.utcnow() + timedelta(days=1))
+
+
+def test_add_and_lookup_return_copies():
+    repo = MemoryURLRepository(MemoryStore(click_capacity=10))
+    url = repo.add(_url("a"))
+    assert url.id == 1
+    assert repo.add_if_key_free(_url("a")) is None
+    assert [u and u.key for u in repo.add_many([_url("a"), _url("b")])] == [None, "b"]
+
+    found = repo.get_by_key("a")
+    found.deactivate()
+    assert repo.get_by_secret_key("a_s").is_active
+    repo.update(found)
+    assert not repo.get_by_key("a").is_active
+
+
+def test_get_all_paginates_newest_first():
+    repo = MemoryURLRepository(MemoryStore(click_capacity=10))
+    for key in "abcde":
+        repo.add(_url(key))
+    repo.update(replace(repo.get_by_key("d"), is_active=False))
+
+    assert [u.key for u in repo.get_all(skip=0, limit=2, active_only=False)] == ["e", "d"]
+    assert [u.key for u in repo.get_all(skip=0, limit=2, active_only=True)] == ["e", "c"]
+    assert [u.key for u in repo.get_all(skip=1, limit=10, active_only=True, before_id=4)] == ["b", "a"]
+
+
+def test_active_only_listing_skips_expired_links():
+    repo = MemoryURLRepository(MemoryStore(click_capacity=10))
+    repo.add(_url("a"))
+    repo.add(replace(_url("b"), expires_at=datetime.utcnow() - timedelta(minutes=1)))
+
+    assert [u.key for u in repo.get_all(skip=0, limit=10, active_only=True)] == ["a"]
+    assert [u.key for u in repo.get_all(skip=0, limit=10, active_only=False)] == ["b", "a"]
+
+
+def test_stats_count_only_recent_clicks_in_ring_buffer():
+    store = MemoryStore(click_capacity=3)
+    repo = MemoryURLRepository(store)
+    a, b = repo.add(_url("a")), repo.add(_url("b"))
+    store.clicks.append((datetime.utcnow() - timedelta(days=2), a.id))
+    for url in (a, b, b, b):
+        repo.log_click(url)
+
+    # Ёмкость буфера 3: старый клик и первый клик по "a" вытеснены
+    stats = repo.get_stats()
+    assert [(s.key, s.last_hour_clicks, s.last_day_clicks) for s in stats] == [("b", 3, 3), ("a", 0, 0)]
+
+
+def test_stats_ordering_matches_postgres_modes():
+    repo = MemoryURLRepository(MemoryStore(click_capacity=100))
+    urls = [repo.add(_url(key)) for key in "abc"]
+    for url, clicks in zip(urls, (1, 3, 2)):
+        for _ in range(clicks):
+            repo.log_click(url)
+
+    assert [s.key for s in repo.get_stats()] == ["b", "c", "a"]
+    assert [s.key for s in repo.get_stats(top=2)] == ["b", "c"]
+    assert [s.key for s in repo.get_stats(limit=2)] == ["a", "b"]
+    assert [s.key for s in repo.get_stats(limit=2, after_id=1)] == ["b", "c"]
+
+
+def test_use_cases_with_sequence_keys_and_users():
+    store = MemoryStore(click_capacity=10)
+    use_cases = URLUseCases(MemoryURLRepository(store), key_allocator=SequenceKeyAllocator(block_size=2))
+    keys = {use_cases.create_url(f"https://example.com/{i}").key for i in range(5)}
+    assert len(keys) == 5
+
+    users = MemoryUserRepository(store)
+    users.add(User(id=None, username="admin", hashed_password="h1"))
+    users.add(User(id=None, username="admin", hashed_password="h2"))
+    assert users.get_by_username("admin") == User(id=1, username="admin", hashed_password="h2")
@@ -0,0 +1,36 @@
+from app.core.metrics import REDIRECTS, Counter, Histogram
+from app.domain.use_cases import URLUseCases
+from test_use_cases import InMemoryURLRepository
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    lines = histogram.render().splitlines()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("events_total", "Events.", ("name",))
+    counter.inc('a"b')
+    assert 'events_total{name="a\\"b"} 1' in counter.render().splitlines()
+
+
+def test_redirect_outcomes_are_counted():
+    use_cases = URLUseCases(repo=InMemoryURLRepository())
+    url = use_cases.create_url("https://example.com")
+    before = {outcome: REDIRECTS.value(outcome) for outcome in ("hit", "not_found", "inactive")}
+
+    use_cases.find_and_process_url(url.key)
+    use_cases.find_and_process_url("missing")
+    use_cases.deactivate_url(url.secret_key)
+    use_cases.find_and_process_url(url.key)
+
+    assert {outcome: REDIRECTS.value(outcome) - count for outcome, count in before.items()} == {
+        "hit": 1, "not_found": 1, "inactive": 1,
+    }
@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.infrastructure.partitions import (
+    DEFAULT_PARTITION, expired_partitions, maintain_partitions, partition_day, partition_name,
+)
+
+
+class RecordingPostgresSession:
+    """Сессия, которая притворяется PostgreSQL и запоминает выполненный SQL."""
+
+    def __init__(self, partitions: list[str], partitioned: bool = True):
+        self.partitions = partitions
+        self.partitioned = partitioned
+        self.statements: list[tuple[str, dict | None]] = []
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        if "pg_partitioned_table" in sql:
+            return SimpleNamespace(scalar=lambda: self.partitioned)
+        if "pg_inherits" in sql:
+            return SimpleNamespace(scalars=lambda: iter(self.partitions))
+        return SimpleNamespace(rowcount=3)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_partition_name_round_trip():
+    assert partition_name(date(2025, 1, 31)) == "click_events_p20250131"
+    assert partition_day("click_events_p20250131") == date(2025, 1, 31)
+    assert partition_day("click_events_default") is None
+
+
+def test_expired_partitions_keep_retention_window():
+    names = [partition_name(date(2025, 1, day)) for day in range(1, 11)] + ["click_events_default"]
+    # Срок 3 дня от 10 января: партиции до 7 января (не включая) целиком старше срока
+    assert expired_partitions(names, retention_days=3, today=date(2025, 1, 10)) == [
+        partition_name(date(2025, 1, day)) for day in range(1, 7)
+    ]
+
+
+def test_maintenance_is_noop_outside_postgres():
+    with Session(create_engine("sqlite://")) as db:
+        assert maintain_partitions(db, days_ahead=7, retention_days=1) == ([], [])
+
+
+def test_retention_drops_old_partitions_and_purges_default():
+    today = datetime.utcnow().date()
+    old, recent = partition_name(today - timedelta(days=10)), partition_name(today)
+    db = RecordingPostgresSession([old, recent, DEFAULT_PARTITION])
+
+    assert maintain_partitions(db, days_ahead=0, retention_days=3) == ([], [old])
+    sql = [statement for statement, _ in db.statements]
+    assert f"DROP TABLE {old}" in sql and f"DROP TABLE {recent}" not in sql
+    purge = [(statement, params) for statement, params in db.statements if statement.startswith("DELETE")]
+    assert purge == [(f'DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" < :cutoff', {"cutoff": today - timedelta(days=3)})]
+
+
+def test_maintenance_skips_unpartitioned_schema():
+    # Без миграции 0005 click_events — обычная таблица: создавать партиции некуда
+    db = RecordingPostgresSession([], partitioned=False)
+
+    assert maintain_partitions(db, days_ahead=7, retention_days=3) == ([], [])
+    assert not any("CREATE TABLE" in sql or sql.startswith("DELETE") for sql, _ in db.statements)
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from app.infrastructure.pool import InstrumentedQueuePool, pool_stats
+
+
+def test_pool_stats_count_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.01,
+    )
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        stats = pool_stats("main", engine)
+        assert (stats.checked_out, stats.checkouts, stats.timeouts) == (1, 1, 1)
+        assert stats.max_wait_seconds >= 0.01
+
+    engine.dispose()
+    stats = pool_stats("main", engine)
+    assert (stats.checked_out, stats.checkouts, stats.timeouts) == (0, 1, 1)
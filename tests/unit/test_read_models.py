@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.domain.entities import URL, URLStats
+from app.infrastructure.database import Base
+from app.infrastructure.repositories.postgres import PostgresURLRepository, PostgresUserRepository
+
+
+def test_reads_bypass_the_identity_map():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        repo = PostgresURLRepository(db)
+        created = repo.add(URL(id=None, key="abc", secret_key="abc_s", target_url="https://example.com",
+                               expires_at=datetime.utcnow() + timedelta(days=1), cacheable=False))
+        repo.log_click(created)
+        db.expunge_all()
+
+        url = repo.get_by_key("abc")
+        assert url == created
+        assert not hasattr(url, "__dict__")
+        assert repo.get_by_secret_key("abc_s") == created
+        assert repo.get_all(skip=0, limit=10, active_only=True) == [created]
+        [stats] = repo.get_stats()
+        assert isinstance(stats, URLStats)
+        assert (stats.key, stats.cacheable, stats.last_hour_clicks, stats.last_day_clicks) == ("abc", False, 1, 1)
+        assert PostgresUserRepository(db).get_by_username("nobody") is None
+        assert len(db.identity_map) == 0
+    engine.dispose()
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import pytest
+from starlette.requests import Request
+from app.api.redirects import cache_max_age, redirect_response
+from app.core.config import settings
+from app.domain.entities import URL
+
+
+def make_url(expires_in: timedelta = timedelta(days=1), cacheable: bool = True) -> URL:
+    return URL(id=1, key="abc", secret_key="abc_secret", target_url="https://example.com/?q=</script>",
+               expires_at=datetime.utcnow() + expires_in, cacheable=cacheable,
+               created_at=datetime(2026, 1, 1, 12, 0))
+
+
+def make_request(**headers: str) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/abc",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.fixture
+def caching(monkeypatch):
+    monkeypatch.setattr(settings, "REDIRECT_CACHE_MAX_AGE_SECONDS", 3600)
+    monkeypatch.setattr(settings, "REDIRECT_CACHE_VALIDATORS", True)
+    monkeypatch.setattr(settings, "REDIRECT_STATUS_CODE", 308)
+
+
+def test_max_age_never_outlives_the_link(caching):
+    assert cache_max_age(make_url()) == 3600
+    assert 0 < cache_max_age(make_url(expires_in=timedelta(minutes=10))) <= 600
+    assert cache_max_age(make_url(expires_in=timedelta(minutes=-1))) == 0
+    assert cache_max_age(make_url(cacheable=False)) == 0
+
+
+def test_caching_disabled_by_default():
+    response = redirect_response(make_request(), make_url())
+    assert response.status_code == 307
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def test_cacheable_redirect_and_revalidation(caching):
+    url = make_url()
+    response = redirect_response(make_request(), url)
+    assert response.status_code == 308
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert response.headers["last-modified"] == "Thu, 01 Jan 2026 12:00:00 GMT"
+
+    revalidated = redirect_response(make_request(if_none_match=response.headers["etag"]), url)
+    assert revalidated.status_code == 304
+    assert redirect_response(make_request(if_modified_since="Fri, 02 Jan 2026 00:00:00 GMT"), url).status_code == 304
+    assert redirect_response(make_request(if_none_match='"other"'), url).status_code == 308
+
+
+def test_beacon_page_escapes_target(caching, monkeypatch):
+    monkeypatch.setattr(settings, "REDIRECT_MODE", "beacon")
+    response = redirect_response(make_request(), make_url())
+    body = response.body.decode()
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert '"/abc/click"' in body
+    assert "</script>\"" not in body and "q=&lt;/script&gt;" in body
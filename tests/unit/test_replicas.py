@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.domain.entities import URL
+from app.infrastructure.database import Base
+from app.infrastructure.replicas import ReplicaLagMonitor, ReplicaRouter
+from app.infrastructure.repositories.postgres import PostgresURLRepository
+from app.infrastructure.repositories.replicated import ReplicaRoutedURLRepository
+
+
+def make_url(key: str, target_url: str) -> URL:
+    return URL(id=None, key=key, secret_key=f"{key}_s", target_url=target_url,
+               expires_at=datetime.utcnow() + timedelta(days=1))
+
+
+@pytest.fixture
+def databases(tmp_path):
+    # Два SQLite-файла вместо primary и реплики; «репликация» — ручная вставка в оба
+    factories = {}
+    for name in ("primary", "replica1"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engine)
+        factories[name] = sessionmaker(bind=engine)
+    with factories["primary"]() as db:
+        PostgresURLRepository(db).add(make_url("both", "https://primary.example.com/both"))
+    with factories["replica1"]() as db:
+        PostgresURLRepository(db).add(make_url("both", "https://replica.example.com/both"))
+    yield factories
+
+
+def make_repo(factories, router):
+    primary, replica = factories["primary"](), factories["replica1"]()
+    return ReplicaRoutedURLRepository(PostgresURLRepository(primary), PostgresURLRepository(replica), "replica1", router)
+
+
+def test_replica_is_used_only_after_a_healthy_lag_check(databases):
+    router = ReplicaRouter({"replica1": databases["replica1"]}, max_lag=5)
+    assert router.choose() is None
+    ReplicaLagMonitor(router, interval=60).run_once()
+    assert router.choose()[0] == "replica1" and router.healthy() == ["replica1"]
+
+    router.record_lag("replica1", 30)
+    assert router.choose() is None
+
+
+def test_replica_without_wal_stream_is_excluded(databases, monkeypatch):
+    router = ReplicaRouter({"replica1": databases["replica1"]}, max_lag=5)
+    monitor = ReplicaLagMonitor(router, interval=60)
+    monitor.run_once()
+    assert router.healthy() == ["replica1"]
+
+    # Приёмник WAL отключён: позиции совпадают, но реплика не догоняет primary
+    monkeypatch.setattr(monitor, "check", lambda name, session_factory: None)
+    monitor.run_once()
+    assert router.choose() is None and router.healthy() == []
+
+
+def test_reads_go_to_replica_with_primary_fallbacks(databases):
+    router = ReplicaRouter({"replica1": databases["replica1"]}, max_lag=5)
+    repo = make_repo(databases, router)
+    assert repo.get_by_key("both").target_url == "https://replica.example.com/both"
+    assert [url.key for url in repo.get_all(skip=0, limit=10, active_only=True)] == ["both"]
+
+    # Ссылка, которой ещё нет на реплике, читается с primary
+    created = repo.add(make_url("fresh", "https://primary.example.com/fresh"))
+    assert router.recently_written("fresh")
+    assert repo.get_by_key("fresh") == created
+    assert make_repo(databases, ReplicaRouter({}, max_lag=5)).get_by_key("fresh").id == created.id
+
+    # Недавно изменённый ключ читается с primary, даже если реплика его знает
+    router.note_write("both")
+    assert repo.get_by_key("both").target_url == "https://primary.example.com/both"
+
+
+def test_replica_error_falls_back_and_excludes_replica(databases):
+    router = ReplicaRouter({"replica1": databases["replica1"]}, max_lag=5)
+    router.record_lag("replica1", 0)
+    with databases["replica1"]() as db:
+        db.execute(text("DROP TABLE click_rollups"))
+        db.execute(text("DROP TABLE urls"))
+        db.commit()
+    repo = make_repo(databases, router)
+    assert repo.get_by_key("both").target_url == "https://primary.example.com/both"
+    assert router.choose() is None
+    assert repo.get_stats() is not None
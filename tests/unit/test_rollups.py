@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app.infrastructure import models
+from app.infrastructure.database import Base
+from app.infrastructure.rollups import bucket_start, delete_expired_rollups, increment_rollups
+
+
+def test_bucket_start_floors_to_bucket():
+    assert bucket_start(datetime(2024, 1, 1, 12, 34, 56), 60) == datetime(2024, 1, 1, 12, 34)
+    assert bucket_start(datetime(2024, 1, 1, 12, 34, 56), 3600) == datetime(2024, 1, 1, 12)
+
+
+def test_increment_rollups_upserts_counts():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(models.URL(id=1, key="abc", secret_key="abc_s", target_url="https://example.com",
+                          expires_at=datetime(2030, 1, 1)))
+        db.commit()
+        ts = datetime(2024, 1, 1, 12, 0, 10)
+        increment_rollups(db, [(1, ts), (1, ts), (1, datetime(2024, 1, 1, 12, 1, 5))], 60)
+        increment_rollups(db, [(1, ts)], 60)
+        db.commit()
+        rows = db.execute(select(models.ClickRollup.bucket_start, models.ClickRollup.clicks)
+                          .order_by(models.ClickRollup.bucket_start)).all()
+    assert rows == [(datetime(2024, 1, 1, 12, 0), 3), (datetime(2024, 1, 1, 12, 1), 1)]
+
+
+def test_delete_expired_rollups_keeps_last_day():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    now = datetime(2024, 1, 3, 12, 0)
+    with Session(engine) as db:
+        db.add(models.URL(id=1, key="abc", secret_key="abc_s", target_url="https://example.com",
+                          expires_at=datetime(2030, 1, 1)))
+        db.commit()
+        increment_rollups(db, [(1, now - timedelta(hours=hours)) for hours in (1, 20, 30, 50)], 60)
+        db.commit()
+        # Срок меньше суток не применяется: статистика за день должна остаться полной
+        assert delete_expired_rollups(db, timedelta(hours=1), now=now) == 2
+        assert delete_expired_rollups(db, timedelta(hours=48), now=now) == 0
+        remaining = db.scalars(select(models.ClickRollup.bucket_start).order_by(models.ClickRollup.bucket_start)).all()
+    assert remaining == [now - timedelta(hours=20), now - timedelta(hours=1)]
@@ -0,0 +1,195 @@
+import asyncio
+import queue
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from app.core.cache import TTLCache
+from app.domain.entities import URL
+from app.domain.use_cases import URLUseCases
+from app.infrastructure.repositories.cached import CachedURLRepository, SharedCachedURLRepository
+from app.infrastructure.shared_cache import SharedCacheInvalidationListener, SharedURLCache
+
+
+class FakeRedis:
+    """Подмножество команд Redis, которым пользуется SharedURLCache."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self.subscribers: list[queue.Queue] = []
+
+    def get(self, name):
+        with self._lock:
+            item = self._data.get(name)
+            if item is None or item[0] <= time.monotonic():
+                return None
+            return item[1].encode()
+
+    def set(self, name, value, nx=False, px=None):
+        with self._lock:
+            item = self._data.get(name)
+            if nx and item is not None and item[0] > time.monotonic():
+                return None
+            self._data[name] = (time.monotonic() + px / 1000, value)
+            return True
+
+    def delete(self, name):
+        with self._lock:
+            self._data.pop(name, None)
+
+    def publish(self, channel, message):
+        for subscriber in self.subscribers:
+            subscriber.put({"type": "message", "channel": channel, "data": message.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.messages: queue.Queue = queue.Queue()
+
+    def subscribe(self, channel):
+        self.redis.subscribers.append(self.messages)
+
+    def get_message(self, timeout):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.redis.subscribers.remove(self.messages)
+
+
+class BrokenRedis:
+    def get(self, name):
+        raise ConnectionError("redis is down")
+
+
+class CountingRepository:
+    def __init__(self, url: URL, delay: float = 0):
+        self.url = url
+        self.delay = delay
+        self.lookups = 0
+
+    def get_by_key(self, key):
+        self.lookups += 1
+        time.sleep(self.delay)
+        return self.url if key == self.url.key else None
+
+    def get_by_secret_key(self, secret_key):
+        return self.url if secret_key == self.url.secret_key else None
+
+    def update(self, url):
+        self.url = url
+        return url
+
+
+def make_url() -> URL:
+    return URL(id=1, key="abc", secret_key="abc_secret", target_url="https://example.com",
+               expires_at=datetime.utcnow() + timedelta(days=1))
+
+
+def make_cache(client) -> SharedURLCache:
+    return SharedURLCache(client, ttl=60, missing_ttl=5, lock_ttl=2, lock_wait=1, poll_interval=0.005)
+
+
+def test_cold_key_is_loaded_once_across_nodes():
+    redis = FakeRedis()
+    db = CountingRepository(make_url(), delay=0.05)
+    nodes = [SharedCachedURLRepository(db, make_cache(redis)) for _ in range(4)]
+    results = []
+
+    def redirect(node):
+        results.append(node.get_by_key("abc"))
+
+    threads = [threading.Thread(target=redirect, args=(nodes[i % 4],)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert db.lookups == 1
+    assert [url.target_url for url in results] == ["https://example.com"] * 20
+    # secret_key в Redis не хранится
+    assert b"abc_secret" not in redis.get("url:abc")
+    assert make_cache(redis).get_or_load("abc", lambda: None).secret_key == ""
+
+
+def test_missing_key_is_cached():
+    redis = FakeRedis()
+    db = CountingRepository(make_url())
+    repo = SharedCachedURLRepository(db, make_cache(redis))
+    assert repo.get_by_key("nope") is None
+    assert repo.get_by_key("nope") is None
+    assert db.lookups == 1
+
+
+def test_deactivation_is_broadcast_to_other_nodes():
+    redis = FakeRedis()
+    db = CountingRepository(make_url())
+    other_local_cache = TTLCache(max_size=10, ttl=60)
+    other_node = CachedURLRepository(SharedCachedURLRepository(db, make_cache(redis)), other_local_cache)
+    listener = SharedCacheInvalidationListener(redis, "url-invalidations", other_local_cache, poll_timeout=0.01)
+    listener.start()
+    try:
+        assert other_node.get_by_key("abc") is not None
+        node = CachedURLRepository(SharedCachedURLRepository(db, make_cache(redis)), TTLCache(max_size=10, ttl=60))
+        URLUseCases(node).deactivate_url("abc_secret")
+
+        deadline = time.monotonic() + 1
+        while other_local_cache.get("abc") is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert other_node.get_by_key("abc").is_active is False
+        assert db.lookups == 2
+    finally:
+        listener.stop()
+
+
+def test_redis_errors_fall_back_to_database():
+    db = CountingRepository(make_url())
+    repo = SharedCachedURLRepository(db, make_cache(BrokenRedis()))
+    assert repo.get_by_key("abc").key == "abc"
+    assert db.lookups == 1
+
+
+def test_event_loop_does_not_wait_for_lock_holder():
+    redis = FakeRedis()
+    db = CountingRepository(make_url())
+    cache = make_cache(redis)
+    redis.set(cache._lock_key("abc"), "other-node", nx=True, px=60_000)
+
+    async def redirect():
+        # Так вызывается репозиторий в async-режиме: синхронно в потоке event loop
+        return SharedCachedURLRepository(db, cache).get_by_key("abc")
+
+    started = time.monotonic()
+    assert asyncio.run(redirect()).key == "abc"
+    assert time.monotonic() - started < cache.lock_wait / 2
+    assert db.lookups == 1
+
+
+def test_invalidation_wins_over_load_in_flight():
+    redis = FakeRedis()
+    cache = make_cache(redis)
+    stale = make_url()
+
+    def load_before_deactivation():
+        # Строка прочитана до коммита деактивации, а в кэш пишется уже после инвалидации
+        cache.invalidate("abc")
+        return stale
+
+    assert cache.get_or_load("abc", load_before_deactivation).is_active
+    deactivated = replace(stale, is_active=False)
+    assert cache.get_or_load("abc", lambda: deactivated).is_active is False
+
+    def miss_before_creation():
+        cache.forget("new")
+        return None
+
+    assert cache.get_or_load("new", miss_before_creation) is None
+    created = replace(stale, id=2, key="new")
+    assert cache.get_or_load("new", lambda: created) == created
@@ -0,0 +1,62 @@
+import random
+from app.core.sketches import CountMinSketch, HyperLogLog, SpaceSaving
+
+
+def test_hyperloglog_estimates_and_merges():
+    first, second = HyperLogLog(precision=12), HyperLogLog(precision=12)
+    for i in range(20_000):
+        first.add(f"a{i}".encode())
+        first.add(f"a{i}".encode())
+        second.add(f"{'a' if i % 2 else 'b'}{i}".encode())
+    assert abs(first.count() - 20_000) / 20_000 < 4 * first.relative_error
+
+    first.merge(HyperLogLog.from_bytes(second.to_bytes()))
+    assert abs(first.count() - 30_000) / 30_000 < 4 * first.relative_error
+    assert HyperLogLog(precision=12).count() == 0
+
+
+def test_count_min_never_underestimates():
+    sketch = CountMinSketch(width=64, depth=4)
+    counts = {f"item{i}": i + 1 for i in range(200)}
+    for item, count in counts.items():
+        sketch.add(item, count)
+    restored = CountMinSketch.from_bytes(sketch.to_bytes())
+    assert restored.total == sketch.total == sum(counts.values())
+    assert all(restored.estimate(item) >= count for item, count in counts.items())
+
+    restored.merge(sketch)
+    assert restored.estimate("item199") >= 400
+
+
+def test_space_saving_keeps_heavy_hitters():
+    rng = random.Random(0)
+    sketch = SpaceSaving(capacity=10)
+    stream = ["hot"] * 500 + ["warm"] * 200 + [f"noise{rng.randrange(1000)}" for _ in range(1000)]
+    rng.shuffle(stream)
+    for item in stream:
+        sketch.add(item)
+    top = sketch.top(2)
+    assert [item for item, _, _ in top] == ["hot", "warm"]
+    for item, count, error in top:
+        assert count - error <= stream.count(item) <= count
+
+    other = SpaceSaving(capacity=10)
+    other.add("warm", 400)
+    sketch.merge(SpaceSaving.from_bytes(other.to_bytes()))
+    assert sketch.top(1)[0][0] == "warm" and len(sketch.top()) <= 10
+
+
+def test_space_saving_merge_counts_items_missing_from_full_summary():
+    stored = SpaceSaving(capacity=2)
+    stored.add("x", 5)
+    stored.add("b", 5)
+    stored.add("c", 1)
+    assert stored.top() == [("c", 6, 5), ("b", 5, 0)]
+    other = SpaceSaving(capacity=2)
+    other.add("a", 10)
+    other.add("d", 1)
+
+    stored.merge(other)
+    # "a" нет в заполненной stored, но он мог встретиться там до 5 раз: верхняя оценка 15
+    assert stored.top() == [("a", 15, 5), ("c", 7, 6)]
+    assert stored.total == 22
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.domain.use_cases import URLUseCases
+from app.infrastructure import models
+from app.infrastructure.database import Base
+from app.infrastructure.repositories.postgres import PostgresURLRepository
+from app.infrastructure.sweeper import sweep_expired
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    now = datetime.utcnow()
+    with factory() as db:
+        for i in range(5):
+            db.add(models.URL(key=f"old{i}", secret_key=f"old{i}_s", target_url="https://example.com",
+                              expires_at=now - timedelta(minutes=i + 1)))
+        db.add(models.URL(key="live", secret_key="live_s", target_url="https://example.com",
+                          expires_at=now + timedelta(days=1)))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+class CountingRepository(PostgresURLRepository):
+    lookups = 0
+
+    def get_by_key(self, key):
+        self.lookups += 1
+        return super().get_by_key(key)
+
+
+def active_keys(session_factory) -> set[str]:
+    with session_factory() as db:
+        return set(db.scalars(select(models.URL.key).where(models.URL.is_active == True)))
+
+
+def test_sweep_deactivates_expired_in_bounded_batches(session_factory):
+    assert sweep_expired(session_factory, batch_size=2, max_batches=2) == 4
+    assert len(active_keys(session_factory)) == 2
+    assert sweep_expired(session_factory, batch_size=2) == 1
+    assert active_keys(session_factory) == {"live"}
+
+
+def test_redirect_skips_swept_links_with_one_lookup(session_factory):
+    sweep_expired(session_factory, batch_size=10)
+    with session_factory() as db:
+        repo = CountingRepository(db)
+        use_cases = URLUseCases(repo)
+        assert use_cases.find_and_process_url("old0", log_click=False) is None
+        assert repo.get_by_key("old0").is_active is False
+        assert use_cases.find_and_process_url("live", log_click=False).key == "live"
+        assert use_cases.find_and_process_url("missing", log_click=False) is None
+        assert repo.lookups == 4
@@ -0,0 +1,148 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.api.dependencies import get_current_user, get_url_repo
+from app.api.v1.cursors import NEXT_CURSOR_HEADER
+from app.api.v1.endpoints import urls as urls_v1
+from app.core.config import settings
+from app.domain.entities import User
+from app.domain.use_cases import URLUseCases
+from app.infrastructure import models
+from app.infrastructure.database import Base
+from app.infrastructure.repositories.postgres import PostgresURLRepository
+from app.infrastructure.rollups import increment_rollups
+from app.main import app
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+
+    def url_repo():
+        with factory() as db:
+            yield PostgresURLRepository(db)
+
+    @contextmanager
+    def standalone_url_use_cases():
+        with factory() as db:
+            yield URLUseCases(PostgresURLRepository(db))
+
+    app.dependency_overrides[get_url_repo] = url_repo
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="admin", hashed_password="")
+    monkeypatch.setattr(urls_v1, "standalone_url_use_cases", standalone_url_use_cases)
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory) -> TestClient:
+    return TestClient(app)
+
+
+def add_urls(session_factory, count: int, clicks: dict[int, int] | None = None, **fields) -> None:
+    """Ссылки k1..k{count} с id 1..count; clicks — число кликов за последний час по id."""
+    values = {"is_active": True, "expires_at": datetime.utcnow() + timedelta(days=1)}
+    values.update(fields)
+    now = datetime.utcnow()
+    with session_factory() as db:
+        db.execute(insert(models.URL), [
+            {"id": i, "key": f"k{i}", "secret_key": f"k{i}_s", "target_url": f"https://example.com/{i}", **values}
+            for i in range(1, count + 1)
+        ])
+        increment_rollups(db, [(url_id, now) for url_id, n in (clicks or {}).items() for _ in range(n)], 60)
+        db.commit()
+
+
+def links(response) -> list[str]:
+    return [item["link"].rsplit("/", 1)[-1] for item in response.json()]
+
+
+def test_stats_top_orders_by_clicks(client, session_factory):
+    add_urls(session_factory, 4, clicks={1: 1, 2: 5, 3: 3})
+
+    response = client.get("/api/v1/urls/stats", params={"top": 2})
+    assert response.status_code == 200
+    assert links(response) == ["k2", "k3"]
+    assert response.json()[0]["last_hour_clicks"] == 5 and NEXT_CURSOR_HEADER not in response.headers
+    assert client.get("/api/v1/urls/stats", params={"top": 2, "limit": 2}).status_code == 400
+    # Полный список — все ссылки, без кликов за сутки — в конце с нулями
+    everything = client.get("/api/v1/urls/stats")
+    assert links(everything) == ["k2", "k3", "k1", "k4"] and everything.json()[-1]["last_day_clicks"] == 0
+
+
+def test_stats_pages_by_id_with_next_cursor(client, session_factory):
+    add_urls(session_factory, 5, clicks={1: 2, 2: 1, 4: 7, 5: 3})
+
+    first = client.get("/api/v1/urls/stats", params={"limit": 2})
+    assert links(first) == ["k1", "k2"]
+    second = client.get("/api/v1/urls/stats", params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]})
+    # Ссылка без кликов за сутки (k3) остаётся в статистике с нулями
+    assert links(second) == ["k3", "k4"] and second.json()[0]["last_day_clicks"] == 0
+    last = client.get("/api/v1/urls/stats", params={"limit": 2, "cursor": second.headers[NEXT_CURSOR_HEADER]})
+    assert links(last) == ["k5"] and NEXT_CURSOR_HEADER not in last.headers
+    assert client.get("/api/v1/urls/stats", params={"cursor": "bnVsbA"}).status_code == 400
+
+
+def test_stats_ndjson_stream_matches_json(client, session_factory):
+    add_urls(session_factory, 3, clicks={1: 1, 2: 4, 3: 2})
+
+    response = client.get("/api/v1/urls/stats", params={"format": "ndjson", "limit": 2})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == client.get("/api/v1/urls/stats", params={"limit": 2}).json()
+    assert [row["last_day_clicks"] for row in rows] == [1, 4]
+
+
+def test_list_cursor_pages_newest_first(client, session_factory):
+    add_urls(session_factory, 5)
+
+    first = client.get("/api/v1/urls/", params={"limit": 2})
+    assert links(first) == ["k5", "k4"]
+    second = client.get("/api/v1/urls/", params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]})
+    assert links(second) == ["k3", "k2"]
+    last = client.get("/api/v1/urls/", params={"limit": 2, "cursor": second.headers[NEXT_CURSOR_HEADER]})
+    assert links(last) == ["k1"] and NEXT_CURSOR_HEADER not in last.headers
+
+
+def test_list_cursor_rejects_other_filter_and_skip(client, session_factory):
+    add_urls(session_factory, 3)
+    cursor = client.get("/api/v1/urls/", params={"limit": 1}).headers[NEXT_CURSOR_HEADER]
+
+    other_filter = client.get("/api/v1/urls/", params={"limit": 1, "cursor": cursor, "active_only": True})
+    assert other_filter.status_code == 400
+    assert client.get("/api/v1/urls/", params={"limit": 1, "cursor": cursor, "skip": 1}).status_code == 400
+    assert client.get("/api/v1/urls/", params={"limit": 1, "cursor": cursor}).status_code == 200
+
+
+def click_count(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(models.ClickEvent))
+
+
+def test_beacon_mode_counts_clicks_only_on_post(client, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "REDIRECT_MODE", "beacon")
+    add_urls(session_factory, 1)
+
+    page = client.get("/k1", follow_redirects=False)
+    assert page.status_code == 200 and "/k1/click" in page.text
+    assert click_count(session_factory) == 0
+    assert client.post("/k1/click", params={"referrer": "https://ref.example"}).status_code == 204
+    assert click_count(session_factory) == 1
+    assert client.post("/missing/click").status_code == 404
+
+
+def test_click_endpoint_is_disabled_outside_beacon_mode(client, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "REDIRECT_MODE", "redirect")
+    add_urls(session_factory, 1)
+
+    assert client.get("/k1", follow_redirects=False).status_code in (301, 302, 307, 308)
+    assert client.post("/k1/click").status_code == 404
+    assert click_count(session_factory) == 1
@@ -20,10 +20,11 @@ class InMemoryURLRepository(AbstractURLRepository):
     
     def get_by_key(self, key: str) -> URL | None: return self._data.get(key)
     def get_by_secret_key(self, key: str) -> URL | None: return self._secrets.get(key)
-    def get_all(self, skip, limit, active_only): return list(self._data.values())[skip:skip+limit]
+    def get_all(self, skip, limit, active_only, before_id=None): return list(self._data.values())[skip:skip+limit]
     def update(self, url: URL) -> URL: self._data[url.key] = url; return url
     def log_click(self, url: URL): self._clicks.append((url.id, object()))
     def get_stats(self) -> list[URLStats]: return [] # Для unit-тестов это не так важно
+    def reserve_key_ids(self, count: int) -> list[int]: return list(range(count))
 
 @pytest.fixture
 def url_use_cases() -> URLUseCases:
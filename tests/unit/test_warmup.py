@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.cache import TTLCache
+from app.infrastructure import models
+from app.infrastructure.database import Base
+from app.infrastructure.rollups import increment_rollups
+from app.infrastructure.warmup import CacheWarmer
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    now = datetime.utcnow()
+    with factory() as db:
+        rows = [("hot", True, 1), ("warm", True, 1), ("cold", True, 1), ("off", False, 1), ("gone", True, -1)]
+        for key, is_active, days in rows:
+            db.add(models.URL(key=key, secret_key=f"{key}_s", target_url=f"https://example.com/{key}",
+                              is_active=is_active, expires_at=now + timedelta(days=days)))
+        db.commit()
+        ids = {url.key: url.id for url in db.query(models.URL)}
+        clicks = {"hot": 5, "warm": 3, "off": 9, "gone": 9}
+        increment_rollups(db, [(ids[key], now) for key, count in clicks.items() for _ in range(count)], 60)
+        # Клики за пределами окна прогрева не учитываются
+        increment_rollups(db, [(ids["cold"], now - timedelta(days=2))] * 20, 60)
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def make_warmer(session_factory, cache: TTLCache, top_n: int = 10, time_budget: float = 10.0) -> CacheWarmer:
+    return CacheWarmer(
+        session_factory, [lambda url: cache.set(url.key, url)],
+        top_n=top_n, window=timedelta(hours=1), time_budget=time_budget,
+    )
+
+
+def test_warmup_loads_recent_active_links(session_factory):
+    cache = TTLCache(max_size=10, ttl=60)
+    warmer = make_warmer(session_factory, cache)
+    assert not warmer.ready()
+    warmer.start()
+    warmer.stop(timeout=5)
+
+    report = warmer.report()
+    assert warmer.ready() and report.loaded == 2 and not report.timed_out and report.error is None
+    assert cache.get("hot").target_url == "https://example.com/hot"
+    assert cache.get("warm") is not None
+    assert cache.get("cold") is None and cache.get("off") is None and cache.get("gone") is None
+
+
+def test_warmup_respects_top_n_and_time_budget(session_factory):
+    cache = TTLCache(max_size=10, ttl=60)
+    assert make_warmer(session_factory, cache, top_n=1).run().loaded == 1
+    assert cache.get("hot") is not None and cache.get("warm") is None
+
+    report = make_warmer(session_factory, TTLCache(max_size=10, ttl=60), time_budget=0).run()
+    assert report.ready and report.loaded == 1 and report.timed_out